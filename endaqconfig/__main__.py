@@ -5,6 +5,7 @@ This should contain as little code as possible, just what's related to
 running from the command line.
 """
 import logging
+import sys
 import wx
 
 from endaq.device import getRecorder
@@ -23,9 +24,28 @@ def run(debug=__DEBUG__):
                         help="Show advanced configuration options")
     parser.add_argument("-D", '--debug', action="store_true",
                         help="Run in 'debug' mode, showing extra messages, etc.")
+    parser.add_argument('--virtual', action="store_true",
+                        help=("Use a 'virtual' device list, which only draws the "
+                              "visible rows. Faster with very large numbers of "
+                              "devices (e.g., network-attached fleets)."))
     parser.add_argument("path", nargs='?',
                         help=("The path of the device to configure (optional). "
                               "Foregoes displaying the device list."))
+
+    batch = parser.add_argument_group("Batch provisioning (no GUI)")
+    batch.add_argument("-p", "--provision", metavar="XCG",
+                       help=("Apply an exported configuration file to all "
+                             "matching devices, without showing the GUI."))
+    batch.add_argument("-m", "--match", metavar="PATTERN", action="append",
+                       help=("Only provision devices with a serial number, "
+                             "part number, name, or path matching PATTERN "
+                             "(wildcards allowed). Can be used multiple times."))
+    batch.add_argument("-c", "--set-clock", action="store_true",
+                       help="Also set the clocks of provisioned devices.")
+    batch.add_argument("-w", "--workers", type=int, default=None,
+                       help="Maximum number of devices provisioned at once.")
+    batch.add_argument("-o", "--output", metavar="FILE",
+                       help="Write the JSON summary to FILE (default: stdout).")
     args = parser.parse_args()
 
     debug = debug or args.debug
@@ -33,6 +53,16 @@ def run(debug=__DEBUG__):
         logger.setLevel(logging.DEBUG)
         logger.debug("Starting in DEBUG mode.")
 
+    if args.provision:
+        from . import provision
+        summary = provision.provision(args.provision,
+                                      patterns=args.match,
+                                      paths=[args.path] if args.path else None,
+                                      setClock=args.set_clock,
+                                      workers=args.workers or provision.DEFAULT_WORKERS)
+        provision.writeSummary(summary, args.output)
+        sys.exit(1 if summary['failed'] else 0)
+
     # Create a wx.App if one not already running (the latter is an edge case).
     _app = wx.GetApp()
     if not _app:
@@ -41,6 +71,7 @@ def run(debug=__DEBUG__):
     try:
         if not args.path:
             dev = device_dialog.selectDevice(showAdvanced=args.advanced,
+                                             virtual=args.virtual,
                                              debug=debug)
         else:
             dev = getRecorder(args.path)
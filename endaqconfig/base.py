@@ -23,7 +23,6 @@ logger = logging.getLogger('endaqconfig')
 #
 # ===============================================================================
 
-from fnmatch import fnmatch
 import string
 import time
 
@@ -32,6 +31,13 @@ import wx.lib.filebrowsebutton as FB
 import wx.lib.scrolledpanel as SP
 
 from .common import getUtcOffset, isCompiled
+from . import fields
+from .fields import ConfigBase, EnumOption
+from .expressions import (EXPRESSION_CACHE_SIZE, compileExpression,
+                          LinearTransform, getLinearTransform,
+                          getExpressionCacheInfo, getExpressionDependencies,
+                          DependencyGraph, DisplayContainer, ConfigContainer,
+                          convertConfigValues)
 from .widgets.shared import DateTimeCtrl, wx_DateTime_FromTimeT
 
 # ===============================================================================
@@ -157,358 +163,10 @@ class TextValidator(wx.Validator):
             wx.Bell()
 
 
-# ===============================================================================
-#
-# ===============================================================================
-
-class DisplayContainer(object):
-    """ A wrapper for the dialog's dictionary of configuration items, which
-        dynamically gets the displayed values from the corresponding widget. It
-        simplifies the field's ``DisplayFormat``, ``ValueFormat``, and
-        ``DisableIf`` expressions. Iterating over it is performed in the order
-        of the keys (i.e. config IDs), low to high; dependencies can be avoided
-        by giving dependent values higher config IDs than the fields they
-        depend upon.
-    """
-
-
-    def __init__(self, root):
-        self.root = root
-
-
-    def get(self, k, default=None):
-        if k in self.root.configItems:
-            return self[k]
-        return default
-
-
-    def __getitem__(self, k):
-        if k not in self.root.configItems:
-            return None
-        return self.root.configItems[k].getDisplayValue()
-
-
-    def __contains__(self, k):
-        return k in self.root.configItems
-
-
-    def __iter__(self):
-        return iter(self.keys())
-
-
-    def iterkeys(self):
-        return self.__iter__()
-
-
-    def itervalues(self):
-        for k in self.iterkeys():
-            yield self[k]
-
-
-    def iteritems(self):
-        for k in self.iterkeys():
-            yield k, self[k]
-
-
-    def keys(self):
-        return sorted(self.root.configItems.keys())
-
-
-    def values(self):
-        return list(self.itervalues())
-
-
-    def items(self):
-        return list(self.iteritems())
-
-
-    def toDict(self):
-        """ Create a real dictionary of field values keyed by config IDs.
-            Items with values of `None` are excluded.
-        """
-        return {k: v for k, v in self.iteritems() if v is not None}
-
-
-class ConfigContainer(DisplayContainer):
-    """ A wrapper for the dialog's dictionary of configuration items, which
-        dynamically gets the converted configuration values (as written to the
-        config file) from the corresponding widget. It simplifies saving the
-        configuration data. Iterating over it is performed in the order of the
-        keys (i.e. config IDs), low to high; dependencies can be avoided by
-        giving dependent values higher config IDs than the fields they depend
-        upon.
-    """
-
-
-    def __getitem__(self, k):
-        return self.root.configItems[k].getConfigValue()
-
-
 # ===============================================================================
 # --- Base classes
 # ===============================================================================
 
-class ConfigBase(object):
-    """ Base/mix-in class for configuration items. Handles parsing attributes
-        from EBML. Doesn't do any of the GUI-specific widget work, as some
-        components don't correspond directly to a UI widget.
-
-        :cvar ARGS: A dictionary mapping EBML element names to object attribute
-            names. Wildcards are allowed in the element names.
-        :cvar CLASS_ARGS: A dictionary mapping additional EBML element names
-            to object attribute names. Subclasses can add their own unique
-            attributes to this dictionary.
-        :cvar DEFAULT_TYPE: The name of the EBML ``*Value`` element type used
-            when writing this item's value to the config file. Used if the
-            defining EBML element does not contain a ``*Value`` sub-element.
-    """
-
-    # Mapping of element names to object attributes. May contain glob-style
-    # wildcards.
-    ARGS = {"Label": "label",
-            "ConfigID": "configId",
-            "ToolTip": "tooltip",
-            "Units": "units",
-            "DisableIf": "disableIf",
-            "ExcludeID": "exclude",
-            "DisplayFormat": "displayFormat",
-            "ValueFormat": "valueFormat",
-            "MaxLength": "maxLength",
-            "*Min": "min",
-            "*Max": "max",
-            "*Value": "default",
-            "*Gain": "gain",
-            "*Offset": "offset"
-            }
-
-    # Class-specific element/attribute mapping. Subclasses can use this for
-    # their unique attributes without clobbering the common ones in ARGS.
-    CLASS_ARGS = {}
-
-    # The name of the default *Value EBML element type used when writing this
-    # item's value to the config file. Used if the definition does not include
-    # a *Value element.
-    DEFAULT_TYPE = None
-
-    # Default expression code objects for DisableIf, ValueFormat, DisplayFormat.
-    # `noEffect` always returns the field's value unmodified (supplied as the
-    # variable ``x``). `noValue` always returns `None`.
-    noEffect = compile("x", "<ConfigBase.noEffect>", "eval")
-    noValue = compile("None", "<ConfigBase.noValue>", "eval")
-
-
-    def makeExpression(self, exp, name):
-        """ Helper method for compiling an expression in a string into a code
-            object that can later be used with `eval()`. Used internally.
-        """
-        if exp is None:
-            # No expression defined: value is returned unmodified (it matches
-            # the config item's type)
-            return self.noEffect
-        elif exp == '':
-            # Empty string expression: always returns `None` (e.g. the field is
-            # used to calculate another config item, not a config item itself)
-            return self.noValue
-        elif not isinstance(exp, str):
-            # Probably won't occur, but just in case...
-            logger.debug("Bad value for %s: %r (%s)" % (name, exp, type(exp)))
-            return
-
-        # Create a nicely formatted, informative string for the compiled
-        # expression's "filename" and for display if the expression is bad.
-        idstr = ("(ID 0x%0X) " % self.configId) if self.configId else ""
-        msg = "%r %s%s" % (self.label, idstr, name)
-
-        try:
-            return compile(exp, "<%s>" % msg, "eval")
-        except SyntaxError as err:
-            logger.error("Ignoring bad expression (%s) for %s %s: %r" %
-                         (err.msg, self.__class__.__name__, msg, err.text))
-            return self.noValue
-
-
-    def makeGainOffsetFormat(self):
-        """ Helper method for generating `displayFormat` and `valueFormat`
-            expressions using the field's `gain` and `offset`. Used internally.
-        """
-        # Create a nicely formatted, informative string for the compiled
-        # expression's "filename" and for display if the expression is bad.
-        idstr = (" (ID 0x%0X)" % self.configId) if self.configId else ""
-        msg = "%r%s" % (self.label, idstr)
-
-        gain = 1.0 if self.gain is None else self.gain
-        offset = 0.0 if self.offset is None else self.offset
-
-        self.displayFormat = compile("(x+%.8f)*%.8f" % (offset, gain),
-                                     "%s displayFormat" % msg, "eval")
-        self.valueFormat = compile("(x/%.8f)-%.8f" % (gain, offset),
-                                   "%s valueFormat" % msg, "eval")
-
-
-    def setAttribDefault(self, att, val):
-        """ Sets an attribute, if the attribute has not yet been set, similar to
-            `dict.setdefault()`. Allows subclasses to set defaults that differ
-            from their superclass.
-        """
-        if not hasattr(self, att):
-            setattr(self, att, val)
-            return val
-        return getattr(self, att)
-
-
-    def getPath(self):
-        """ Get a string containing the configuration item's label and the
-            labels of its parents (if applicable).
-        """
-        try:
-            root = self.Parent.getPath()
-            if self.label:
-                return "%s : %s" % (root, self.label)
-            else:
-                return root
-        except AttributeError:
-            return self.label
-
-
-    def __init__(self, element, root):
-        """ Constructor. Instantiates a `ConfigBase` and parses parameters out
-            of the supplied EBML element.
-
-            :param element: The EBML element from which to build the object.
-            :param root: The main dialog.
-        """
-        self.root = root
-        self.element = element
-        self.isAdvancedFeature = False
-
-        # Convert element children to object attributes.
-        # First, set any previously undefined attributes to None.
-        args = self.ARGS.copy()
-        args.update(self.CLASS_ARGS)
-        for v in args.values():
-            self.setAttribDefault(v, None)
-
-        self.valueType = self.DEFAULT_TYPE
-        self.exclude = []
-
-        for el in self.element.value:
-            if el.name == "IsAdvancedFeature":
-                self.isAdvancedFeature = bool(el.value)
-                continue
-
-            if el.name in FIELD_TYPES:
-                # Child field: skip now, handle later (if applicable)
-                continue
-
-            if el.name == "ExcludeID":
-                self.exclude.append(el.value)
-                continue
-
-            if el.name.endswith('Value'):
-                # If the field has a '*Value' element, the field will use that
-                # type when saving to the config file.
-                self.valueType = el.__class__.name
-
-            if el.name in args:
-                # Known element name (verbatim): set attribute
-                setattr(self, args[el.name], el.value)
-            else:
-                # Match wildcards and set attribute
-                for k, v in args.items():
-                    if fnmatch(el.name, k):
-                        setattr(self, v, el.value)
-
-        # Compile expressions for converting to/from raw and display values.
-        if self.gain is None and self.offset is None:
-            # No gain and/or offset: use displayFormat/valueFormat if defined.
-            self.displayFormat = self.makeExpression(self.displayFormat, 'displayFormat')
-            self.valueFormat = self.makeExpression(self.valueFormat, 'valueFormat')
-        else:
-            # Generate expressions using the field's gain and offset.
-            self.makeGainOffsetFormat()
-
-        if self.disableIf is not None:
-            self.disableIf = self.makeExpression(self.disableIf, 'disableIf')
-
-        if self.configId is not None and self.root is not None:
-            self.root.configItems[self.configId] = self
-
-        self.expressionVariables = self.root.expressionVariables.copy()
-
-        if self.root.DEBUG:
-            tt = f"{self.tooltip}\n" if self.tooltip else ""
-            cid = hex(self.configId) if self.configId else None
-            self.tooltip = f"{tt}({self.element.name}, ConfigId={cid})"
-
-
-    def __repr__(self):
-        """
-        """
-        name = self.__class__.__name__
-        if not self.label:
-            return "<%s at 0x%x>" % (name, id(self))
-        return "<%s %r at 0x%x>" % (name, self.label, id(self))
-
-
-    def isDisabled(self):
-        """ Check the Field's `disableIf` expression (if any) to determine if
-            the Field should be enabled.
-        """
-        if self.disableIf is None:
-            return False
-
-        return eval(self.disableIf, self.expressionVariables)
-
-
-    def getDisplayValue(self):
-        """ Get the object's displayed value.
-        """
-        if self.isDisabled():
-            return None
-        try:
-            return self.value
-        except AttributeError:
-            return self.default
-
-
-    def getConfigValue(self):
-        """ Get the widget's value, as written to the config file.
-        """
-        if self.configId is None:
-            return
-        try:
-            val = self.getDisplayValue()
-            if val is None:
-                return None
-            self.expressionVariables['x'] = val
-            return eval(self.valueFormat, self.expressionVariables)
-        except (KeyError, ValueError, TypeError):
-            return None
-
-
-    def setDisplayValue(self, val, **kwargs):
-        """ Set the object's value, in the data type and units it displays
-            (if applicable).
-        """
-        # This is overridden by ConfigWidget subclasses; they have no `value`.
-        self.value = val
-
-
-    def setConfigValue(self, val, **kwargs):
-        """ Set the Field's value, using the data type native to the config
-            file.
-        """
-        self.expressionVariables['x'] = val
-        val = eval(self.displayFormat, self.expressionVariables)
-        self.setDisplayValue(val, **kwargs)
-
-
-    def setToDefault(self, **kwargs):
-        """ Set the configuration item to its default value.
-        """
-        self.setConfigValue(self.default, **kwargs)
-
-
 class ConfigWidget(wx.Panel, ConfigBase):
     """ Base class for a configuration field.
 
@@ -652,11 +310,11 @@ class ConfigWidget(wx.Panel, ConfigBase):
             self.Parent.setCheck()
 
 
-    def setConfigValue(self, val, check=True):
+    def setConfigValue(self, val, check=True, **kwargs):
         """ Set the Field's value, using the data type native to the config
             file.
         """
-        super(ConfigWidget, self).setConfigValue(val, check=check)
+        super(ConfigWidget, self).setConfigValue(val, check=check, **kwargs)
         try:
             if val is not None and self.group.checkbox is not None:
                 self.group.setCheck(check)
@@ -722,12 +380,14 @@ class ConfigWidget(wx.Panel, ConfigBase):
     def OnCheck(self, evt):
         """ Handle checkbox changing.
         """
+        changed = [self]
         if evt.IsChecked():
             #         if self.checkbox and self.checkbox.IsChecked():
             for cid in self.exclude:
                 if cid in self.root.configItems:
                     self.root.configItems[cid].setCheck(False)
-        self.root.updateDisabledItems()
+                    changed.append(self.root.configItems[cid])
+        self.root.updateDisabledItems(changed)
         evt.Skip()
 
 
@@ -735,7 +395,7 @@ class ConfigWidget(wx.Panel, ConfigBase):
         """ Handle focus leaving the field; update other, potentially dependent
             fields.
         """
-        self.root.updateDisabledItems()
+        self.root.updateDisabledItems(self)
         evt.Skip()
 
 
@@ -746,14 +406,11 @@ class ConfigWidget(wx.Panel, ConfigBase):
 # ===============================================================================
 
 @registerField
-class BooleanField(ConfigWidget):
+class BooleanField(fields.BooleanField, ConfigWidget):
     """ UI widget for editing a Boolean value. This is a special case; although
         it is a checkbox, it is not considered a 'check' field because the
         check *is* its value.
     """
-    CHECK = True
-
-    DEFAULT_TYPE = "BooleanValue"
 
 
     def setDisplayValue(self, val, check=False):
@@ -774,30 +431,15 @@ class BooleanField(ConfigWidget):
 # ===============================================================================
 
 @registerField
-class TextField(ConfigWidget):
+class TextField(fields.TextField, ConfigWidget):
     """ UI widget for editing Unicode text.
     """
-    CLASS_ARGS = {'MaxLength': 'maxLength',
-                  'TextLines': 'textLines'}
-
     UNITS = False
 
-    DEFAULT_TYPE = "TextValue"
-
     # String of valid characters. 'None' means all are valid.
     VALID_CHARS = None
 
 
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault('default', '')
-        self.setAttribDefault('textLines', 1)
-        super(TextField, self).__init__(*args, **kwargs)
-
-
     def isValid(self, s):
         """ Filter for characters valid in the text field. Used by the field's
             Validator. It just checks the string contents vs. `VALID_CHARS` and
@@ -850,11 +492,9 @@ class TextField(ConfigWidget):
 # ===============================================================================
 
 @registerField
-class ASCIIField(TextField):
+class ASCIIField(fields.ASCIIField, TextField):
     """ UI widget for editing ASCII text.
     """
-    DEFAULT_TYPE = "ASCIIValue"
-
     # String of valid characters, limited to the printable part of 7b ASCII.
     VALID_CHARS = string.printable
 
@@ -862,26 +502,9 @@ class ASCIIField(TextField):
 # ===============================================================================
 
 @registerField
-class IntField(ConfigWidget):
+class IntField(fields.IntField, ConfigWidget):
     """ UI widget for editing a signed integer.
     """
-    DEFAULT_TYPE = "IntValue"
-
-    # Min/max integers supported by wxPython SpinCtrl
-    MAX_SIGNED_INT = 2 ** 31 - 1
-    MIN_SIGNED_INT = -2 ** 31
-
-
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        # Set some default values
-        self.setAttribDefault('default', 0)
-        self.setAttribDefault('max', self.MAX_SIGNED_INT)
-        self.setAttribDefault('min', self.MIN_SIGNED_INT)
-        super(IntField, self).__init__(*args, **kwargs)
 
 
     def addField(self):
@@ -909,53 +532,20 @@ class IntField(ConfigWidget):
             self.field.Enable(enabled)
         wx.Panel.Enable(self, enabled)
 
-
-    def getConfigValue(self):
-        """ Get the widget's value, as written to the config file.
-        """
-        val = super().getConfigValue()
-        if val is None:
-            return None
-        return int(val)
-
-
 # ===============================================================================
 
 @registerField
-class UIntField(IntField):
+class UIntField(fields.UIntField, IntField):
     """ UI widget for editing an unsigned integer.
     """
-    DEFAULT_TYPE = "UIntValue"
-
-
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault('min', 0)
-        super(UIntField, self).__init__(*args, **kwargs)
 
 
 # ===============================================================================
 
 @registerField
-class FloatField(IntField):
+class FloatField(fields.FloatField, IntField):
     """ UI widget for editing a floating-point value.
     """
-    DEFAULT_TYPE = "FloatValue"
-
-    CLASS_ARGS = {'FloatIncrement': 'increment'}
-
-
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault('increment', 0.25)
-        self.setAttribDefault("floatDigits", 2)
-        super(FloatField, self).__init__(*args, **kwargs)
 
 
     def addField(self):
@@ -973,23 +563,12 @@ class FloatField(IntField):
 # ===============================================================================
 
 @registerField
-class EnumField(ConfigWidget):
+class EnumField(fields.EnumField, ConfigWidget):
     """ UI widget for selecting one of several items from a list.
     """
-    DEFAULT_TYPE = "UIntValue"
-
     UNITS = False
 
 
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault('default', 0)
-        super(EnumField, self).__init__(*args, **kwargs)
-
-
     def initUI(self):
         optionEls = [el for el in self.element.value if el.name == "EnumOption"]
         self.options = [EnumOption(el, self, n) for n, el in enumerate(optionEls)]
@@ -1025,7 +604,7 @@ class EnumField(ConfigWidget):
         """ Handle option selected.
         """
         self.updateToolTips()
-        self.root.updateDisabledItems()
+        self.root.updateDisabledItems(self)
         evt.Skip()
 
 
@@ -1067,46 +646,16 @@ class EnumField(ConfigWidget):
         wx.Panel.Enable(self, enabled)
 
 
-# ===============================================================================
-
-class EnumOption(ConfigBase):
-    """ One choice in an enumeration (e.g. an item in a drop-down list). Note:
-        unlike the other classes, this is not itself a UI field.
-    """
-    DEFAULT_TYPE = "UIntValue"
-
-
-    def __init__(self, element, parent, index, **kwargs):
-        """ Constructor.
-
-            :keyword element: The EBML element for which the enumeration option
-                is being generated.
-            :param parent: The parent `EnumField`.
-        """
-        super(EnumOption, self).__init__(element, parent.root, **kwargs)
-        self.parent = parent
-        self.checkbox = None
-
-        if self.default is None:
-            self.value = index
-        else:
-            self.value = self.default
-
-        if self.label is None:
-            self.label = u"%s" % self.value
-
-
 # ===============================================================================
 
 @registerField
-class BitField(EnumField):
+class BitField(fields.BitField, EnumField):
     """ A widget representing a set of bits in an unsigned integer, with
         individual checkboxes for each bit. A subclass of `EnumField`, each
         `EnumOption` creates a checkbox; its value indicates the index of the
         corresponding bit (0 is the first bit, 1 is the second, 2 is the third,
         etc.).
     """
-    DEFAULT_TYPE = "UIntValue"
 
 
     def addField(self):
@@ -1211,19 +760,18 @@ class BitField(EnumField):
             for o in self.options:
                 dis = o.isDisabled()
                 o.checkbox.Enable(not dis)
-                if dis:
+                if dis and o.checkbox.GetValue() != bool(o.default):
                     o.checkbox.SetValue(bool(o.default))
+                    # The field's value changed; discard any cached values.
+                    self.root.displayValues.invalidate()
 
 
 # ===============================================================================
 
 @registerField
-class DateTimeField(IntField):
+class DateTimeField(fields.DateTimeField, IntField):
     """ UI widget for editing a date/time value.
     """
-    DEFAULT_TYPE = "IntValue"
-    LABEL = False
-
     LOCAL_TIME = 0
     UTC_TIME = 1
 
@@ -1347,26 +895,10 @@ class DateTimeField(IntField):
 # ===============================================================================
 
 @registerField
-class UTCOffsetField(FloatField):
+class UTCOffsetField(fields.UTCOffsetField, FloatField):
     """ Special-case UI widget for entering the local UTC offset, with the
         ability to get the value from the computer.
     """
-    DEFAULT_TYPE = "IntValue"
-
-
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault('min', -23.0)
-        self.setAttribDefault('max', 23.0)
-        self.setAttribDefault('units', "Hours")
-        self.setAttribDefault('increment', 0.5)
-        self.setAttribDefault('displayFormat', "x/3600.0")
-        self.setAttribDefault('valueFormat', "x*3600")
-        self.setAttribDefault("label", "Local UTC Offset")
-        super(UTCOffsetField, self).__init__(*args, **kwargs)
 
 
     def initUI(self):
@@ -1393,23 +925,13 @@ class UTCOffsetField(FloatField):
         self.setDisplayValue(getUtcOffset())
 
 
-    def getConfigValue(self):
-        """ Get the widget's value, as written to the config file.
-        """
-        val = super().getConfigValue()
-        if val is None:
-            return None
-        return int(val)
-
-
 # ===============================================================================
 
 @registerField
-class BinaryField(ConfigWidget):
+class BinaryField(fields.BinaryField, ConfigWidget):
     """ Special-case UI widget for selecting binary data.
         FOR FUTURE IMPLEMENTATION.
     """
-    DEFAULT_TYPE = "BinaryValue"
 
 
     def addField(self):
@@ -1426,80 +948,70 @@ class BinaryField(ConfigWidget):
 # ===============================================================================
 
 @registerField
-class CheckTextField(TextField):
+class CheckTextField(fields.CheckTextField, TextField):
     """ UI widget (with a checkbox) for editing Unicode text.
     """
-    CHECK = True
 
 
 @registerField
-class CheckASCIIField(ASCIIField):
+class CheckASCIIField(fields.CheckASCIIField, ASCIIField):
     """ UI widget (with a checkbox) for editing ASCII text.
     """
-    CHECK = True
 
 
 @registerField
-class CheckIntField(IntField):
+class CheckIntField(fields.CheckIntField, IntField):
     """ UI widget (with a checkbox) for editing a signed integer.
     """
-    CHECK = True
 
 
 @registerField
-class CheckUIntField(UIntField):
+class CheckUIntField(fields.CheckUIntField, UIntField):
     """ UI widget (with a checkbox) for editing an unsigned integer.
     """
-    CHECK = True
 
 
 @registerField
-class CheckFloatField(FloatField):
+class CheckFloatField(fields.CheckFloatField, FloatField):
     """ UI widget (with a checkbox) for editing a floating-point value.
     """
-    CHECK = True
 
 
 @registerField
-class CheckEnumField(EnumField):
+class CheckEnumField(fields.CheckEnumField, EnumField):
     """ UI widget (with a checkbox) for selecting one of several items from a
         list.
     """
-    CHECK = True
 
 
 @registerField
-class CheckBitField(BitField):
+class CheckBitField(fields.CheckBitField, BitField):
     """ A widget (with a checkbox) representing a set of bits in an unsigned
         integer, with individual checkboxes for each bit. A subclass of
         `EnumField`, each `EnumOption` creates a checkbox; its value indicates
         the index of the corresponding bit (0 is the first bit, 1 is the
         second, 2 is the third, etc.).
     """
-    CHECK = True
 
 
 @registerField
-class CheckDateTimeField(DateTimeField):
+class CheckDateTimeField(fields.CheckDateTimeField, DateTimeField):
     """ UI widget (with a checkbox) for editing a date/time value.
     """
-    CHECK = True
 
 
 @registerField
-class CheckUTCOffsetField(UTCOffsetField):
+class CheckUTCOffsetField(fields.CheckUTCOffsetField, UTCOffsetField):
     """ Special-case UI widget (with a checkbox) for entering the local UTC
         offset, with the ability to get the value from the computer.
     """
-    CHECK = True
 
 
 @registerField
-class CheckBinaryField(BinaryField):
+class CheckBinaryField(fields.CheckBinaryField, BinaryField):
     """ Special-case UI widget (with a checkbox) for selecting binary data.
         FOR FUTURE IMPLEMENTATION.
     """
-    CHECK = True
 
 
 # ===============================================================================
@@ -1509,56 +1021,29 @@ class CheckBinaryField(BinaryField):
 # ===============================================================================
 
 @registerField
-class FloatTemperatureField(FloatField):
+class FloatTemperatureField(fields.FloatTemperatureField, FloatField):
     """ `FloatField` variant with appropriate defaults for temperature display.
     """
 
 
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault("units", u"\u00b0C")
-        self.setAttribDefault("label", "Temperature")
-        self.setAttribDefault("min", -40.0)
-        self.setAttribDefault("max", 80.0)
-        super(FloatTemperatureField, self).__init__(*args, **kwargs)
-
-
 @registerField
-class CheckFloatTemperatureField(FloatTemperatureField):
+class CheckFloatTemperatureField(fields.CheckFloatTemperatureField, FloatTemperatureField):
     """ `CheckFloatField` variant with appropriate defaults for temperature
         display.
     """
-    CHECK = True
 
 
 @registerField
-class FloatAccelerationField(FloatField):
+class FloatAccelerationField(fields.FloatAccelerationField, FloatField):
     """ `FloatField` variant with appropriate defaults for acceleration display.
     """
 
 
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault("units", u"g")
-        self.setAttribDefault("label", "Acceleration")
-        self.setAttribDefault("min", -100.0)
-        self.setAttribDefault("max", 100.0)
-        self.setAttribDefault("default", 5.0)
-        super(FloatAccelerationField, self).__init__(*args, **kwargs)
-
-
 @registerField
-class CheckFloatAccelerationField(FloatAccelerationField):
+class CheckFloatAccelerationField(fields.CheckFloatAccelerationField, FloatAccelerationField):
     """ `CheckFloatField` variant with appropriate defaults for acceleration
         display.
     """
-    CHECK = True
 
 
 # ===============================================================================
@@ -1566,24 +1051,12 @@ class CheckFloatAccelerationField(FloatAccelerationField):
 # ===============================================================================
 
 @registerField
-class CheckDriftButton(ConfigWidget):
+class CheckDriftButton(fields.CheckDriftButton, ConfigWidget):
     """ Special-case "field" consisting of a button that checks the recorder's
         clock versus the host computer's time. It does not affect the config
         data.
     """
     UNITS = False
-    DEFAULT_TYPE = None
-
-
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault("label", "Check Clock Drift")
-        self.setAttribDefault("tooltip", "Read the recorder's clock and "
-                                         "compare to the current system time.")
-        super(CheckDriftButton, self).__init__(*args, **kwargs)
 
 
     def initUI(self):
@@ -1627,7 +1100,7 @@ class CheckDriftButton(ConfigWidget):
 
 
 @registerField
-class VerticalPadding(ConfigWidget):
+class VerticalPadding(fields.VerticalPadding, ConfigWidget):
     """ Special-case "field" that simply provides resizeable vertical padding,
         so the  fields following it appear at the bottom of the dialog. Note
         that this is handled as a special case by `Group.addChild()`.
@@ -1639,23 +1112,12 @@ class VerticalPadding(ConfigWidget):
 
 
 @registerField
-class ResetButton(CheckDriftButton):
+class ResetButton(fields.ResetButton, CheckDriftButton):
     """ Special-case "field" that consists of a button that resets all its
         sibling fields in its group or tab.
     """
 
 
-    def __init__(self, *args, **kwargs):
-        """ Constructor.
-
-            :see: `ConfigWidget.__init__()`
-        """
-        self.setAttribDefault("label", "Reset to Defaults")
-        self.setAttribDefault("tooltip", "Reset this set of fields to their "
-                                         "default values")
-        super(ResetButton, self).__init__(*args, **kwargs)
-
-
     def OnButtonPress(self, evt):
         """ Handle button press: reset sibling fields to the factory defaults.
         """
@@ -1668,63 +1130,20 @@ class ResetButton(CheckDriftButton):
 # ===============================================================================
 
 @registerField
-class Group(ConfigWidget):
+class Group(fields.Group, ConfigWidget):
     """ A labeled group of configuration items. Children appear indented.
     """
-    # Should this group get a heading label?
-    LABEL = True
-
-    # Default types for Fields in the EBML schema with no specialized
-    # subclasses. The low byte of a Field's EBML ID denotes its type.
-    # Note: The Field must appear in the EBML schema, so it will be identified
-    # as a CONTAINER ('master') type.
-    DEFAULT_FIELDS = {
-        0x00: BooleanField,
-        0x01: UIntField,
-        0x02: IntField,
-        0x03: FloatField,
-        0x04: ASCIIField,
-        0x05: TextField,
-        0x06: BinaryField,
-        0x07: EnumField,
-
-        0x10: BooleanField,
-        0x11: CheckUIntField,
-        0x12: CheckIntField,
-        0x13: CheckFloatField,
-        0x14: CheckASCIIField,
-        0x15: CheckTextField,
-        0x16: CheckBinaryField,
-        0x17: CheckEnumField,
-
-        0x22: DateTimeField,
-        0x32: CheckDateTimeField
-    }
-
-    DEFAULT_TYPE = None
 
 
     @classmethod
     def getWidgetClass(cls, el):
-        """ Get the appropriate class for an EBML *Field element. Elements
-            without a specialized subclass will get a generic widget for their
-            basic data type.
-
-            Note: does not handle IDs not present in the schema!
+        """ Get the appropriate widget class for an EBML *Field element: the
+            one for its definition (see `fields.Group.getFieldType()`).
         """
-        if el.name in FIELD_TYPES:
-            return FIELD_TYPES[el.name]
-
-        if el.id & 0xFF00 == 0x4000:
-            # All field EBML IDs have 0x40 as their 2nd byte. Bits 0-3 denote
-            # the 'base' type; bit 4 denotes if the field has a checkbox.
-            baseId = el.id & 0x001F
-            if baseId in cls.DEFAULT_FIELDS:
-                return cls.DEFAULT_FIELDS[baseId]
-            else:
-                raise NameError("Unknown field type: %s" % el.name)
-
-        return None
+        fieldType = cls.getFieldType(el)
+        if fieldType is None:
+            return None
+        return FIELD_TYPES[fieldType.__name__]
 
 
     def addChild(self, el, flags=wx.ALIGN_LEFT | wx.EXPAND | wx.NORTH, border=4):
@@ -1821,12 +1240,10 @@ class Group(ConfigWidget):
 
 
 @registerField
-class CheckGroup(Group):
+class CheckGroup(fields.CheckGroup, Group):
     """ A labeled group of configuration items with a checkbox to enable or
         disable them all. Children appear indented.
     """
-    CHECK = True
-    DEFAULT_TYPE = "BooleanValue"
 
 
     def setToDefault(self, check=False):
@@ -1841,12 +1258,13 @@ class CheckGroup(Group):
 # ===============================================================================
 
 @registerTab
-class Tab(SP.ScrolledPanel, Group):
+class Tab(fields.Tab, SP.ScrolledPanel, Group):
     """ One tab of configuration items. All configuration dialogs contain at
         least one. The Tab's label is used as the name shown on the tab.
     """
-    LABEL = False
-    CHECK = False
+    # Should the tab's contents be built only when it is first shown? Until
+    # then, the state of its fields is held by its `model` (if any).
+    LAZY = True
 
 
     def __init__(self, *args, **kwargs):
@@ -1857,9 +1275,13 @@ class Tab(SP.ScrolledPanel, Group):
                 being generated. The element's name typically matches that of
                 the class.
             :keyword root: The main dialog.
+            :keyword model: The tab's item in the dialog's `ConfigModel`
+                (if any), from which the fields' values are copied when the
+                tab is built.
         """
         element = kwargs.pop('element', None)
         root = kwargs.pop('root', self)
+        self.model = kwargs.pop('model', None)
         self.group = None
 
         # Explicitly call __init__ of base classes to avoid ConfigWidget stuff
@@ -1868,8 +1290,37 @@ class Tab(SP.ScrolledPanel, Group):
 
         self.SetupScrolling()
 
+        self.built = False
+        if not self.LAZY:
+            self.build()
+
+
+    def build(self):
+        """ Build the contents of the tab, if they have not already been
+            built. Lazy tabs are built when first shown.
+
+            :return: `True` if the tab was built, `False` if it had already
+                been built.
+        """
+        if self.built:
+            return False
+
+        self.built = True
+        t0 = time.perf_counter()
         self.initUI()
 
+        if self.model is not None and self.HAS_FIELDS:
+            # The new widgets have replaced the model's items; give them the
+            # model's state.
+            self.model.copyTo(self)
+            self.root.updateDisabledItems()
+
+        if self.LAZY:
+            self.Layout()
+            logger.debug("Built %s in %.3f s" % (self.__class__.__name__,
+                                                 time.perf_counter() - t0))
+        return True
+
 
     def initUI(self):
         """ Build the contents of the tab.
@@ -0,0 +1,322 @@
+"""
+Per-device command brokers. Everything in the application that sends
+commands to a recorder (the device scanning thread, the control buttons,
+the Wi-Fi tab's threads, the configuration dialog) does so through the
+device's broker, which runs them one at a time in a single worker thread:
+
+* Commands to the same device never collide, so they don't need to be
+  coordinated by pausing or stopping other threads, and devices rarely
+  report ``ERR_BUSY`` (commands that get it anyway are retried).
+* Queued commands are run in order of priority: commands resulting from
+  user interaction (`INTERACTIVE`) run before background polling
+  (`BACKGROUND`).
+* Duplicate requests (e.g., status queries from several pollers) are
+  coalesced: a request with the same `key` as one that is already queued
+  or running shares its result, instead of being sent again.
+
+Each device has only one broker (see `getBroker()`), and so a single
+connection to the device is used by one thread at a time. The worker
+thread stops after it has been idle for a while, and is restarted by the
+next command.
+
+Brokers have no GUI dependencies.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeout
+import heapq
+from itertools import count
+import logging
+import threading
+from time import monotonic, sleep
+from typing import Any, Callable, Hashable, Optional
+import weakref
+
+from endaq.device import DeviceError
+from endaq.device.response_codes import DeviceStatusCode
+
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# Command priorities. Lower numbers run first.
+INTERACTIVE, NORMAL, BACKGROUND = range(3)
+
+# The interval (in seconds) at which `CommandBroker.call()` checks its
+# `cancel` callback while waiting.
+CANCEL_CHECK_INTERVAL = 0.1
+
+
+class CommandJob(object):
+    """ A command queued in a `CommandBroker`.
+    """
+
+    __slots__ = ('func', 'args', 'kwargs', 'key', 'priority', 'future',
+                 'started')
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict,
+                 key: Optional[Hashable], priority: int):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.priority = priority
+        self.future = Future()
+        self.started = False
+
+
+class CommandBroker(object):
+    """ Runs the commands sent to one device, one at a time and in order of
+        priority, coalescing duplicate requests.
+    """
+
+    def __init__(self,
+                 device,
+                 retries: int = 2,
+                 busyDelay: float = 0.25,
+                 idleTimeout: float = 30):
+        """ Runs the commands sent to one device. Generally, brokers should
+            be gotten with `getBroker()` rather than instantiated directly.
+
+            :param device: The recorder (an `endaq.device.Recorder`).
+            :param retries: The number of times to retry a command if the
+                device reports it is busy (``ERR_BUSY``).
+            :param busyDelay: Time (in seconds) to wait before retrying a
+                command if the device is busy.
+            :param idleTimeout: Time (in seconds) without commands after
+                which the worker thread stops.
+        """
+        # Only the name is kept, so the broker doesn't keep the device alive
+        # (see `getBroker()`).
+        self.name = str(device)
+        self.retries = retries
+        self.busyDelay = busyDelay
+        self.idleTimeout = idleTimeout
+
+        self.queue = []  # heap of (priority, sequence, job)
+        self.jobs = {}  # Queued or running jobs, keyed by coalescing key
+        self.thread = None
+        self.closed = False
+        self._counter = count()
+        self._lock = threading.Condition()
+
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.name} queued={len(self.queue)}>"
+
+
+    def submit(self,
+               func: Callable,
+               *args,
+               priority: int = NORMAL,
+               key: Optional[Hashable] = None,
+               **kwargs) -> Future:
+        """ Queue a command. Other arguments and keyword arguments are used
+            when calling `func` (like `functools.partial`).
+
+            :param func: The function to call, typically a method of the
+                device or its command interface.
+            :param priority: The command's priority: `INTERACTIVE`,
+                `NORMAL`, or `BACKGROUND`.
+            :param key: If not `None`, a key identifying equivalent
+                requests. If one with the same key is already queued or
+                running, its `Future` is returned instead.
+            :return: A `concurrent.futures.Future` for the command's result.
+        """
+        with self._lock:
+            if self.closed:
+                raise RuntimeError(f"{self!r} is closed")
+
+            if key is not None and key in self.jobs:
+                job = self.jobs[key]
+                if priority < job.priority and not job.started:
+                    # Re-queue with the higher priority; the old entry will
+                    # be skipped (see `_next()`).
+                    job.priority = priority
+                    heapq.heappush(self.queue, (priority, next(self._counter), job))
+                    self._lock.notify()
+                return job.future
+
+            job = CommandJob(func, args, kwargs, key, priority)
+            if key is not None:
+                self.jobs[key] = job
+            heapq.heappush(self.queue, (priority, next(self._counter), job))
+
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True,
+                                               name=f"CommandBroker-{self.name}")
+                self.thread.start()
+            else:
+                self._lock.notify()
+
+        return job.future
+
+
+    def call(self,
+             func: Callable,
+             *args,
+             priority: int = INTERACTIVE,
+             key: Optional[Hashable] = None,
+             timeout: Optional[float] = None,
+             cancel: Optional[Callable] = None,
+             **kwargs) -> Any:
+        """ Run a command and wait for its result. Other arguments and
+            keyword arguments are used when calling `func`.
+
+            :param func: The function to call.
+            :param priority: The command's priority. Defaults to
+                `INTERACTIVE`.
+            :param key: If not `None`, a key identifying equivalent
+                requests (see `submit()`).
+            :param timeout: Time (in seconds) to wait for the result, or
+                `None` to wait indefinitely. This includes the time spent
+                waiting for earlier commands.
+            :param cancel: A function that returns `True` if the caller no
+                longer wants the result (e.g., its thread is stopping). A
+                command that hasn't started yet is removed from the queue;
+                one already running should be given the same function as
+                its own `callback`, if it takes one.
+            :return: The command's result. Exceptions raised by the command
+                are re-raised; a `TimeoutError` is raised if the timeout
+                expires, and a `concurrent.futures.CancelledError` if the
+                call was cancelled.
+        """
+        future = self.submit(func, *args, priority=priority, key=key, **kwargs)
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            wait = None if deadline is None else max(0, deadline - monotonic())
+            if cancel is not None:
+                wait = CANCEL_CHECK_INTERVAL if wait is None else min(wait, CANCEL_CHECK_INTERVAL)
+
+            try:
+                return future.result(wait)
+            except FutureTimeout:
+                if future.done():
+                    # The command itself timed out (e.g., `DeviceTimeout`)
+                    raise
+                if deadline is not None and monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.name} to run {func}")
+
+            if cancel is not None and cancel():
+                if key is None:
+                    # Coalesced requests may be shared; leave those.
+                    future.cancel()
+                raise CancelledError(f"Cancelled waiting for {self.name} to run {func}")
+
+
+    def _next(self) -> Optional[CommandJob]:
+        """ Get the next job to run, waiting if there are none. Called with
+            the lock held.
+
+            :return: The next job, or `None` if the broker has been idle
+                too long (or closed).
+        """
+        while not self.closed:
+            while self.queue:
+                _priority, _seq, job = heapq.heappop(self.queue)
+                if not job.started and not job.future.done():
+                    job.started = True
+                    return job
+            if not self._lock.wait(self.idleTimeout) and not self.queue:
+                break
+        return None
+
+
+    def _run(self):
+        """ The worker thread's main loop.
+        """
+        while True:
+            with self._lock:
+                job = self._next()
+                if job is None:
+                    self.thread = None
+                    return
+
+            if not job.future.set_running_or_notify_cancel():
+                self._finish(job)
+                continue
+
+            try:
+                result = self._execute(job)
+            except BaseException as err:
+                self._finish(job)
+                job.future.set_exception(err)
+            else:
+                self._finish(job)
+                job.future.set_result(result)
+
+
+    def _execute(self, job: CommandJob) -> Any:
+        """ Run a job's command, retrying if the device reports it is busy.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                return job.func(*job.args, **job.kwargs)
+            except DeviceError as err:
+                busy = err.args and err.args[0] == DeviceStatusCode.ERR_BUSY
+                if not busy or attempt >= self.retries or self.closed:
+                    raise
+                logger.debug(f"{self.name} reported ERR_BUSY, retrying {job.func}")
+                sleep(self.busyDelay)
+
+
+    def _finish(self, job: CommandJob):
+        """ Remove a finished job's coalescing key, so later requests are
+            run anew.
+        """
+        with self._lock:
+            if job.key is not None and self.jobs.get(job.key) is job:
+                del self.jobs[job.key]
+
+
+    def close(self):
+        """ Cancel all queued commands and stop the worker thread. The
+            command being run (if any) is allowed to finish.
+        """
+        with self._lock:
+            self.closed = True
+            for _priority, _seq, job in self.queue:
+                job.future.cancel()
+            self.queue.clear()
+            self.jobs.clear()
+            self._lock.notify_all()
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# Brokers are removed when their devices are no longer referenced elsewhere.
+_brokers = weakref.WeakKeyDictionary()
+_brokersLock = threading.Lock()
+
+
+def getBroker(device) -> CommandBroker:
+    """ Get the command broker for a device, creating it if necessary.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :return: The device's `CommandBroker`.
+    """
+    with _brokersLock:
+        broker = _brokers.get(device)
+        if broker is None or broker.closed:
+            broker = _brokers[device] = CommandBroker(device)
+        return broker
+
+
+def closeBroker(device):
+    """ Close a device's command broker, if it has one (e.g., after the
+        device has been disconnected).
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+    """
+    with _brokersLock:
+        broker = _brokers.pop(device, None)
+    if broker is not None:
+        broker.close()
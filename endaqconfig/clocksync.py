@@ -0,0 +1,261 @@
+"""
+Setting the clocks of many recorders at once, as closely together as
+possible. Each device's command latency is measured first. The devices are
+then set in batches (one device per worker thread); every device in a batch
+is sent the same whole-second target time, with each command sent early by
+that device's estimated one-way latency, so the clocks change at (nearly)
+the moment the host's clock reaches the target. The results include each device's clock offset, the round-trip
+time of its commands, and a bound on the skew between all the devices set.
+
+Recorder clocks have a resolution of one second, so offsets read from a
+device are only accurate to about half a second. The skew bound, however,
+is computed from the host's own clock, and is usually much smaller.
+
+Commands are sent through each device's `CommandBroker`. These have no GUI
+dependencies; the device selection dialog runs them in a background thread.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+from math import ceil
+from time import sleep, time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .broker import getBroker
+
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# The default maximum number of devices accessed simultaneously.
+DEFAULT_WORKERS = 8
+
+# The default offset (in seconds) past which a clock is considered to have
+# drifted, and is (re-)set.
+DEFAULT_THRESHOLD = 1.0
+
+# The minimum time (in seconds) between the start of the 'set' phase and the
+# target time, giving every worker time to get ready.
+MIN_LEAD = 0.25
+
+
+class ClockResult(object):
+    """ The result of synchronizing one recorder's clock.
+    """
+
+    __slots__ = ('device', 'offset', 'rtt', 'sent', 'duration', 'attempts',
+                 'error', 'set')
+
+    def __init__(self, device):
+        self.device = device
+        self.offset = None  # Device clock minus host clock (seconds)
+        self.rtt = None  # Round-trip time of reading the clock (seconds)
+        self.sent = None  # Time the set command was sent, relative to target
+        self.duration = None  # Time taken by the set command (seconds)
+        self.attempts = 0  # Number of times the clock was set
+        self.error = None  # The last exception raised, if any
+        self.set = False  # `True` if the clock was set successfully
+
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} {self.device} offset={self.offset} "
+                f"rtt={self.rtt} set={self.set}>")
+
+
+    @property
+    def failed(self) -> bool:
+        """ Did the last attempt to read or set the clock fail? """
+        return self.error is not None
+
+
+    @property
+    def bound(self) -> Optional[float]:
+        """ The maximum difference (in seconds) between the target time and
+            the moment the device's clock was actually set, or `None` if it
+            was not set.
+        """
+        if not self.set:
+            return None
+        return max(abs(self.sent), abs(self.sent + self.duration))
+
+
+    def asDict(self) -> Dict[str, Any]:
+        """ Get the result as a dictionary, suitable for JSON. """
+        dev = self.device
+        return {'serial': getattr(dev, 'serial', None),
+                'path': getattr(dev, 'path', None),
+                'offset': self.offset,
+                'rtt': self.rtt,
+                'set': self.set,
+                'attempts': self.attempts,
+                'bound': self.bound,
+                'error': None if self.error is None else repr(self.error)}
+
+
+def measureClock(device, result: ClockResult, timeout: float = 3) -> ClockResult:
+    """ Read a recorder's clock, measuring its offset from the host's clock
+        and the round-trip time of the command.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param result: The `ClockResult` to update.
+        :param timeout: Time (in seconds) to wait for the device.
+        :return: The updated `ClockResult`.
+    """
+    try:
+        t0 = time()
+        _sysTime, devTime = getBroker(device).call(partial(device.getTime,
+                                                           timeout=timeout))
+        t1 = time()
+
+        # The device clock is in whole seconds; use the middle of that second
+        # and the middle of the host's request.
+        result.rtt = t1 - t0
+        result.offset = (devTime + 0.5) - (t0 + t1) / 2
+        result.error = None
+
+    except Exception as err:
+        logger.debug(f"Could not read clock of {device}: {err!r}")
+        result.error = err
+
+    return result
+
+
+def setClock(device,
+             result: ClockResult,
+             target: int,
+             timeout: float = 3) -> ClockResult:
+    """ Set a recorder's clock to a specific time, sending the command early
+        by the device's estimated one-way latency (half its round-trip
+        time), so the clock is set as close as possible to the moment the
+        host's clock reaches the target time.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param result: The device's `ClockResult`, from `measureClock()`.
+        :param target: The time to set, as whole seconds since the epoch.
+        :param timeout: Time (in seconds) to wait for the device.
+        :return: The updated `ClockResult`.
+    """
+    latency = (result.rtt or 0) / 2
+    delay = target - latency - time()
+    if delay > 0:
+        sleep(delay)
+
+    result.attempts += 1
+    try:
+        t0 = time()
+        getBroker(device).call(partial(device.setTime, target, timeout=timeout))
+        t1 = time()
+
+        result.sent = t0 - target
+        result.duration = t1 - t0
+        result.set = True
+        result.error = None
+
+    except Exception as err:
+        logger.error(f"Could not set clock of {device}: {err!r}")
+        result.set = False
+        result.error = err
+
+    return result
+
+
+def skewBound(results: Iterable[ClockResult]) -> Optional[float]:
+    """ Compute the maximum possible difference (in seconds) between the
+        clocks of all the devices that were set, based on when each device's
+        set command was sent and completed.
+
+        :param results: `ClockResult` objects (from `syncClocks()`).
+        :return: The skew bound, or `None` if no devices were set.
+    """
+    results = [r for r in results if r.set]
+    if not results:
+        return None
+    return (max(r.sent + r.duration for r in results)
+            - min(r.sent for r in results))
+
+
+def syncClocks(devices: Iterable,
+               threshold: Optional[float] = None,
+               retries: int = 1,
+               timeout: float = 3,
+               workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """ Set the clocks of several recorders to the same time, compensating
+        for each device's command latency.
+
+        :param devices: The recorders (`endaq.device.Recorder` instances).
+        :param threshold: If not `None`, only set the clocks of devices
+            whose offset from the host's clock exceeds this many seconds
+            (or whose clocks could not be read). `None` sets all of them.
+        :param retries: The number of times to re-set clocks which are
+            still off by more than the threshold (or `DEFAULT_THRESHOLD`)
+            after being set, or which failed to set.
+        :param timeout: Time (in seconds) to wait for each device command.
+        :param workers: The maximum number of devices accessed at once.
+            Clocks are set in batches of this size, each batch with its own
+            target time.
+        :return: A dictionary containing the `ClockResult` of each device
+            (``results``), those which failed (``failed``), the skew bound
+            of the devices set (``skew``, seconds), and the total time.
+    """
+    t0 = time()
+    results = {dev: ClockResult(dev) for dev in devices}
+    if not results:
+        return {'results': {}, 'failed': [], 'skew': None, 'time': 0}
+
+    limit = DEFAULT_THRESHOLD if threshold is None else threshold
+
+    size = max(1, min(workers, len(results)))
+    with ThreadPoolExecutor(max_workers=size,
+                            thread_name_prefix='clocksync') as pool:
+
+        def measure(devs: List):
+            list(pool.map(lambda d: measureClock(d, results[d], timeout), devs))
+
+        def setAll(devs: List):
+            # Devices are set in batches no larger than the pool, so every
+            # command in a batch can wait for the same target at once. Each
+            # batch gets its own target: a whole second far enough away for
+            # its slowest device's command to be sent in time. With a single
+            # shared target, queued commands would be sent after it passed.
+            for i in range(0, len(devs), size):
+                batch = devs[i:i + size]
+                lead = max(MIN_LEAD, max((results[d].rtt or 0) for d in batch))
+                target = int(ceil(time() + lead))
+                logger.debug(f"Setting {len(batch)} clock(s) to {target}")
+                list(pool.map(lambda d: setClock(d, results[d], target, timeout),
+                              batch))
+
+        measure(list(results))
+        if threshold is None:
+            toSet = list(results)
+        else:
+            toSet = [d for d, r in results.items()
+                     if r.offset is None or abs(r.offset) > threshold]
+
+        for attempt in range(retries + 1):
+            if not toSet:
+                break
+            setAll(toSet)
+            measure(toSet)
+            toSet = [d for d in toSet
+                     if results[d].failed or abs(results[d].offset) > limit]
+            if toSet and attempt < retries:
+                logger.info(f"Re-setting {len(toSet)} drifted clock(s)")
+
+    failed = [r for r in results.values() if r.failed or r.device in toSet]
+    skew = skewBound(results.values())
+
+    logger.info(f"Set {sum(r.set for r in results.values())} of "
+                f"{len(results)} clock(s), skew bound {skew}, "
+                f"{len(failed)} failed")
+
+    return {'results': results,
+            'failed': failed,
+            'skew': skew,
+            'time': time() - t0}
@@ -1,5 +1,7 @@
 """
 Small utility functions, 'constants', and such, used by multiple files.
+wxPython is only imported by the functions that use it, so the others are
+available to the modules that don't require it (e.g., `model`).
 
 :author: dstokes
 """
@@ -9,8 +11,6 @@ from datetime import datetime
 import sys
 import time
 
-import wx
-
 try:
     from ctypes import windll
 
@@ -37,6 +37,8 @@ def datetime2int(val, tzOffset=0):
     """ Convert a date/time object (either a standard Python datetime.datetime
         or wx.DateTime) into the UTC epoch time (i.e. UNIX time stamp).
     """
+    import wx
+
     if isinstance(val, wx.DateTime):
         return val.GetTicks() + tzOffset
     return int(calendar.timegm(val.utctimetuple()) + tzOffset)
@@ -55,6 +57,8 @@ def makeWxDateTime(val):
         (or a similar 'normal' tuple), epoch timestamp, or another
         `wx.DateTime` object.
     """
+    import wx
+
     if isinstance(val, datetime):
         val = datetime2int(val)
     if isinstance(val, (int, float)):
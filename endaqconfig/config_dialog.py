@@ -27,6 +27,7 @@ Basic theory of operation:
 import errno
 import logging
 import os
+import time
 from typing import Any, Dict, Optional, Union
 
 import wx
@@ -38,8 +39,11 @@ from endaq.device import Recorder, configio, ConfigError
 
 from .base import logger
 from . import base
+from .broker import getBroker
+from . import model
 from .common import isCompiled
 from .widgets import icons
+from .widgets.calibration_editor import TransformUsage
 
 # Widgets. Even though these modules aren't used directly, they need to be
 # imported so that their contents can get into the `base.TAB_TYPES` dictionary.
@@ -83,6 +87,7 @@ class ConfigDialog(SC.SizedDialog):
             :param saveOnOk: If `False`, exiting the dialog with OK will not
                 save to the recorder. Primarily for debugging.
         """
+        t0 = time.perf_counter()
         self.schema = loadSchema('mide_config_ui.xml')
 
         self.setTime: bool = kwargs.pop('setTime', True)
@@ -93,8 +98,6 @@ class ConfigDialog(SC.SizedDialog):
         self.DEBUG: bool = kwargs.pop('debug', __DEBUG__)
         icon = kwargs.pop('icon', None)
 
-        self.postConfigMessage = None
-
         if self.DEBUG:
             # May be redundant when running standalone, but just in case:
             logger.setLevel(logging.DEBUG)
@@ -129,25 +132,31 @@ class ConfigDialog(SC.SizedDialog):
         pane = self.GetContentsPane()
         self.notebook = wx.Notebook(pane, -1)
         self.notebook.SetSizerProps(expand=True, proportion=-1)
+        self.notebook.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self.OnPageChanged)
 
         self.configData = {}
         self.origConfigData = {}
 
-        self.configItems = {}
-        self.configValues = base.ConfigContainer(self)
-        self.displayValues = base.DisplayContainer(self)
+        self.hints = self.device.config.getConfigUI()
 
-        # Variables to be accessible by field expressions. Includes mapping
-        # None to ``null``, making the expressions less specific to Python.
-        self.expressionVariables = {'Config': self.displayValues,
-                                    'null': None}
+        # The configuration items are initially those of a headless model.
+        # Each tab's widgets replace the model's items when the tab is built.
+        self.model = model.ConfigModel(self.hints, device=self.device,
+                                       showAdvanced=self.showAdvanced,
+                                       useUtc=self.useUtc, debug=self.DEBUG)
+        self.configItems = self.model.configItems
+        self.configValues = self.model.configValues
+        self.displayValues = self.model.displayValues
+        self.expressionVariables = self.model.expressionVariables
+        self.dependencies = self.model.dependencies
+        self.postConfigMessage = self.model.postConfigMessage
 
         self.tabs = []
-
         self.wifiTab = None
+        self.hasWifi = False
         self.hasCal = False
+        self.transformUsage = None
 
-        self.hints = self.device.config.getConfigUI()
         self.buildUI()
         self.loadConfigData()
 
@@ -178,7 +187,7 @@ class ConfigDialog(SC.SizedDialog):
         exportTT = "Export device configuration data."
         importTT = "Import device configuration data."
 
-        x = (0b10 if self.wifiTab is not None else 0) | self.hasCal
+        x = (0b10 if self.hasWifi else 0) | self.hasCal
         if x:
             exportTT = f"{exportTT}\n{self.EXPORT_TOOLTIPS[x]}"
             importTT = f"{importTT}\n{self.EXPORT_TOOLTIPS[x]}"
@@ -207,31 +216,46 @@ class ConfigDialog(SC.SizedDialog):
         self.SetSize((620, 700))
         wx.SetCursor(wx.Cursor(wx.CURSOR_ARROW))
 
+        logger.debug("Configuration dialog opened in %.3f s" % (time.perf_counter() - t0))
+
 
     def buildUI(self):
         """ Construct and populate the UI based on the ConfigUI element.
+            Tabs' contents are built when they are first shown.
         """
-        try:
-            rootEl = self.hints[0]
-        except IndexError:
-            raise endaq.device.ConfigError('No CONFIG.UI data for {}'.format(self.device))
+        for item in self.model.tabs:
+            tabType = base.TAB_TYPES[item.element.name]
+            self.hasCal = self.hasCal or issubclass(tabType, special_tabs.FactoryCalibrationTab)
+            self.hasWifi = self.hasWifi or issubclass(tabType, wifi_tab.WiFiSelectionTab)
 
-        for el in rootEl:
-            if el.name in base.TAB_TYPES:
-                tabType = base.TAB_TYPES[el.name]
-                tab = tabType(self.notebook, -1, element=el, root=self)
+            if item.isAdvancedFeature and not self.showAdvanced:
+                # Hidden tab: its items remain in the model.
+                continue
 
-                if tabType == wifi_tab.WiFiSelectionTab:
-                    self.wifiTab = tab
+            tab = tabType(self.notebook, -1, element=item.element, root=self,
+                          model=item)
 
-                self.hasCal = self.hasCal or isinstance(tab, special_tabs.FactoryCalibrationTab)
+            if tabType == wifi_tab.WiFiSelectionTab:
+                self.wifiTab = tab
 
-                if not tab.isAdvancedFeature or self.showAdvanced:
-                    self.notebook.AddPage(tab, str(tab.label))
-                    self.tabs.append(tab)
+            self.notebook.AddPage(tab, str(tab.label))
+            self.tabs.append(tab)
 
-            elif el.name == "PostConfigMessage":
-                self.postConfigMessage = el.value
+        # Build the initially visible tab.
+        if self.tabs:
+            self.notebook.GetCurrentPage().build()
+
+        logger.debug("Expression cache: %r" % base.getExpressionCacheInfo())
+
+
+    def getTransformUsage(self) -> TransformUsage:
+        """ Get the index of the calibration transforms used by the device's
+            channels, shared by the calibration tabs. Created when first
+            needed.
+        """
+        if self.transformUsage is None:
+            self.transformUsage = TransformUsage(self.device.getChannels())
+        return self.transformUsage
 
 
     def loadConfigUI(self):
@@ -249,20 +273,7 @@ class ConfigDialog(SC.SizedDialog):
             :param reset: If `True`, reset all the fields to their defaults
                 before applying the configuration data.
         """
-        if reset:
-            for c in self.configItems.values():
-                c.setToDefault()
-
-        for k, v in data.items():
-            try:
-                self.configItems[k].setConfigValue(v)
-            except KeyError:
-                logger.info(f"Item {hex(k)} in config file not in UI, probably okay.")
-            except AttributeError as err:
-                logger.warning("Unexpected {} in ConfigDialog.applyConfigData(): {}"
-                               .format(type(err).__name__, err))
-
-        self.updateDisabledItems()
+        model.applyConfigData(self, data, reset=reset)
 
 
     def loadConfigData(self):
@@ -286,21 +297,15 @@ class ConfigDialog(SC.SizedDialog):
         """ Update the dictionary of configuration data.
         """
         self.configData.clear()
-        self.configData.update(self.configValues.toDict())
+        with self.displayValues.snapshot('updateConfigData'):
+            self.configData.update(self.configValues.toDict())
 
 
     def updateDeviceConfig(self):
         """ Apply the config dialog's values to the `Recorder`.
         """
-        # Clear device's config data (except unknown config values from file)
-        for item in self.device.config.items.values():
-            item.value = None
-
         self.updateConfigData()
-        for k, v in self.configData.items():
-            if k in self.device.config.items:
-                self.device.config.items[k].configValue = v
-                self.device.config.items[k].changed = True
+        model.updateDeviceConfig(self.device, self.configData)
 
 
     def encodeConfigData(self):
@@ -357,12 +362,15 @@ class ConfigDialog(SC.SizedDialog):
         return False
 
 
-    def updateDisabledItems(self):
+    def updateDisabledItems(self, changed=None):
         """ Enable or disable config items according to their `disableIf`
             expressions and/or their parent group/tab's check or enabled state.
+
+            :param changed: The config item (or a list of items) that has
+                changed, if known. If provided, only it and the items that
+                depend upon it get updated. If `None`, all items are updated.
         """
-        for item in self.configItems.values():
-            item.updateDisabled()
+        model.updateDisabledItems(self, changed)
 
 
     def _setClock(self):
@@ -372,10 +380,9 @@ class ConfigDialog(SC.SizedDialog):
         if self.setClockCheck.IsEnabled() and self.setClockCheck.GetValue():
             logger.info("Setting clock...")
             try:
-                if self.wifiTab is not None:
-                    #  Stop the scan thread first to avoid conflicts
-                    self.wifiTab.shutdown()
-                self.device.setTime()
+                # The device's broker keeps this from colliding with the
+                # Wi-Fi tab's threads.
+                getBroker(self.device).call(self.device.setTime)
             except Exception as err:
                 logger.error(f"Error setting clock: {err!r}")
                 self.showError("The recorder's clock could not be set.",
@@ -387,7 +394,10 @@ class ConfigDialog(SC.SizedDialog):
         """ Call each tab's `save()` method, if necessary.
         """
         for tab in self.tabs:
-            if not isinstance(tab, wifi_tab.WiFiSelectionTab):
+            if not tab.built:
+                # Never shown, so there's nothing to save.
+                continue
+            elif not isinstance(tab, wifi_tab.WiFiSelectionTab):
                 if tab.save() is False:
                     return
             elif (self.applyWifiChangesCheck is not None and
@@ -399,6 +409,20 @@ class ConfigDialog(SC.SizedDialog):
     #
     # ===========================================================================
 
+    def OnPageChanged(self, evt: wx.BookCtrlEvent):
+        """ Handle a notebook page change, building the tab's contents if it
+            hasn't been shown before.
+        """
+        page = self.notebook.GetPage(evt.GetSelection())
+        if page is not None and not page.built:
+            with wx.BusyCursor():
+                page.build()
+        if self.wifiTab is not None:
+            # Only check the network status while it is visible.
+            self.wifiTab.setVisible(page is self.wifiTab)
+        evt.Skip()
+
+
     def OnImportButton(self, _evt: Optional[wx.Event]):
         """ Handle the "Import..." button.
         """
@@ -408,9 +432,7 @@ class ConfigDialog(SC.SizedDialog):
                            style=wx.FD_OPEN, wildcard=wildcard) as dlg:
             if dlg.ShowModal() == wx.ID_OK:
                 configio.importConfig(self.device, dlg.GetPath(),
-                                      exclude=(0x8ff7f, 0x9ff7f,  # name, notes
-                                               0x18ff7f, 0x19ff7f, 0x1aff7f,  # wi-fi stuff
-                                               0x28ff7f, 0x29ff7f, 0x2aff7f))
+                                      exclude=model.IMPORT_EXCLUDE_IDS)
                 self.loadConfigData()
 
 
@@ -451,14 +473,22 @@ class ConfigDialog(SC.SizedDialog):
     # ===========================================================================
 
 
+    def _shutdownTabs(self):
+        """ Stop any background threads started by tabs (e.g., Wi-Fi scans).
+            Waits a limited time for each tab; threads still finishing a
+            device command exit on their own.
+        """
+        for t in self.tabs:
+            if hasattr(t, 'shutdown'):
+                t.shutdown()
+
+
     def OnOK(self, evt: wx.Event):
         """ Handle dialog OK, saving changes.
         """
         # Try to ensure Wi-Fi threads have stopped. Redundant in most cases, but
         # needed in some error conditions.
-        for t in self.tabs:
-            if hasattr(t, 'shutdown'):
-                t.shutdown()
+        self._shutdownTabs()
 
         if 0x18ff7f in self.device.config.items:
             wifiWasEnabled = bool(self.device.config.items[0x18ff7f].value)
@@ -525,7 +555,7 @@ class ConfigDialog(SC.SizedDialog):
             if q == wx.YES:
                 # FUTURE: This may need a callback to prevent the GUI from
                 # getting flagged 'not responding.'
-                self.device.command.reset(wait=False)
+                getBroker(self.device).call(self.device.command.reset, wait=False)
 
         evt.Skip()
 
@@ -542,10 +572,13 @@ class ConfigDialog(SC.SizedDialog):
             if q == wx.CANCEL:
                 return
             elif q == wx.YES:
+                self._shutdownTabs()
                 self.saveConfigData()
                 evt.Skip()
                 return
 
+        self._shutdownTabs()
+
         # If cancelled, the returned configuration data is `None`
         self.configData = None
         evt.Skip()
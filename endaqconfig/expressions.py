@@ -0,0 +1,567 @@
+"""
+Configuration field expressions and value conversion, independent of the
+GUI: compiled ``DisableIf``/``DisplayFormat``/``ValueFormat`` expressions,
+gain/offset transforms, the dependency graph between items, and the
+containers used as ``Config`` in expressions. Nothing here requires wx, so
+it is shared by the dialog's widgets and the headless `ConfigModel`.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+# ===============================================================================
+#
+# ===============================================================================
+
+import logging
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+#
+# ===============================================================================
+
+from collections import defaultdict
+from contextlib import contextmanager
+import dis
+from functools import lru_cache
+from types import CodeType
+
+import numpy as np
+
+# ===============================================================================
+# --- Expression compilation
+# ===============================================================================
+
+# The maximum number of compiled expressions (and gain/offset pairs) cached.
+# Devices of the same type share CONFIG.UI expressions, so the number of
+# unique ones is small.
+EXPRESSION_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def compileExpression(exp):
+    """ Compile a ``DisableIf``, ``DisplayFormat`` or ``ValueFormat``
+        expression for use with `eval()`. Compiled code objects are cached by
+        expression text, and shared by all fields (in all dialogs) that use
+        the same expression. Use `compileExpression.cache_info()` for cache
+        statistics.
+
+        Because they are shared, the code objects carry no information about
+        the fields using them: their "filename" (shown in tracebacks) is only
+        the expression text, e.g. ``<expression 'x * 2'>``. Errors evaluating
+        an expression identify the expression, not the field.
+
+        :param exp: The expression string.
+        :return: A code object.
+        :raises SyntaxError: If the expression is bad (not cached).
+    """
+    return compile(exp, "<expression %r>" % exp, "eval")
+
+
+class LinearTransform(object):
+    """ The conversion between a config value and its displayed value for
+        a field with a ``Gain`` and/or ``Offset``: the displayed value is
+        ``(x + offset) * gain``, and the config value is
+        ``(x / gain) - offset``. Conversions work on individual values and
+        on NumPy arrays. Instances are immutable; get them with
+        `getLinearTransform()`, which shares them between fields.
+    """
+    __slots__ = ('gain', 'offset')
+
+
+    def __init__(self, gain=1.0, offset=0.0):
+        """ Constructor.
+
+            :param gain: The field's gain.
+            :param offset: The field's offset.
+        """
+        object.__setattr__(self, 'gain', float(gain))
+        object.__setattr__(self, 'offset', float(offset))
+
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+
+    def __repr__(self):
+        return "<%s gain=%r offset=%r>" % (self.__class__.__name__,
+                                           self.gain, self.offset)
+
+
+    def __eq__(self, other):
+        if not isinstance(other, LinearTransform):
+            return NotImplemented
+        return self.gain == other.gain and self.offset == other.offset
+
+
+    def __hash__(self):
+        return hash((self.gain, self.offset))
+
+
+    def toDisplay(self, x):
+        """ Convert a config value (or array of values) to its displayed
+            value(s).
+        """
+        return (x + self.offset) * self.gain
+
+
+    def toConfig(self, x):
+        """ Convert a displayed value (or array of values) to its config
+            value(s).
+        """
+        return (x / self.gain) - self.offset
+
+
+    @staticmethod
+    def _batchParams(transforms, values):
+        """ Build arrays of gains, offsets, and values for batch conversion.
+        """
+        gain = np.fromiter((t.gain for t in transforms), dtype=np.float64,
+                           count=len(transforms))
+        offset = np.fromiter((t.offset for t in transforms), dtype=np.float64,
+                             count=len(transforms))
+        return gain, offset, np.asarray(values, dtype=np.float64)
+
+
+    @classmethod
+    def batchToDisplay(cls, transforms, values):
+        """ Convert multiple config values, each with its own transform, to
+            displayed values in one vectorized pass.
+
+            :param transforms: A sequence of `LinearTransform` objects.
+            :param values: A sequence of numeric config values, one for each
+                transform.
+            :return: A list of displayed values (Python floats).
+            :raises TypeError, ValueError: If any value is non-numeric.
+        """
+        gain, offset, x = cls._batchParams(transforms, values)
+        return ((x + offset) * gain).tolist()
+
+
+    @classmethod
+    def batchToConfig(cls, transforms, values):
+        """ Convert multiple displayed values, each with its own transform, to
+            config values in one vectorized pass.
+
+            :param transforms: A sequence of `LinearTransform` objects.
+            :param values: A sequence of numeric displayed values, one for
+                each transform.
+            :return: A list of config values (Python floats).
+            :raises TypeError, ValueError: If any value is non-numeric.
+            :raises ZeroDivisionError: If any gain is zero (as `toConfig()`
+                would, rather than producing infinite values).
+        """
+        gain, offset, x = cls._batchParams(transforms, values)
+        if not gain.all():
+            raise ZeroDivisionError("float division by zero")
+        return ((x / gain) - offset).tolist()
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def getLinearTransform(gain, offset):
+    """ Get the `LinearTransform` for a field's gain and offset. Transforms
+        are cached by `(gain, offset)`, and shared by all fields that use
+        them. Use `getLinearTransform.cache_info()` for cache statistics.
+
+        :param gain: The field's gain.
+        :param offset: The field's offset.
+        :return: A `LinearTransform`.
+    """
+    return LinearTransform(gain, offset)
+
+
+def getExpressionCacheInfo():
+    """ Get the statistics of the compiled expression caches.
+
+        :return: A dictionary of `functools.lru_cache` statistics (named
+            tuples), keyed by cache name.
+    """
+    return {'expressions': compileExpression.cache_info(),
+            'gainOffset': getLinearTransform.cache_info()}
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def getExpressionDependencies(code):
+    """ Find the config IDs referenced by a compiled field expression, i.e.
+        as ``Config[0x1234]`` or ``Config.get(0x1234)``.
+
+        :param code: A code object, compiled from a ``DisableIf``,
+            ``DisplayFormat`` or ``ValueFormat`` expression.
+        :return: A set of referenced config IDs, and a flag that is `True`
+            if ``Config`` is used in a way that can't be analyzed (e.g.,
+            computed keys or iteration). Expressions with the flag set should
+            be treated as dependent upon every item.
+    """
+    keys = set()
+    dynamic = False
+
+    if not isinstance(code, CodeType):
+        return keys, dynamic
+
+    instructions = list(dis.get_instructions(code))
+    for i, inst in enumerate(instructions):
+        if inst.opname not in ('LOAD_NAME', 'LOAD_GLOBAL') or inst.argval != 'Config':
+            continue
+
+        following = instructions[i+1:i+3]
+        if (following and following[0].opname in ('LOAD_METHOD', 'LOAD_ATTR')
+                and following[0].argval == 'get'):
+            following = following[1:]
+
+        if (following and following[0].opname in ('LOAD_CONST', 'LOAD_SMALL_INT')
+                and isinstance(following[0].argval, int)):
+            keys.add(following[0].argval)
+        else:
+            dynamic = True
+
+    # Nested code (lambdas, comprehensions in older Python versions, etc.)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            k, d = getExpressionDependencies(const)
+            keys.update(k)
+            dynamic = dynamic or d
+
+    return keys, dynamic
+
+
+class DependencyGraph(object):
+    """ A graph of the dependencies between configuration items, derived
+        from the config IDs referenced in the expressions of each item, its
+        enumeration options (if any), and its parent groups. Used to update
+        only the items affected by a change, in dependency order, rather
+        than every item in the dialog.
+    """
+
+    def __init__(self, items):
+        """ Constructor.
+
+            :param items: A dictionary of configuration items, keyed by
+                config ID (e.g. a dialog's ``configItems``).
+        """
+        # Config IDs of the items directly dependent upon each config ID
+        self.dependents = defaultdict(set)
+
+        # Config IDs of items with expressions that can't be analyzed. These
+        # are considered dependent upon every item.
+        self.dynamic = set()
+
+        # Topological position of each config ID, for sorting.
+        self.rank = {}
+
+        dependencies = {}
+        for cid, item in items.items():
+            deps, dynamic = self.getItemDependencies(item)
+            deps.discard(cid)
+            dependencies[cid] = deps
+            if dynamic:
+                self.dynamic.add(cid)
+            for d in deps:
+                self.dependents[d].add(cid)
+
+        self.rank = self._sort(dependencies)
+
+
+    @staticmethod
+    def getItemDependencies(item):
+        """ Get the config IDs upon which a configuration item's value or
+            enabled state depend.
+
+            :param item: The configuration item (a `ConfigBase` instance).
+            :return: A set of config IDs, and a flag indicating that the item
+                has an expression that could not be analyzed.
+        """
+        deps = set()
+        dynamic = False
+
+        expressions = [item.disableIf, item.displayFormat, item.valueFormat]
+        for o in getattr(item, 'options', None) or ():
+            expressions.append(o.disableIf)
+
+        # Parent groups' checkboxes and `disableIf` expressions also determine
+        # whether the item is enabled.
+        group = getattr(item, 'group', None)
+        while group is not None:
+            if group.configId is not None:
+                deps.add(group.configId)
+            expressions.append(group.disableIf)
+            group = getattr(group, 'group', None)
+
+        for exp in expressions:
+            k, d = getExpressionDependencies(exp)
+            deps.update(k)
+            dynamic = dynamic or d
+
+        return deps, dynamic
+
+
+    def _sort(self, dependencies):
+        """ Topologically sort the config IDs (Kahn's algorithm). Items in
+            a dependency cycle (which shouldn't exist) are put at the end, in
+            config ID order.
+        """
+        remaining = {cid: len(deps.intersection(dependencies))
+                     for cid, deps in dependencies.items()}
+        ready = sorted(cid for cid, n in remaining.items() if n == 0)
+        order = []
+
+        while ready:
+            cid = ready.pop(0)
+            order.append(cid)
+            del remaining[cid]
+            for d in sorted(self.dependents.get(cid, ())):
+                if d in remaining:
+                    remaining[d] -= 1
+                    if remaining[d] == 0:
+                        ready.append(d)
+
+        order.extend(sorted(remaining))
+        return {cid: n for n, cid in enumerate(order)}
+
+
+    def downstream(self, changed):
+        """ Get the config IDs of the items affected by a change, in the
+            order in which they should be updated.
+
+            :param changed: An iterable of config IDs of the changed items.
+            :return: A list of config IDs (including those in `changed`), or
+                `None` if any of the changed items are unknown (e.g., have
+                no config ID). In the latter case, everything should be
+                updated.
+        """
+        pending = list(changed)
+        if any(cid is None or cid not in self.rank for cid in pending):
+            return None
+
+        pending.extend(self.dynamic)
+        affected = set()
+        while pending:
+            cid = pending.pop()
+            if cid in affected:
+                continue
+            affected.add(cid)
+            pending.extend(self.dependents.get(cid, ()))
+
+        return sorted(affected, key=self.rank.__getitem__)
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+class DisplayContainer(object):
+    """ A wrapper for the dialog's dictionary of configuration items, which
+        dynamically gets the displayed values from the corresponding widget. It
+        simplifies the field's ``DisplayFormat``, ``ValueFormat``, and
+        ``DisableIf`` expressions. Iterating over it is performed in the order
+        of the keys (i.e. config IDs), low to high; dependencies can be avoided
+        by giving dependent values higher config IDs than the fields they
+        depend upon.
+
+        Within a `snapshot()`, each value is read from its widget only once;
+        subsequent lookups use the cached value.
+
+        :ivar reads: The total number of values read from widgets.
+        :ivar saved: The total number of widget reads avoided by using values
+            cached during a snapshot.
+    """
+
+
+    def __init__(self, root):
+        self.root = root
+
+        self._cache = {}
+        self._snapshots = 0
+
+        # Sorted keys, and the number of config items when they were sorted
+        # (items are only ever added, so a change in count means new keys).
+        self._keys = []
+        self._keyCount = None
+
+        self.reads = 0
+        self.saved = 0
+
+
+    @contextmanager
+    def snapshot(self, name=None):
+        """ Context manager that caches values as they are read, so each
+            widget is read at most once (e.g., over the course of handling
+            a UI event). Snapshots can be nested; the cache is cleared when
+            the outermost one exits.
+
+            :param name: The name of the operation, for debug logging of the
+                number of widget reads saved.
+        """
+        saved = self.saved
+        self._snapshots += 1
+        try:
+            yield self
+        finally:
+            self._snapshots -= 1
+            if self._snapshots == 0:
+                self._cache.clear()
+            if name and self.saved > saved:
+                logger.debug("%s: %d widget read(s) saved" % (name, self.saved - saved))
+
+
+    def invalidate(self):
+        """ Discard any cached values, e.g. if a widget's value was changed
+            during a snapshot.
+        """
+        self._cache.clear()
+
+
+    def _read(self, item):
+        """ Get the value of a config item. Separated for subclassing.
+        """
+        return item.getDisplayValue()
+
+
+    def get(self, k, default=None):
+        if k in self.root.configItems:
+            return self[k]
+        return default
+
+
+    def __getitem__(self, k):
+        item = self.root.configItems.get(k, None)
+        if item is None:
+            return None
+
+        if self._snapshots:
+            if k in self._cache:
+                self.saved += 1
+                return self._cache[k]
+            val = self._cache[k] = self._read(item)
+        else:
+            val = self._read(item)
+
+        self.reads += 1
+        return val
+
+
+    def __contains__(self, k):
+        return k in self.root.configItems
+
+
+    def __iter__(self):
+        return iter(self._sortedKeys())
+
+
+    def iterkeys(self):
+        return self.__iter__()
+
+
+    def itervalues(self):
+        for k in self.iterkeys():
+            yield self[k]
+
+
+    def iteritems(self):
+        for k in self.iterkeys():
+            yield k, self[k]
+
+
+    def _sortedKeys(self):
+        """ Get the cached list of sorted keys, re-sorting only if config
+            items have been added.
+        """
+        if self._keyCount != len(self.root.configItems):
+            self._keys = sorted(self.root.configItems.keys())
+            self._keyCount = len(self._keys)
+        return self._keys
+
+
+    def keys(self):
+        return list(self._sortedKeys())
+
+
+    def values(self):
+        return list(self.itervalues())
+
+
+    def items(self):
+        return list(self.iteritems())
+
+
+    def toDict(self):
+        """ Create a real dictionary of field values keyed by config IDs.
+            Items with values of `None` are excluded.
+        """
+        with self.snapshot():
+            return {k: v for k, v in self.iteritems() if v is not None}
+
+
+class ConfigContainer(DisplayContainer):
+    """ A wrapper for the dialog's dictionary of configuration items, which
+        dynamically gets the converted configuration values (as written to the
+        config file) from the corresponding widget. It simplifies saving the
+        configuration data. Iterating over it is performed in the order of the
+        keys (i.e. config IDs), low to high; dependencies can be avoided by
+        giving dependent values higher config IDs than the fields they depend
+        upon.
+    """
+
+
+    def _read(self, item):
+        return item.getConfigValue()
+
+
+    def toDict(self):
+        """ Create a real dictionary of config values keyed by config IDs.
+            Items with values of `None` are excluded. Values of fields with
+            a gain and/or offset are converted together, in one pass.
+        """
+        with self.snapshot():
+            values = {}
+            linear = []
+            for k in self:
+                item = self.root.configItems[k]
+                if item.transform is None:
+                    values[k] = self[k]
+                else:
+                    linear.append(item)
+
+            if linear:
+                values.update(convertConfigValues(linear))
+
+            return {k: values[k] for k in self if values.get(k) is not None}
+
+
+def convertConfigValues(items):
+    """ Get the config values of fields with a gain and/or offset, converting
+        all of them from their displayed values in one vectorized pass.
+
+        :param items: A list of fields (`ConfigBase` instances) with
+            `LinearTransform` transforms.
+        :return: A dictionary of config values keyed by config ID.
+    """
+    items = [item for item in items if item.configId is not None]
+    result = dict.fromkeys([item.configId for item in items])
+
+    convert = []
+    values = []
+    for item in items:
+        try:
+            val = item.root.displayValues[item.configId]
+        except (KeyError, ValueError, TypeError):
+            continue
+        if val is not None:
+            convert.append(item)
+            values.append(val)
+
+    try:
+        converted = LinearTransform.batchToConfig([item.transform for item in convert],
+                                                  values)
+    except (ValueError, TypeError):
+        # Bad value(s); fall back to converting individually.
+        for item in convert:
+            result[item.configId] = item.getConfigValue()
+        return result
+
+    for item, val in zip(convert, converted):
+        result[item.configId] = item.castConfigValue(val)
+
+    return result
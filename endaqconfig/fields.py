@@ -0,0 +1,807 @@
+"""
+Definitions of the configuration items described by a device's "UI Hints"
+data (a/k/a CONFIG_UI): how each type of item is parsed from its EBML
+element, its defaults, and the conversion of its values. None of this
+involves the GUI, so it doesn't require wxPython.
+
+There is one definition class per element type. The widgets in `base` (and
+the special-case tabs) are derived from them, as are the items of the
+headless configuration model (see `model`).
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from fnmatch import fnmatch
+import logging
+
+from .expressions import compileExpression, getLinearTransform
+
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+# --- Utility functions
+# ===============================================================================
+
+# Dictionaries of all known field and tab definitions. The `@defineField` and
+# `@defineTab` decorators add classes to them, respectively. The widget
+# classes for each are kept separately, in `base.FIELD_TYPES` and
+# `base.TAB_TYPES`.
+FIELD_DEFINITIONS = {}
+TAB_DEFINITIONS = {}
+
+
+def defineField(cls):
+    """ Class decorator for registering configuration field definitions.
+        Class names should match the element names in the ``CONFIG.UI`` EBML.
+    """
+    global FIELD_DEFINITIONS
+    FIELD_DEFINITIONS[cls.__name__] = cls
+    return cls
+
+
+def defineTab(cls):
+    """ Class decorator for registering configuration tab definitions. Class
+        names should match the element names in the ``CONFIG.UI`` EBML.
+    """
+    global TAB_DEFINITIONS
+    TAB_DEFINITIONS[cls.__name__] = cls
+    return cls
+
+
+# ===============================================================================
+# --- Base classes
+# ===============================================================================
+
+class ConfigBase(object):
+    """ Base/mix-in class for configuration items. Handles parsing attributes
+        from EBML. Doesn't do any of the GUI-specific widget work, as some
+        components don't correspond directly to a UI widget.
+
+        :cvar ARGS: A dictionary mapping EBML element names to object attribute
+            names. Wildcards are allowed in the element names.
+        :cvar CLASS_ARGS: A dictionary mapping additional EBML element names
+            to object attribute names. Subclasses can add their own unique
+            attributes to this dictionary.
+        :cvar DEFAULT_TYPE: The name of the EBML ``*Value`` element type used
+            when writing this item's value to the config file. Used if the
+            defining EBML element does not contain a ``*Value`` sub-element.
+        :cvar DEFAULTS: A dictionary of default attribute values, used if the
+            EBML element does not provide them. Merged with (and overriding)
+            the `DEFAULTS` of the superclasses; see `getDefaults()`.
+    """
+
+    # Mapping of element names to object attributes. May contain glob-style
+    # wildcards.
+    ARGS = {"Label": "label",
+            "ConfigID": "configId",
+            "ToolTip": "tooltip",
+            "Units": "units",
+            "DisableIf": "disableIf",
+            "ExcludeID": "exclude",
+            "DisplayFormat": "displayFormat",
+            "ValueFormat": "valueFormat",
+            "MaxLength": "maxLength",
+            "*Min": "min",
+            "*Max": "max",
+            "*Value": "default",
+            "*Gain": "gain",
+            "*Offset": "offset"
+            }
+
+    # Class-specific element/attribute mapping. Subclasses can use this for
+    # their unique attributes without clobbering the common ones in ARGS.
+    CLASS_ARGS = {}
+
+    # The name of the default *Value EBML element type used when writing this
+    # item's value to the config file. Used if the definition does not include
+    # a *Value element.
+    DEFAULT_TYPE = None
+
+    # Default attribute values, overriding those of superclasses.
+    DEFAULTS = {}
+
+    # Default expression code objects for DisableIf, ValueFormat, DisplayFormat.
+    # `noEffect` always returns the field's value unmodified (supplied as the
+    # variable ``x``). `noValue` always returns `None`.
+    noEffect = compile("x", "<ConfigBase.noEffect>", "eval")
+    noValue = compile("None", "<ConfigBase.noValue>", "eval")
+
+    # The `LinearTransform` for fields with a gain and/or offset, which is
+    # used instead of `displayFormat` and `valueFormat`.
+    transform = None
+
+
+    def makeExpression(self, exp, name):
+        """ Helper method for compiling an expression in a string into a code
+            object that can later be used with `eval()`. Used internally.
+        """
+        if exp is None:
+            # No expression defined: value is returned unmodified (it matches
+            # the config item's type)
+            return self.noEffect
+        elif exp == '':
+            # Empty string expression: always returns `None` (e.g. the field is
+            # used to calculate another config item, not a config item itself)
+            return self.noValue
+        elif not isinstance(exp, str):
+            # Probably won't occur, but just in case...
+            logger.debug("Bad value for %s: %r (%s)" % (name, exp, type(exp)))
+            return
+
+        try:
+            # Note: the code object is shared by every field with the same
+            # expression, so its "filename" doesn't identify this field.
+            return compileExpression(exp)
+        except SyntaxError as err:
+            # Identify the field in the error message.
+            idstr = ("(ID 0x%0X) " % self.configId) if self.configId else ""
+            msg = "%r %s%s" % (self.label, idstr, name)
+            logger.error("Ignoring bad expression (%s) for %s %s: %r" %
+                         (err.msg, self.__class__.__name__, msg, err.text))
+            return self.noValue
+
+
+    def makeLinearTransform(self):
+        """ Helper method for creating the `LinearTransform` that converts
+            values using the field's `gain` and `offset`, replacing the
+            `displayFormat` and `valueFormat` expressions. Used internally.
+        """
+        gain = 1.0 if self.gain is None else self.gain
+        offset = 0.0 if self.offset is None else self.offset
+
+        self.transform = getLinearTransform(gain, offset)
+        self.displayFormat = self.valueFormat = self.noEffect
+
+
+    @classmethod
+    def getDefaults(cls):
+        """ Get the default attribute values for the class: its `DEFAULTS`,
+            merged with those of its superclasses.
+        """
+        defaults = {}
+        for c in reversed(cls.__mro__):
+            defaults.update(c.__dict__.get('DEFAULTS', {}))
+        return defaults
+
+
+    def setAttribDefault(self, att, val):
+        """ Sets an attribute, if the attribute has not yet been set, similar to
+            `dict.setdefault()`. Allows subclasses to set defaults that differ
+            from their superclass.
+        """
+        if not hasattr(self, att):
+            setattr(self, att, val)
+            return val
+        return getattr(self, att)
+
+
+    def getPath(self):
+        """ Get a string containing the configuration item's label and the
+            labels of its parents (if applicable).
+        """
+        try:
+            root = self.Parent.getPath()
+            if self.label:
+                return "%s : %s" % (root, self.label)
+            else:
+                return root
+        except AttributeError:
+            return self.label
+
+
+    def __init__(self, element, root):
+        """ Constructor. Instantiates a `ConfigBase` and parses parameters out
+            of the supplied EBML element.
+
+            :param element: The EBML element from which to build the object.
+            :param root: The main dialog.
+        """
+        self.root = root
+        self.element = element
+        self.isAdvancedFeature = False
+
+        for att, val in self.getDefaults().items():
+            self.setAttribDefault(att, val)
+
+        # Convert element children to object attributes.
+        # First, set any previously undefined attributes to None.
+        args = self.ARGS.copy()
+        args.update(self.CLASS_ARGS)
+        for v in args.values():
+            self.setAttribDefault(v, None)
+
+        self.valueType = self.DEFAULT_TYPE
+        self.exclude = []
+
+        for el in self.element.value:
+            if el.name == "IsAdvancedFeature":
+                self.isAdvancedFeature = bool(el.value)
+                continue
+
+            if el.name in FIELD_DEFINITIONS:
+                # Child field: skip now, handle later (if applicable)
+                continue
+
+            if el.name == "ExcludeID":
+                self.exclude.append(el.value)
+                continue
+
+            if el.name.endswith('Value'):
+                # If the field has a '*Value' element, the field will use that
+                # type when saving to the config file.
+                self.valueType = el.__class__.name
+
+            if el.name in args:
+                # Known element name (verbatim): set attribute
+                setattr(self, args[el.name], el.value)
+            else:
+                # Match wildcards and set attribute
+                for k, v in args.items():
+                    if fnmatch(el.name, k):
+                        setattr(self, v, el.value)
+
+        # Compile expressions for converting to/from raw and display values.
+        if self.gain is None and self.offset is None:
+            # No gain and/or offset: use displayFormat/valueFormat if defined.
+            self.displayFormat = self.makeExpression(self.displayFormat, 'displayFormat')
+            self.valueFormat = self.makeExpression(self.valueFormat, 'valueFormat')
+        else:
+            # Convert values using the field's gain and offset.
+            self.makeLinearTransform()
+
+        if self.disableIf is not None:
+            self.disableIf = self.makeExpression(self.disableIf, 'disableIf')
+
+        if self.configId is not None and self.root is not None:
+            self.root.configItems[self.configId] = self
+
+        self.expressionVariables = self.root.expressionVariables.copy()
+
+        if self.root.DEBUG:
+            tt = f"{self.tooltip}\n" if self.tooltip else ""
+            cid = hex(self.configId) if self.configId else None
+            self.tooltip = f"{tt}({self.element.name}, ConfigId={cid})"
+
+
+    def __repr__(self):
+        """
+        """
+        name = self.__class__.__name__
+        if not self.label:
+            return "<%s at 0x%x>" % (name, id(self))
+        return "<%s %r at 0x%x>" % (name, self.label, id(self))
+
+
+    def isDisabled(self):
+        """ Check the Field's `disableIf` expression (if any) to determine if
+            the Field should be enabled.
+        """
+        if self.disableIf is None:
+            return False
+
+        return eval(self.disableIf, self.expressionVariables)
+
+
+    def getDisplayValue(self):
+        """ Get the object's displayed value.
+        """
+        if self.isDisabled():
+            return None
+        try:
+            return self.value
+        except AttributeError:
+            return self.default
+
+
+    def castConfigValue(self, val):
+        """ Convert a value (from `valueFormat` or the transform) to the type
+            written to the config file. Separated for subclassing.
+        """
+        return val
+
+
+    def toDisplayValue(self, val):
+        """ Convert a config value to the displayed value.
+        """
+        if self.transform is not None:
+            return self.transform.toDisplay(val)
+        self.expressionVariables['x'] = val
+        return eval(self.displayFormat, self.expressionVariables)
+
+
+    def toConfigValue(self, val):
+        """ Convert a displayed value to the config value (without casting).
+        """
+        if self.transform is not None:
+            return self.transform.toConfig(val)
+        self.expressionVariables['x'] = val
+        return eval(self.valueFormat, self.expressionVariables)
+
+
+    def getConfigValue(self):
+        """ Get the widget's value, as written to the config file.
+        """
+        if self.configId is None:
+            return
+        try:
+            val = self.getDisplayValue()
+            if val is None:
+                return None
+            val = self.toConfigValue(val)
+        except (KeyError, ValueError, TypeError):
+            return None
+        if val is None:
+            return None
+        return self.castConfigValue(val)
+
+
+    def setDisplayValue(self, val, **kwargs):
+        """ Set the object's value, in the data type and units it displays
+            (if applicable).
+        """
+        # This is overridden by ConfigWidget subclasses; they have no `value`.
+        self.value = val
+
+
+    def setConfigValue(self, val, display=None, **kwargs):
+        """ Set the Field's value, using the data type native to the config
+            file.
+
+            :param val: The config value.
+            :param display: The displayed value, if already converted (e.g.
+                by `LinearTransform.batchToDisplay()`).
+        """
+        if display is None:
+            display = self.toDisplayValue(val)
+        self.setDisplayValue(display, **kwargs)
+
+
+    def setToDefault(self, **kwargs):
+        """ Set the configuration item to its default value.
+        """
+        self.setConfigValue(self.default, **kwargs)
+
+
+class Field(ConfigBase):
+    """ Base class for configuration field definitions. Widget classes list
+        their definition first in their bases, so its attributes take
+        precedence over those of the generic widget classes. Model item
+        classes are also derived from them (see `model.getModelClass()`).
+
+        :cvar CHECK: Does this field have a checkbox?
+        :cvar LABEL: Does this field show its label? Only used by groups.
+    """
+    CHECK = False
+    LABEL = True
+
+
+# ===============================================================================
+
+@defineField
+class BooleanField(Field):
+    """ A Boolean value. This is a special case; although it is a checkbox, it
+        is not considered a 'check' field because the check *is* its value.
+    """
+    CHECK = True
+
+    DEFAULT_TYPE = "BooleanValue"
+
+
+# ===============================================================================
+
+@defineField
+class TextField(Field):
+    """ Unicode text.
+    """
+    CLASS_ARGS = {'MaxLength': 'maxLength',
+                  'TextLines': 'textLines'}
+
+    DEFAULT_TYPE = "TextValue"
+
+    DEFAULTS = {'default': '',
+                'textLines': 1}
+
+
+@defineField
+class ASCIIField(TextField):
+    """ ASCII text.
+    """
+    DEFAULT_TYPE = "ASCIIValue"
+
+
+# ===============================================================================
+
+@defineField
+class IntField(Field):
+    """ A signed integer.
+    """
+    DEFAULT_TYPE = "IntValue"
+
+    # Min/max integers supported by wxPython SpinCtrl
+    MAX_SIGNED_INT = 2 ** 31 - 1
+    MIN_SIGNED_INT = -2 ** 31
+
+    DEFAULTS = {'default': 0,
+                'max': MAX_SIGNED_INT,
+                'min': MIN_SIGNED_INT}
+
+
+    def castConfigValue(self, val):
+        """ Convert a value to the type written to the config file.
+        """
+        return int(val)
+
+
+@defineField
+class UIntField(IntField):
+    """ An unsigned integer.
+    """
+    DEFAULT_TYPE = "UIntValue"
+
+    DEFAULTS = {'min': 0}
+
+
+@defineField
+class FloatField(IntField):
+    """ A floating-point value.
+    """
+    DEFAULT_TYPE = "FloatValue"
+
+    CLASS_ARGS = {'FloatIncrement': 'increment'}
+
+    DEFAULTS = {'increment': 0.25,
+                'floatDigits': 2}
+
+
+# ===============================================================================
+
+@defineField
+class EnumField(Field):
+    """ One of several options (`EnumOption`).
+    """
+    DEFAULT_TYPE = "UIntValue"
+
+    DEFAULTS = {'default': 0}
+
+
+class EnumOption(ConfigBase):
+    """ One choice in an enumeration (e.g. an item in a drop-down list). Note:
+        unlike the other classes, this is not itself a UI field.
+    """
+    DEFAULT_TYPE = "UIntValue"
+
+
+    def __init__(self, element, parent, index, **kwargs):
+        """ Constructor.
+
+            :keyword element: The EBML element for which the enumeration option
+                is being generated.
+            :param parent: The parent `EnumField`.
+        """
+        super(EnumOption, self).__init__(element, parent.root, **kwargs)
+        self.parent = parent
+        self.checkbox = None
+
+        if self.default is None:
+            self.value = index
+        else:
+            self.value = self.default
+
+        if self.label is None:
+            self.label = u"%s" % self.value
+
+
+@defineField
+class BitField(EnumField):
+    """ A set of bits in an unsigned integer. Each `EnumOption` is one bit;
+        its value indicates the index of the corresponding bit (0 is the first
+        bit, 1 is the second, 2 is the third, etc.).
+    """
+    DEFAULT_TYPE = "UIntValue"
+
+
+# ===============================================================================
+
+@defineField
+class DateTimeField(IntField):
+    """ A date/time value, in epoch seconds UTC.
+    """
+    DEFAULT_TYPE = "IntValue"
+    LABEL = False
+
+
+@defineField
+class UTCOffsetField(FloatField):
+    """ The local UTC offset. Displayed in hours, stored in seconds.
+    """
+    DEFAULT_TYPE = "IntValue"
+
+    DEFAULTS = {'min': -23.0,
+                'max': 23.0,
+                'units': 'Hours',
+                'increment': 0.5,
+                'displayFormat': 'x/3600.0',
+                'valueFormat': 'x*3600',
+                'label': 'Local UTC Offset'}
+
+
+@defineField
+class BinaryField(Field):
+    """ Binary data. FOR FUTURE IMPLEMENTATION.
+    """
+    DEFAULT_TYPE = "BinaryValue"
+
+
+# ===============================================================================
+# --- Check fields
+# Container fields excluded (see below).
+# ===============================================================================
+
+@defineField
+class CheckTextField(TextField):
+    """ Unicode text, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckASCIIField(ASCIIField):
+    """ ASCII text, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckIntField(IntField):
+    """ A signed integer, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckUIntField(UIntField):
+    """ An unsigned integer, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckFloatField(FloatField):
+    """ A floating-point value, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckEnumField(EnumField):
+    """ One of several options, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckBitField(BitField):
+    """ A set of bits in an unsigned integer, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckDateTimeField(DateTimeField):
+    """ A date/time value, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckUTCOffsetField(UTCOffsetField):
+    """ The local UTC offset, with a checkbox.
+    """
+    CHECK = True
+
+
+@defineField
+class CheckBinaryField(BinaryField):
+    """ Binary data, with a checkbox. FOR FUTURE IMPLEMENTATION.
+    """
+    CHECK = True
+
+
+# ===============================================================================
+# --- Type-specific fields
+# ===============================================================================
+
+@defineField
+class FloatTemperatureField(FloatField):
+    """ `FloatField` variant with appropriate defaults for temperature.
+    """
+
+    DEFAULTS = {'units': u"\u00b0C",
+                'label': 'Temperature',
+                'min': -40.0,
+                'max': 80.0}
+
+
+@defineField
+class CheckFloatTemperatureField(FloatTemperatureField):
+    """ `CheckFloatField` variant with appropriate defaults for temperature.
+    """
+    CHECK = True
+
+
+@defineField
+class FloatAccelerationField(FloatField):
+    """ `FloatField` variant with appropriate defaults for acceleration.
+    """
+
+    DEFAULTS = {'units': u"g",
+                'label': 'Acceleration',
+                'min': -100.0,
+                'max': 100.0,
+                'default': 5.0}
+
+
+@defineField
+class CheckFloatAccelerationField(FloatAccelerationField):
+    """ `CheckFloatField` variant with appropriate defaults for acceleration.
+    """
+    CHECK = True
+
+
+# ===============================================================================
+# --- Special-case fields
+# These are not configuration items, and do not affect the config data.
+# ===============================================================================
+
+@defineField
+class CheckDriftButton(Field):
+    """ A button that checks the recorder's clock versus the host computer's
+        time.
+    """
+    DEFAULT_TYPE = None
+
+    DEFAULTS = {'label': 'Check Clock Drift',
+                'tooltip': ("Read the recorder's clock and compare to the "
+                            "current system time.")}
+
+
+@defineField
+class VerticalPadding(Field):
+    """ Resizeable vertical padding.
+    """
+
+
+@defineField
+class ResetButton(CheckDriftButton):
+    """ A button that resets all its sibling fields in its group or tab.
+    """
+
+    DEFAULTS = {'label': 'Reset to Defaults',
+                'tooltip': "Reset this set of fields to their default values"}
+
+
+# ===============================================================================
+# --- Container fields
+# ===============================================================================
+
+@defineField
+class Group(Field):
+    """ A labeled group of configuration items.
+    """
+    # Should this group get a heading label?
+    LABEL = True
+
+    # Default types for Fields in the EBML schema with no specialized
+    # subclasses. The low byte of a Field's EBML ID denotes its type.
+    # Note: The Field must appear in the EBML schema, so it will be identified
+    # as a CONTAINER ('master') type.
+    DEFAULT_FIELDS = {
+        0x00: BooleanField,
+        0x01: UIntField,
+        0x02: IntField,
+        0x03: FloatField,
+        0x04: ASCIIField,
+        0x05: TextField,
+        0x06: BinaryField,
+        0x07: EnumField,
+
+        0x10: BooleanField,
+        0x11: CheckUIntField,
+        0x12: CheckIntField,
+        0x13: CheckFloatField,
+        0x14: CheckASCIIField,
+        0x15: CheckTextField,
+        0x16: CheckBinaryField,
+        0x17: CheckEnumField,
+
+        0x22: DateTimeField,
+        0x32: CheckDateTimeField
+    }
+
+    DEFAULT_TYPE = None
+
+    # Does the group contain the fields defined by its element's children?
+    # Special-case tabs that build their own contents do not.
+    HAS_FIELDS = True
+
+
+    @classmethod
+    def getFieldType(cls, el):
+        """ Get the appropriate definition class for an EBML *Field element.
+            Elements without a specialized subclass will get a generic
+            definition for their basic data type.
+
+            Note: does not handle IDs not present in the schema!
+        """
+        if el.name in FIELD_DEFINITIONS:
+            return FIELD_DEFINITIONS[el.name]
+
+        if el.id & 0xFF00 == 0x4000:
+            # All field EBML IDs have 0x40 as their 2nd byte. Bits 0-3 denote
+            # the 'base' type; bit 4 denotes if the field has a checkbox.
+            baseId = el.id & 0x001F
+            if baseId in cls.DEFAULT_FIELDS:
+                return cls.DEFAULT_FIELDS[baseId]
+            else:
+                raise NameError("Unknown field type: %s" % el.name)
+
+        return None
+
+
+@defineField
+class CheckGroup(Group):
+    """ A labeled group of configuration items with a checkbox to enable or
+        disable them all.
+    """
+    CHECK = True
+    DEFAULT_TYPE = "BooleanValue"
+
+
+# ===============================================================================
+# --- Tabs
+# ===============================================================================
+
+@defineTab
+class Tab(Group):
+    """ One tab of configuration items. All configuration dialogs contain at
+        least one. The Tab's label is used as the name shown on the tab.
+    """
+    LABEL = False
+    CHECK = False
+
+
+@defineTab
+class DeviceInfoTab(Tab):
+    """ Special-case tab showing device info, built without child fields.
+    """
+    HAS_FIELDS = False
+
+    DEFAULTS = {'label': 'Recorder Info'}
+
+
+@defineTab
+class FactoryCalibrationTab(DeviceInfoTab):
+    """ Special-case tab showing the recorder's factory-set calibration
+        polynomials.
+    """
+    DEFAULTS = {'label': 'Factory Calibration'}
+
+
+@defineTab
+class UserCalibrationTab(FactoryCalibrationTab):
+    """ Special-case tab showing the recorder's user-defined calibration
+        polynomials.
+    """
+    DEFAULTS = {'label': 'User Calibration'}
+
+
+@defineTab
+class WiFiSelectionTab(Tab):
+    """ Special-case tab for selecting the wireless access point for a
+        W-series recorder.
+    """
+    # 'Constant' value for the label, read from CONFIG_UI for 'normal' tabs
+    label = "Wi-Fi"
+
+    HAS_FIELDS = False
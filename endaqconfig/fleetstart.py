@@ -0,0 +1,243 @@
+"""
+Starting many recorders at (nearly) the same moment, e.g., for tests using
+multiple sensors. Every device is 'armed' first: its connection is opened
+and its command round-trip time measured (with a ping, if supported). Each
+device is then sent the 'start recording' command at a shared target time,
+early by its estimated one-way latency, so the commands arrive together.
+The results include the measured spread of the start commands.
+
+The recorders' command interfaces do not (yet) have a scheduled start (i.e.,
+'start at time T'), so the alignment depends on the host sending each
+command on time. The device's own start-up time (which may vary with the
+configuration) is not included in the spread.
+
+Commands are sent through each device's `CommandBroker`. These have no GUI
+dependencies; the device selection dialog runs them in a background thread.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+from time import sleep, time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from endaq.device import UnsupportedFeature
+
+from .broker import getBroker
+
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# The minimum time (in seconds) between arming the devices and the target
+# time, giving every worker time to get ready.
+MIN_LEAD = 0.25
+
+# The interval (in seconds) at which waiting workers check for cancellation.
+CANCEL_CHECK_INTERVAL = 0.05
+
+# The maximum number of devices accessed simultaneously. Devices beyond this
+# will be started late.
+MAX_WORKERS = 64
+
+
+class StartResult(object):
+    """ The result of starting one recorder.
+    """
+
+    __slots__ = ('device', 'rtt', 'sent', 'duration', 'started', 'confirmed',
+                 'error')
+
+    def __init__(self, device):
+        self.device = device
+        self.rtt = None  # Round-trip time of a ping (seconds), if supported
+        self.sent = None  # Time the start command was sent, relative to target
+        self.duration = None  # Time taken to send the start command (seconds)
+        self.started = False  # `True` if the start command was accepted
+        self.confirmed = False  # `True` if the device was seen to start
+        self.error = None  # The exception raised, if any
+
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} {self.device} sent={self.sent} "
+                f"started={self.started}>")
+
+
+    @property
+    def failed(self) -> bool:
+        """ Did the device fail to start? """
+        return self.error is not None or not self.started
+
+
+    def asDict(self) -> Dict[str, Any]:
+        """ Get the result as a dictionary, suitable for JSON. """
+        dev = self.device
+        return {'serial': getattr(dev, 'serial', None),
+                'path': getattr(dev, 'path', None),
+                'rtt': self.rtt,
+                'sent': self.sent,
+                'started': self.started,
+                'confirmed': self.confirmed,
+                'error': None if self.error is None else repr(self.error)}
+
+
+def _wait(until: float, callback: Optional[Callable] = None) -> bool:
+    """ Sleep until a given time, periodically checking for cancellation.
+
+        :param until: The `time.time()` at which to stop waiting.
+        :param callback: A function that returns `True` if the operation
+            has been cancelled.
+        :return: `False` if cancelled, `True` otherwise.
+    """
+    while True:
+        if callback and callback():
+            return False
+        remaining = until - time()
+        if remaining <= 0:
+            return True
+        sleep(min(remaining, CANCEL_CHECK_INTERVAL))
+
+
+def armDevice(device,
+              result: StartResult,
+              timeout: float = 2,
+              callback: Optional[Callable] = None) -> StartResult:
+    """ Prepare a recorder to be started: open its connection (if it has
+        one) and measure its command round-trip time.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param result: The `StartResult` to update.
+        :param timeout: Time (in seconds) to wait for the device.
+        :param callback: A function that returns `True` if the operation
+            has been cancelled.
+        :return: The updated `StartResult`.
+    """
+    try:
+        t0 = time()
+        getBroker(device).call(partial(device.command.ping, timeout=timeout,
+                                       callback=callback))
+        result.rtt = time() - t0
+    except UnsupportedFeature:
+        # e.g., file-based interface: no connection to open
+        result.rtt = None
+    except Exception as err:
+        logger.debug(f"Could not ping {device}: {err!r}")
+        result.error = err
+
+    return result
+
+
+def startDevice(device,
+                result: StartResult,
+                target: float,
+                timeout: float = 5,
+                callback: Optional[Callable] = None) -> StartResult:
+    """ Send a recorder the 'start recording' command at a given time,
+        early by its estimated one-way latency (half its round-trip time),
+        then wait for it to start.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param result: The device's `StartResult`, from `armDevice()`.
+        :param target: The `time.time()` at which the device should start.
+        :param timeout: Time (in seconds) to wait for the device to start.
+        :param callback: A function that returns `True` if the operation
+            has been cancelled.
+        :return: The updated `StartResult`.
+    """
+    if result.error is not None:
+        return result
+
+    if not _wait(target - (result.rtt or 0) / 2, callback):
+        return result
+
+    broker = getBroker(device)
+    try:
+        t0 = time()
+        result.started = broker.call(partial(device.command.startRecording,
+                                             wait=False, callback=callback))
+        t1 = time()
+        result.sent = t0 - target
+        result.duration = t1 - t0
+
+        if result.started and not device.isRemote:
+            # Local devices dismount when they start recording.
+            result.confirmed = broker.call(partial(device.command.awaitReboot,
+                                                   timeout=timeout,
+                                                   callback=callback))
+
+    except Exception as err:
+        logger.error(f"Could not start {device}: {err!r}")
+        result.error = err
+
+    return result
+
+
+def startSpread(results: Iterable[StartResult]) -> Optional[float]:
+    """ Compute the maximum difference (in seconds) between the start
+        commands sent to all the devices that started, based on when each
+        device's command was sent and completed.
+
+        :param results: `StartResult` objects (from `startAll()`).
+        :return: The spread, or `None` if no devices were started.
+    """
+    results = [r for r in results if r.started]
+    if not results:
+        return None
+    return (max(r.sent + r.duration for r in results)
+            - min(r.sent for r in results))
+
+
+def startAll(devices: Iterable,
+             timeout: float = 5,
+             callback: Optional[Callable] = None) -> Dict[str, Any]:
+    """ Start several recorders simultaneously, compensating for each
+        device's command latency. Devices that cannot record are skipped.
+
+        :param devices: The recorders (`endaq.device.Recorder` instances).
+        :param timeout: Time (in seconds) to wait for each device.
+        :param callback: A function that returns `True` if the operation
+            has been cancelled (e.g., the dialog was closed). It is also
+            passed to the device commands.
+        :return: A dictionary containing the `StartResult` of each device
+            (``results``), those which failed (``failed``), the spread of
+            the start commands (``spread``, seconds), whether the operation
+            was cancelled, and the total time.
+    """
+    t0 = time()
+    results = {dev: StartResult(dev) for dev in devices if dev.canRecord}
+    if not results:
+        return {'results': {}, 'failed': [], 'spread': None,
+                'cancelled': False, 'time': 0}
+
+    # Each device needs its own worker, since they all wait for the same
+    # moment; with fewer workers, the later devices would start late.
+    with ThreadPoolExecutor(max_workers=min(len(results), MAX_WORKERS),
+                            thread_name_prefix='fleetstart') as pool:
+        list(pool.map(lambda d: armDevice(d, results[d], callback=callback),
+                      results))
+
+        lead = max([MIN_LEAD] + [r.rtt for r in results.values() if r.rtt])
+        target = time() + lead
+        if not (callback and callback()):
+            list(pool.map(lambda d: startDevice(d, results[d], target,
+                                                timeout, callback),
+                          results))
+
+    cancelled = bool(callback and callback())
+    failed = [r for r in results.values() if r.failed]
+    spread = startSpread(results.values())
+
+    logger.info(f"Started {len(results) - len(failed)} of {len(results)} "
+                f"recorder(s), spread {spread}, {len(failed)} failed"
+                f"{' (cancelled)' if cancelled else ''}")
+
+    return {'results': results,
+            'failed': failed,
+            'spread': spread,
+            'cancelled': cancelled,
+            'time': time() - t0}
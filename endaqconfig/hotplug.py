@@ -0,0 +1,347 @@
+"""
+Notification of device changes (recorders being attached, removed, mounted,
+or unmounted), so the device scanning thread only needs to scan when
+something has actually changed.
+
+There are two 'monitors':
+
+* `InotifyMonitor`: Linux only. Uses ``inotify`` to watch device node and
+    mount point directories (e.g., ``/dev`` for ``ttyACM*`` serial devices,
+    ``/media/<user>`` for drives), plus ``/proc/self/mounts`` for changes to
+    mounted filesystems. It uses no CPU while waiting.
+* `PollingMonitor`: Works everywhere. Periodically calls
+    `endaq.device.deviceChanged()`, like the scanning thread always did.
+
+`getMonitor()` creates the best one available for the platform.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+import ctypes
+import ctypes.util
+import errno
+from fnmatch import fnmatch
+import getpass
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+from time import monotonic
+from typing import Iterable, Optional
+
+from endaq.device import deviceChanged
+
+logger = logging.getLogger('endaqconfig')
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# Default directories watched by `InotifyMonitor`, and the names (patterns)
+# of entries in them that indicate a possible recorder.
+DEV_PATHS = ('/dev', '/dev/serial/by-id')
+DEV_PATTERNS = ('ttyACM*', 'ttyUSB*', 'sd*', 'usb-*')
+MOUNT_PATHS = ('/media', '/media/{user}', '/run/media/{user}', '/mnt')
+
+
+class ChangeMonitor(object):
+    """ Base class for device change monitors.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """ Wait for a change to the attached devices, or for the timeout
+            to expire, or for `notify()` to be called (from another thread).
+
+            :param timeout: The maximum time to wait (in seconds). `None`
+                will wait indefinitely.
+            :return: `True` if a change was (or may have been) detected.
+        """
+        raise NotImplementedError
+
+
+    def notify(self):
+        """ Make a call to `wait()` (in another thread) return immediately,
+            e.g., when stopping the thread.
+        """
+        self._wake.set()
+
+
+    def close(self):
+        """ Release any resources used by the monitor.
+        """
+        self.notify()
+
+
+class PollingMonitor(ChangeMonitor):
+    """ A device change monitor that periodically checks for changes
+        using `endaq.device.deviceChanged()`. Works on all platforms.
+    """
+
+    def __init__(self, interval: float = 0.25):
+        """ A device change monitor that periodically checks for changes.
+
+            :param interval: The time (in seconds) between checks.
+        """
+        super().__init__()
+        self.interval = interval
+
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            if deviceChanged(recordersOnly=False):
+                return True
+
+            wait = self.interval
+            if deadline is not None:
+                wait = min(wait, deadline - monotonic())
+                if wait <= 0:
+                    return False
+
+            if self._wake.wait(wait):
+                self._wake.clear()
+                return False
+
+
+class InotifyMonitor(ChangeMonitor):
+    """ A device change monitor using Linux's ``inotify`` to watch device
+        node and mount point directories, and polling ``/proc/self/mounts``
+        to detect filesystems being mounted or unmounted.
+    """
+
+    # From <sys/inotify.h>
+    IN_ATTRIB = 0x00000004
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+    WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+                  | IN_ATTRIB | IN_DELETE_SELF | IN_ONLYDIR)
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self,
+                 paths: Optional[Iterable[str]] = None,
+                 patterns: Optional[Iterable[str]] = None,
+                 mountPaths: Optional[Iterable[str]] = None,
+                 mounts: bool = True):
+        """ A device change monitor using Linux's ``inotify``.
+
+            :param paths: Directories containing device nodes to watch.
+                Defaults to `DEV_PATHS`.
+            :param patterns: Shell-style patterns of device node names in
+                `paths` that can be recorders. Changes to other entries are
+                ignored. Defaults to `DEV_PATTERNS`.
+            :param mountPaths: Directories in which recorders get mounted.
+                Any change in these is reported. Defaults to `MOUNT_PATHS`.
+                ``{user}`` is replaced with the current user's name.
+            :param mounts: If `True`, also watch ``/proc/self/mounts``.
+        """
+        super().__init__()
+
+        libname = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(libname, use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p,
+                                                ctypes.c_uint32]
+
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.patterns = tuple(DEV_PATTERNS if patterns is None else patterns)
+        self.watches = {}  # Watched directories, keyed by watch descriptor
+        self.filtered = set()  # Watch descriptors with name filtering
+
+        try:
+            user = getpass.getuser()
+        except (KeyError, OSError):
+            user = ''
+
+        mountPaths = MOUNT_PATHS if mountPaths is None else mountPaths
+        for path in DEV_PATHS if paths is None else paths:
+            wd = self.addWatch(path)
+            if wd is not None:
+                self.filtered.add(wd)
+        for path in mountPaths:
+            self.addWatch(path.format(user=user))
+
+        self.mountsFile = None
+        if mounts:
+            try:
+                self.mountsFile = open('/proc/self/mounts', 'rb')
+                self.mountsFile.read()
+            except OSError:
+                self.mountsFile = None
+
+        # 'Self-pipe' for interrupting `wait()`
+        self._pipe = os.pipe()
+
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+        self.poller.register(self._pipe[0], select.POLLIN)
+        if self.mountsFile:
+            self.poller.register(self.mountsFile, select.POLLPRI | select.POLLERR)
+
+        logger.debug(f"Watching for device changes in {list(self.watches.values())}")
+
+
+    def addWatch(self, path: str) -> Optional[int]:
+        """ Start watching a directory.
+
+            :param path: The directory to watch.
+            :return: The watch descriptor, or `None` if the directory does
+                not exist (or could not be watched).
+        """
+        if not os.path.isdir(path):
+            return None
+
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            logger.debug(f"Could not watch {path}: {os.strerror(err)}")
+            return None
+
+        self.watches[wd] = path
+        return wd
+
+
+    def readEvents(self) -> bool:
+        """ Read and parse all pending ``inotify`` events.
+
+            :return: `True` if any event concerned a possible recorder.
+        """
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            except OSError as err:
+                if err.errno == errno.EINTR:
+                    continue
+                raise
+            if not data:
+                break
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, size = self.EVENT_HEADER.unpack_from(data, offset)
+                offset += self.EVENT_HEADER.size
+                name = data[offset:offset + size].rstrip(b'\0').decode(errors='replace')
+                offset += size
+
+                if mask & self.IN_Q_OVERFLOW:
+                    changed = True
+                elif mask & self.IN_IGNORED:
+                    # Watched directory was removed (or unmounted)
+                    self.watches.pop(wd, None)
+                    self.filtered.discard(wd)
+                    changed = True
+                elif wd not in self.filtered:
+                    changed = True
+                elif any(fnmatch(name, p) for p in self.patterns):
+                    changed = True
+
+        return changed
+
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self.fd is None:
+            return False
+
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            if deadline is None:
+                ms = None
+            else:
+                ms = max(0, int((deadline - monotonic()) * 1000))
+
+            try:
+                events = self.poller.poll(ms)
+            except InterruptedError:
+                continue
+
+            if not events:
+                return False
+
+            changed = False
+            for fd, _event in events:
+                if fd == self._pipe[0]:
+                    os.read(self._pipe[0], 512)
+                    return changed
+                elif fd == self.fd:
+                    changed = self.readEvents() or changed
+                elif self.mountsFile and fd == self.mountsFile.fileno():
+                    self.mountsFile.seek(0)
+                    self.mountsFile.read()
+                    changed = True
+
+            if changed:
+                return True
+
+
+    def notify(self):
+        super().notify()
+        if self.fd is None:
+            # Closed: the pipe's descriptors may have been reused.
+            return
+        try:
+            os.write(self._pipe[1], b'\0')
+        except (OSError, AttributeError):
+            pass
+
+
+    def close(self):
+        """ Stop watching, and release the ``inotify`` file descriptor.
+        """
+        if self.fd is None:
+            return
+
+        self.notify()
+        if self.mountsFile:
+            self.mountsFile.close()
+        for fd in (self.fd,) + self._pipe:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.fd = None
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def getMonitor(interval: float = 0.25, polling: bool = False) -> ChangeMonitor:
+    """ Create the best available device change monitor for the platform.
+
+        :param interval: The time (in seconds) between checks, if falling
+            back to polling.
+        :param polling: If `True`, always use a `PollingMonitor`.
+        :return: A `ChangeMonitor` instance.
+    """
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyMonitor()
+        except (OSError, AttributeError) as err:
+            logger.debug(f"inotify unavailable ({err!r}), polling for device changes")
+
+    return PollingMonitor(interval)
@@ -0,0 +1,716 @@
+"""
+A headless model of a recorder's configuration, built from its "UI Hints"
+data (a/k/a CONFIG_UI). The model's items are generated from the same
+definitions as the dialog's widgets (see `fields`), sharing their element
+mapping, defaults, and value conversion, but they store their values and
+check states instead of reading them from wx controls. Neither wxPython nor
+a display is required.
+
+The model can validate, diff, and apply configuration data without the GUI.
+`ConfigDialog` uses it to hold the state of tabs that have not been shown;
+widgets replace the model's items when their tab is built.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+import time
+from typing import Any, Dict, Optional
+
+from endaq.device import ConfigError
+
+from . import fields
+from .common import getUtcOffset
+from .expressions import (ConfigContainer, DependencyGraph, DisplayContainer,
+                          LinearTransform)
+from .fields import ConfigBase, EnumOption, logger
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# Config IDs of items excluded when importing configuration data from a file:
+# the recorder's name and notes, and its Wi-Fi settings.
+IMPORT_EXCLUDE_IDS = (0x8ff7f, 0x9ff7f,  # name, notes
+                      0x18ff7f, 0x19ff7f, 0x1aff7f,  # wi-fi stuff
+                      0x28ff7f, 0x29ff7f, 0x2aff7f)
+
+
+# ===============================================================================
+# --- Model items
+# ===============================================================================
+
+class ModelItem(ConfigBase):
+    """ A configuration item without a widget. The base class for model items
+        corresponding to the basic `ConfigWidget` fields. Concrete classes,
+        one per field definition, are created by `getModelClass()`.
+
+        :cvar HAS_FIELD: Does the corresponding widget have a value control?
+            Items without one use their check state as their value.
+    """
+    HAS_FIELD = True
+
+
+    def __init__(self, element, root, group=None):
+        """ Constructor.
+
+            :param element: The EBML element from which to build the item.
+            :param root: The `ConfigModel` containing the item.
+            :param group: The parent `ModelGroup` containing the item (if any).
+        """
+        self.group = group
+        self.value = None
+        self.checked = False
+        self.fields = []
+
+        super(ModelItem, self).__init__(element, root)
+
+        self.initModel()
+
+
+    def __repr__(self):
+        name = "%s (model)" % self.__class__.__name__
+        if not self.label:
+            return "<%s at 0x%x>" % (name, id(self))
+        return "<%s %r at 0x%x>" % (name, self.label, id(self))
+
+
+    def initModel(self):
+        """ Set the item's initial state, the same as the widget's `initUI()`.
+        """
+        self.setCheck(False)
+        self.setToDefault()
+
+
+    @property
+    def hasCheckbox(self):
+        """ Does the corresponding widget have a checkbox?
+        """
+        return self.CHECK
+
+
+    def isDisabled(self):
+        """ Check the item's `disableIf` expression (if any), and its parent
+            group's check and enabled state, to determine if it is enabled.
+        """
+        if self.group is not None:
+            if self.group.hasCheckbox and not self.group.checked:
+                return True
+            if self.group.isDisabled():
+                return True
+
+        return super(ModelItem, self).isDisabled()
+
+
+    def storeValue(self, val):
+        """ Convert a displayed value to the type stored, as the widget's
+            control would. Separated for subclassing.
+
+            :raises TypeError: If the value is of the wrong type.
+        """
+        return val
+
+
+    def setCheck(self, checked=True, recurse=True):
+        """ Set the item's check state, if applicable.
+        """
+        if self.hasCheckbox:
+            self.checked = bool(checked)
+
+        # Percolate the check upstream, so parent checks will get set.
+        # Only setting the check gets propagated, not clearing it.
+        if checked and recurse and self.group is not None:
+            self.group.setCheck()
+
+
+    def setConfigValue(self, val, check=True, **kwargs):
+        """ Set the item's value, using the data type native to the config
+            file.
+        """
+        super(ModelItem, self).setConfigValue(val, check=check, **kwargs)
+        if val is not None and self.group is not None and self.group.hasCheckbox:
+            self.group.setCheck(check)
+
+
+    def setDisplayValue(self, val, check=True):
+        """ Set the item's value, using the data type native to the widget.
+        """
+        try:
+            if val is not None:
+                if self.HAS_FIELD:
+                    self.value = self.storeValue(val)
+                else:
+                    check = bool(val)
+            self.setCheck(check)
+        except (TypeError, ValueError):
+            # Shouldn't happen, but could if the config file is damaged.
+            logger.error('Config file had wrong type for %s (ConfigID 0x%X): '
+                         '%r (%s)' % (self.__class__.__name__, self.configId,
+                                      val, val.__class__.__name__))
+
+
+    def setToDefault(self, check=False):
+        """ Reset the item to its default value.
+        """
+        super(ModelItem, self).setToDefault(check=check)
+        self.setCheck(check)
+
+
+    def getDisplayValue(self):
+        """ Get the item's displayed value.
+        """
+        if self.isDisabled():
+            return None
+        elif self.hasCheckbox and not self.checked:
+            return None
+
+        if self.HAS_FIELD and self.value is not None:
+            return self.value
+
+        return self.default
+
+
+    def updateDisabled(self):
+        """ Update the item according to its `isDisabled` expression. Has no
+            effect on most items, since there is no widget to enable/disable.
+        """
+        pass
+
+
+    def copyTo(self, widget):
+        """ Apply the item's state to its corresponding widget, i.e. when the
+            widget replaces the model item.
+
+            :param widget: The `ConfigWidget` built from the same element.
+        """
+        widget.setDisplayValue(self.value, check=self.checked)
+
+
+class ModelBoolean(ModelItem):
+    """ Model for `BooleanField`: the check state is its value.
+    """
+
+    def setDisplayValue(self, val, check=False):
+        self.checked = bool(val)
+
+
+    def getDisplayValue(self):
+        if self.isDisabled():
+            return None
+
+        return int(self.checked)
+
+
+    def copyTo(self, widget):
+        widget.setDisplayValue(self.checked)
+
+
+class ModelText(ModelItem):
+    """ Model for `TextField` and its subclasses.
+    """
+
+    def storeValue(self, val):
+        if not isinstance(val, str):
+            raise TypeError("Expected a string, got %s" % type(val).__name__)
+        return val
+
+
+    def getDisplayValue(self):
+        v = super(ModelText, self).getDisplayValue()
+        if not v:
+            return None
+        return v
+
+
+class ModelFloat(ModelItem):
+    """ Model for `FloatField` and its subclasses. Values are limited to the
+        field's minimum and maximum, as the widget's spin control does.
+    """
+
+    def storeValue(self, val):
+        val = float(val)
+        if self.min is not None:
+            val = max(val, self.min)
+        if self.max is not None:
+            val = min(val, self.max)
+        return val
+
+
+class ModelInt(ModelFloat):
+    """ Model for `IntField` and `UIntField`. The limits are those of the
+        widget's spin control.
+    """
+
+    def initModel(self):
+        # wxPython SpinCtrl values limited to 32b signed integer range
+        self.min = int(max(self.min, self.MIN_SIGNED_INT))
+        self.max = int(min(self.max, self.MAX_SIGNED_INT))
+        self.default = max(min(self.default, self.max), self.min)
+        super(ModelInt, self).initModel()
+
+
+    def storeValue(self, val):
+        return int(super(ModelInt, self).storeValue(val))
+
+
+class ModelDateTime(ModelItem):
+    """ Model for `DateTimeField`. Values are epoch seconds UTC.
+    """
+
+    def initModel(self):
+        self.localTz = getUtcOffset(seconds=True)
+        super(ModelDateTime, self).initModel()
+
+
+    def setDisplayValue(self, val, check=True):
+        if not val:
+            # The widget shows the current time, as local time if it isn't
+            # showing UTC.
+            val = time.time()
+            if not self.root.useUtc:
+                val -= self.localTz
+        super(ModelDateTime, self).setDisplayValue(int(val), check)
+
+
+class ModelEnum(ModelItem):
+    """ Model for `EnumField`: one of several options.
+    """
+
+    def initModel(self):
+        optionEls = [el for el in self.element.value if el.name == "EnumOption"]
+        self.options = [EnumOption(el, self, n) for n, el in enumerate(optionEls)]
+        self.index = None
+        super(ModelEnum, self).initModel()
+
+
+    @property
+    def value(self):
+        """ The value of the selected option (if any).
+        """
+        if self.index is None:
+            return None
+        return self.options[self.index].value
+
+
+    @value.setter
+    def value(self, val):
+        # Set by `ModelItem.__init__()`; selection is done by index.
+        pass
+
+
+    def setDisplayValue(self, val, check=True):
+        """ Select the option with the given value.
+        """
+        for i, o in enumerate(self.options):
+            if o.value == val:
+                self.index = i
+                break
+        self.setCheck(check)
+
+
+    def getDisplayValue(self):
+        if self.isDisabled():
+            return None
+        elif self.hasCheckbox and not self.checked:
+            return None
+
+        if self.index is not None:
+            return self.options[self.index].getDisplayValue()
+        return self.default
+
+
+class ModelBit(ModelEnum):
+    """ Model for `BitField`: a set of bits, one per option.
+    """
+    HAS_FIELD = False
+
+
+    def initModel(self):
+        optionEls = [el for el in self.element.value if el.name == "EnumOption"]
+        self.options = [EnumOption(el, self, n) for n, el in enumerate(optionEls)]
+        self.bits = 0
+        for o in self.options:
+            o.default = (self.default >> o.value) & 1
+        self.setCheck(False)
+        self.setToDefault()
+
+
+    @property
+    def hasCheckbox(self):
+        return self.CHECK and bool(self.label)
+
+
+    @property
+    def value(self):
+        return self.bits
+
+
+    @value.setter
+    def value(self, val):
+        pass
+
+
+    def setDisplayValue(self, val, check=True):
+        """ Set the options according to the bits of the supplied value.
+        """
+        try:
+            self.bits = sum(1 << o.value for o in self.options if val & (1 << o.value))
+        except TypeError:
+            logger.error('Config file had wrong type for %s (ConfigID 0x%X): '
+                         '%r (%s)' % (self.__class__.__name__, self.configId,
+                                      val, val.__class__.__name__))
+        self.setCheck(check)
+
+
+    def getDisplayValue(self):
+        if self.hasCheckbox and not self.checked:
+            return None
+        if self.isDisabled():
+            return None
+
+        return self.bits
+
+
+    def updateDisabled(self):
+        """ Set individually disabled options to their defaults.
+        """
+        if self.isDisabled():
+            return
+
+        for o in self.options:
+            if o.isDisabled():
+                bit = 1 << o.value
+                old = self.bits
+                self.bits = (self.bits | bit) if o.default else (self.bits & ~bit)
+                if self.bits != old:
+                    self.root.displayValues.invalidate()
+
+
+class ModelControl(ModelItem):
+    """ Model for special-case 'fields' that are not configuration items
+        (buttons, padding, etc.).
+    """
+    HAS_FIELD = False
+
+
+    def initModel(self):
+        pass
+
+
+    @property
+    def hasCheckbox(self):
+        return False
+
+
+    def copyTo(self, widget):
+        pass
+
+
+class ModelGroup(ModelItem):
+    """ Model for `Group` and `Tab`: a container of other items.
+    """
+    HAS_FIELD = False
+
+
+    def initModel(self):
+        if self.HAS_FIELDS:
+            for el in self.element.value:
+                fieldType = self.getFieldType(el)
+                if fieldType is not None:
+                    self.fields.append(getModelClass(fieldType)(el, self.root, group=self))
+        self.setCheck(False)
+
+
+    @property
+    def hasCheckbox(self):
+        return bool(self.LABEL and self.label is not None and self.CHECK)
+
+
+    def setToDefault(self, check=False):
+        """ Reset the group's children to their default values.
+        """
+        for f in self.fields:
+            if f.configId in (0x8ff7f, 0x9ff7f):
+                # Special case: don't reset name or notes text fields.
+                continue
+            f.setToDefault(check)
+
+
+    def getDisplayValue(self):
+        if self.hasCheckbox and not self.checked:
+            return None
+        return not self.isDisabled() or None
+
+
+    def copyTo(self, widget):
+        """ Apply the group's state, and that of its children, to the
+            corresponding widgets.
+        """
+        widget.setDisplayValue(None, check=self.checked)
+        for item, child in zip(self.fields, widget.fields):
+            item.copyTo(child)
+
+
+class ModelCheckGroup(ModelGroup):
+    """ Model for `CheckGroup`.
+    """
+
+    def setToDefault(self, check=False):
+        ModelGroup.setToDefault(self, check=check)
+        if self.default is not None:
+            self.setCheck(self.default)
+
+
+# Field definitions and the model behavior that reproduces their widgets.
+# More specific classes must come before their superclasses.
+MODEL_BEHAVIORS = (
+    (fields.BooleanField, ModelBoolean),
+    (fields.BitField, ModelBit),
+    (fields.EnumField, ModelEnum),
+    (fields.DateTimeField, ModelDateTime),
+    (fields.FloatField, ModelFloat),
+    (fields.IntField, ModelInt),
+    (fields.TextField, ModelText),
+    (fields.CheckDriftButton, ModelControl),
+    (fields.VerticalPadding, ModelControl),
+    (fields.CheckGroup, ModelCheckGroup),
+    (fields.Group, ModelGroup),
+)
+
+# Cache of generated model classes, keyed by field definition.
+_MODEL_CLASSES = {}
+
+
+def getModelClass(fieldType):
+    """ Get the model item class corresponding to a field definition. The
+        model class is derived from the definition, so it has the same name,
+        element mapping, defaults, and value conversion as the widget class.
+
+        :param fieldType: A `fields.Field` subclass (including `fields.Tab`
+            and its subclasses).
+        :return: A `ModelItem` subclass.
+    """
+    try:
+        return _MODEL_CLASSES[fieldType]
+    except KeyError:
+        pass
+
+    for f, behavior in MODEL_BEHAVIORS:
+        if issubclass(fieldType, f):
+            break
+    else:
+        behavior = ModelItem
+
+    attrs = {'__doc__': "Model of `%s`." % fieldType.__name__}
+    cls = type(fieldType.__name__, (behavior, fieldType), attrs)
+    _MODEL_CLASSES[fieldType] = cls
+    return cls
+
+
+# ===============================================================================
+# --- The model itself
+# ===============================================================================
+
+class ConfigModel(object):
+    """ A headless configuration model, built from a recorder's ``CONFIG.UI``
+        data. It provides the same attributes used by configuration items as
+        `ConfigDialog` (`configItems`, `displayValues`, `expressionVariables`,
+        etc.).
+    """
+
+    def __init__(self, hints, device=None, showAdvanced=False, useUtc=True,
+                 debug=False):
+        """ Constructor.
+
+            :param hints: The ``CONFIG.UI`` data (an EBML document).
+            :param device: The recorder being configured (if any).
+            :param showAdvanced: If `True`, options flagged as 'advanced' are
+                shown (for the dialog's use).
+            :param useUtc: If `True`, date/time fields show UTC time.
+            :param debug: If `True`, show/log debugging messages.
+        """
+        self.hints = hints
+        self.device = device
+        self.showAdvanced = showAdvanced
+        self.useUtc = useUtc
+        self.DEBUG = debug
+
+        self.postConfigMessage = None
+
+        self.configItems = {}
+        self.configValues = ConfigContainer(self)
+        self.displayValues = DisplayContainer(self)
+
+        # Variables to be accessible by field expressions. Includes mapping
+        # None to ``null``, making the expressions less specific to Python.
+        self.expressionVariables = {'Config': self.displayValues,
+                                    'null': None}
+
+        self.tabs = []
+        self.build()
+        self.dependencies = DependencyGraph(self.configItems)
+
+
+    @classmethod
+    def fromDevice(cls, device, original=True, **kwargs):
+        """ Create a model of a recorder's configuration, and load its
+            configuration data.
+
+            :param device: The recorder (an `endaq.device.Recorder`).
+            :param original: If `True`, load only the values read from the
+                device. If `False`, include values changed (but not yet
+                saved) in the device's configuration interface, i.e. by
+                importing an exported configuration.
+            :return: A new `ConfigModel`.
+
+            Additional keyword arguments are used when creating the model.
+        """
+        model = cls(device.config.getConfigUI(), device=device, **kwargs)
+        model.applyConfigData(device.config.getConfigValues(original=original))
+        return model
+
+
+    def build(self):
+        """ Create the model's items from the ``CONFIG.UI`` data.
+        """
+        try:
+            rootEl = self.hints[0]
+        except (IndexError, TypeError):
+            raise ConfigError('No CONFIG.UI data for {}'.format(self.device))
+
+        for el in rootEl:
+            if el.name in fields.TAB_DEFINITIONS:
+                tabType = getModelClass(fields.TAB_DEFINITIONS[el.name])
+                self.tabs.append(tabType(el, self))
+
+            elif el.name == "PostConfigMessage":
+                self.postConfigMessage = el.value
+
+
+    def applyConfigData(self, data: Dict[int, Any], reset: bool = True):
+        """ Apply a dictionary of configuration data to the items.
+
+            :param data: The dictionary of config values, keyed by ConfigID.
+            :param reset: If `True`, reset all the items to their defaults
+                before applying the configuration data.
+        """
+        applyConfigData(self, data, reset=reset)
+
+
+    def getConfigData(self) -> Dict[int, Any]:
+        """ Get the configuration values of all items, as written to the
+            config file. Items with values of `None` are excluded.
+        """
+        with self.displayValues.snapshot('getConfigData'):
+            return self.configValues.toDict()
+
+
+    def updateDisabledItems(self, changed=None):
+        """ Update items according to their `disableIf` expressions.
+
+            :param changed: The config item (or a list of items) that has
+                changed, if known. If `None`, all items are updated.
+        """
+        updateDisabledItems(self, changed)
+
+
+    def updateDeviceConfig(self, device=None, data: Optional[Dict[int, Any]] = None):
+        """ Apply the model's configuration values to a recorder's
+            configuration interface. The data is not written to the device;
+            use ``device.config.applyConfig()`` to save it.
+
+            :param device: The recorder to update. Defaults to the model's.
+            :param data: The configuration data to apply. Defaults to the
+                model's current configuration values.
+        """
+        device = device or self.device
+        if data is None:
+            data = self.getConfigData()
+        updateDeviceConfig(device, data)
+
+
+# ===============================================================================
+# --- Functions shared by the model and the dialog
+# ===============================================================================
+
+def applyConfigData(root, data: Dict[int, Any], reset: bool = True):
+    """ Apply a dictionary of configuration data to the configuration items
+        (widgets or model items) of a `ConfigModel` or `ConfigDialog`.
+
+        :param root: The `ConfigModel` or `ConfigDialog`.
+        :param data: The dictionary of config values, keyed by ConfigID.
+        :param reset: If `True`, reset all the items to their defaults
+            before applying the configuration data.
+    """
+    items = root.configItems
+
+    if reset:
+        for c in list(items.values()):
+            c.setToDefault()
+
+    # Convert the values of fields with a gain/offset in one pass.
+    linear = [k for k, v in data.items() if v is not None
+              and getattr(items.get(k), 'transform', None) is not None]
+    try:
+        converted = LinearTransform.batchToDisplay(
+                [items[k].transform for k in linear],
+                [data[k] for k in linear])
+        converted = dict(zip(linear, converted))
+    except (TypeError, ValueError):
+        # Bad value(s) in the config data; convert individually.
+        converted = {}
+
+    for k, v in data.items():
+        try:
+            items[k].setConfigValue(v, display=converted.get(k))
+        except KeyError:
+            logger.info(f"Item {hex(k)} in config file not in UI, probably okay.")
+        except AttributeError as err:
+            logger.warning("Unexpected {} in applyConfigData(): {}"
+                           .format(type(err).__name__, err))
+
+    root.updateDisabledItems()
+
+
+def updateDisabledItems(root, changed=None):
+    """ Enable or disable the configuration items (widgets or model items) of
+        a `ConfigModel` or `ConfigDialog` according to their `disableIf`
+        expressions and/or their parent group/tab's check or enabled state.
+
+        :param root: The `ConfigModel` or `ConfigDialog`.
+        :param changed: The config item (or a list of items) that has
+            changed, if known. If provided, only it and the items that
+            depend upon it get updated. If `None`, all items are updated.
+    """
+    ids = None
+    if changed is not None and root.dependencies is not None:
+        if isinstance(changed, ConfigBase):
+            changed = [changed]
+        ids = root.dependencies.downstream(c.configId for c in changed)
+
+    if ids is None:
+        items = list(root.configItems.values())
+    else:
+        items = [root.configItems[cid] for cid in ids if cid in root.configItems]
+
+    with root.displayValues.snapshot('updateDisabledItems'):
+        for item in items:
+            item.updateDisabled()
+
+
+def updateDeviceConfig(device, data: Dict[int, Any]):
+    """ Apply configuration data to a recorder's configuration interface,
+        replacing its current values (except unknown config values read from
+        its config file). The data is not written to the device.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param data: The configuration values, keyed by config ID.
+    """
+    # Clear device's config data (except unknown config values from file)
+    for item in device.config.items.values():
+        item.value = None
+
+    for k, v in data.items():
+        if k in device.config.items:
+            device.config.items[k].configValue = v
+            device.config.items[k].changed = True
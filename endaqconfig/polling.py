@@ -0,0 +1,468 @@
+"""
+Utilities for scheduling repeated polling of devices: per-device adaptive
+intervals (poll quickly after a change, back off while nothing happens), a
+global rate limit on requests, per-device statistics, and a schedule for
+polling a single state that 'settles' (e.g., a network connection).
+
+These have no GUI dependencies; they are used by the device scanning thread
+and by other background threads that poll recorders.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+class AdaptiveInterval(object):
+    """ A polling interval that starts short and grows while polls report
+        no change, up to a maximum. Any change resets it to the minimum.
+    """
+
+    def __init__(self,
+                 minimum: float = 0.5,
+                 maximum: float = 10,
+                 factor: float = 2):
+        """ A polling interval that starts short and grows while polls report
+            no change, up to a maximum.
+
+            :param minimum: The shortest interval (in seconds), used after
+                a change.
+            :param maximum: The longest interval (in seconds), used when
+                nothing has changed for a while.
+            :param factor: The amount by which the interval is multiplied
+                after each poll without a change.
+        """
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.factor = factor
+        self.current = minimum
+
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.current:.2f}s>"
+
+
+    def reset(self) -> float:
+        """ Return to the minimum interval (e.g., after a change, or after
+            a command was sent to the device).
+
+            :return: The new interval.
+        """
+        self.current = self.minimum
+        return self.current
+
+
+    def backoff(self) -> float:
+        """ Increase the interval (e.g., after a poll with no change).
+
+            :return: The new interval.
+        """
+        self.current = min(self.maximum, self.current * self.factor)
+        return self.current
+
+
+    def update(self, changed: bool) -> float:
+        """ Adjust the interval after a poll.
+
+            :param changed: `True` if the poll found a change.
+            :return: The new interval.
+        """
+        return self.reset() if changed else self.backoff()
+
+
+class RateBudget(object):
+    """ A thread-safe limit on the number of requests per second, shared by
+        everything that polls devices (a 'token bucket'). Requests can be
+        made in short bursts, but the average rate is limited.
+    """
+
+    def __init__(self, rate: float = 20, burst: Optional[float] = None):
+        """ A thread-safe limit on the number of requests per second.
+
+            :param rate: The maximum average number of requests per second.
+                0 or `None` means no limit.
+            :param burst: The maximum number of requests that can be made
+                at once. Defaults to `rate`.
+        """
+        self.rate = rate
+        self.burst = burst or rate or 1
+        self.tokens = self.burst
+        self.last = monotonic()
+        self.denied = 0
+        self._lock = threading.Lock()
+
+
+    def acquire(self, cost: float = 1) -> bool:
+        """ Take a request from the budget, if one is available. Does not
+            block.
+
+            :param cost: The number of requests to take.
+            :return: `True` if the request(s) may be made now.
+        """
+        if not self.rate:
+            return True
+
+        with self._lock:
+            now = monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return True
+            self.denied += 1
+            return False
+
+
+class PollStats(object):
+    """ Statistics for the polling of one device.
+    """
+
+    __slots__ = ('polls', 'changes', 'errors', 'timeouts', 'totalTime',
+                 'lastTime', 'maxTime', 'lastPoll', 'lastChange', 'interval')
+
+    def __init__(self):
+        self.polls = 0  # Number of completed polls
+        self.changes = 0  # Number of polls that found a change
+        self.errors = 0  # Number of polls that failed (excluding timeouts)
+        self.timeouts = 0  # Number of polls that timed out
+        self.totalTime = 0.0  # Total time spent polling (seconds)
+        self.lastTime = None  # Duration of the last poll (seconds)
+        self.maxTime = None  # Duration of the slowest poll (seconds)
+        self.lastPoll = None  # `monotonic()` time of the last poll
+        self.lastChange = None  # `monotonic()` time of the last change
+        self.interval = None  # The current polling interval
+
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} polls={self.polls} "
+                f"changes={self.changes} errors={self.errors} "
+                f"timeouts={self.timeouts}>")
+
+
+    @property
+    def meanTime(self) -> Optional[float]:
+        """ The average duration of a poll, in seconds. """
+        if not self.polls:
+            return None
+        return self.totalTime / self.polls
+
+
+    def asDict(self) -> Dict[str, Any]:
+        """ Get the statistics as a dictionary. """
+        d = {k: getattr(self, k) for k in self.__slots__}
+        d['meanTime'] = self.meanTime
+        return d
+
+
+    def record(self,
+               now: float,
+               changed: bool,
+               duration: Optional[float] = None,
+               error: Optional[Exception] = None,
+               timeout: bool = False):
+        """ Record the result of a poll.
+
+            :param now: The `time.monotonic()` time of the poll.
+            :param changed: `True` if the poll found a change.
+            :param duration: The time the poll took (in seconds), if known.
+            :param error: The exception raised by the poll, if any.
+            :param timeout: `True` if the poll timed out.
+        """
+        self.lastPoll = now
+        if timeout:
+            self.timeouts += 1
+        elif error is not None:
+            self.errors += 1
+        else:
+            self.polls += 1
+            if duration is not None:
+                self.totalTime += duration
+                self.lastTime = duration
+                self.maxTime = max(duration, self.maxTime or 0)
+            if changed:
+                self.changes += 1
+                self.lastChange = now
+
+
+class PollScheduler(object):
+    """ Keeps track of when each of a set of devices (or other keys) is due
+        to be polled, adapting each one's interval to how often it changes,
+        and limiting the total rate of polls with a shared `RateBudget`.
+    """
+
+    def __init__(self,
+                 minInterval: float = 0.5,
+                 maxInterval: float = 10,
+                 factor: float = 2,
+                 budget: Optional[RateBudget] = None):
+        """ Keeps track of when each of a set of devices is due to be polled.
+
+            :param minInterval: The shortest interval (in seconds) between
+                polls of a device, used after it changes.
+            :param maxInterval: The longest interval (in seconds) between
+                polls of a device that hasn't changed.
+            :param factor: The amount a device's interval is multiplied by
+                after each poll without a change.
+            :param budget: A `RateBudget` limiting the total number of polls
+                per second. `None` for no limit.
+        """
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.factor = factor
+        self.budget = budget
+
+        self.intervals = {}
+        self.nextPoll = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+
+    def _getInterval(self, key: Hashable) -> AdaptiveInterval:
+        if key not in self.intervals:
+            self.intervals[key] = AdaptiveInterval(self.minInterval,
+                                                   self.maxInterval,
+                                                   self.factor)
+            self.stats[key] = PollStats()
+        return self.intervals[key]
+
+
+    def isDue(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """ Is the given device due to be polled? If it is, and the rate
+            budget allows, the poll is 'spent' from the budget.
+
+            :param key: The device (or other hashable key).
+            :param now: The current `time.monotonic()` time, if known.
+            :return: `True` if the device should be polled now.
+        """
+        now = monotonic() if now is None else now
+        with self._lock:
+            self._getInterval(key)
+            if self.nextPoll.get(key, 0) > now:
+                return False
+        return self.budget is None or self.budget.acquire()
+
+
+    def update(self,
+               key: Hashable,
+               changed: bool,
+               duration: Optional[float] = None,
+               error: Optional[Exception] = None,
+               timeout: bool = False) -> float:
+        """ Record the result of polling a device and schedule its next poll.
+
+            :param key: The device (or other hashable key).
+            :param changed: `True` if the poll found a change.
+            :param duration: The time the poll took (in seconds), if known.
+            :param error: The exception raised by the poll, if any. Outside
+                of a burst, errors (e.g., a busy device) lengthen the
+                interval.
+            :param timeout: `True` if the poll timed out. Timeouts keep the
+                current interval.
+            :return: The time (in seconds) until the next poll.
+        """
+        now = monotonic()
+        with self._lock:
+            interval = self._getInterval(key).update(changed)
+            stats = self.stats[key]
+            self.nextPoll[key] = now + interval
+
+            stats.interval = interval
+            stats.record(now, changed, duration, error, timeout)
+
+        return interval
+
+
+    def timeUntilDue(self, keys: Optional[Iterable[Hashable]] = None) -> Optional[float]:
+        """ Get the time until the next device is due to be polled.
+
+            :param keys: The devices to consider. Defaults to all.
+            :return: The time (in seconds) until the next poll, 0 if one is
+                overdue, or `None` if there are no devices.
+        """
+        now = monotonic()
+        with self._lock:
+            if keys is None:
+                keys = list(self.intervals)
+            due = [self.nextPoll.get(k, 0) for k in keys]
+        if not due:
+            return None
+        return max(0, min(due) - now)
+
+
+    def wake(self, key: Hashable):
+        """ Poll a device soon, at the minimum interval (e.g., after sending
+            it a command that will change its state).
+
+            :param key: The device (or other hashable key).
+        """
+        with self._lock:
+            self._getInterval(key).reset()
+            self.nextPoll[key] = 0
+
+
+    def forget(self, key: Hashable):
+        """ Remove a device (e.g., one that has been disconnected).
+
+            :param key: The device (or other hashable key).
+        """
+        with self._lock:
+            self.intervals.pop(key, None)
+            self.nextPoll.pop(key, None)
+            self.stats.pop(key, None)
+
+
+    def retain(self, keys):
+        """ Remove all devices except the given ones (e.g., the ones found
+            in the latest scan).
+
+            :param keys: The devices (or other hashable keys) to keep.
+        """
+        keys = set(keys)
+        with self._lock:
+            for key in set(self.intervals).difference(keys):
+                self.intervals.pop(key, None)
+                self.nextPoll.pop(key, None)
+                self.stats.pop(key, None)
+
+
+    def getStats(self) -> Dict[Hashable, PollStats]:
+        """ Get the polling statistics for every device.
+
+            :return: A dictionary of `PollStats`, keyed by device.
+        """
+        with self._lock:
+            return dict(self.stats)
+
+
+class StatePollSchedule(object):
+    """ The schedule for repeatedly polling a single state, such as a
+        device's network connection. Polls are made at a regular interval,
+        which backs off exponentially once the state has been 'stable' for
+        a while. After doing something that should change the state, a
+        'burst' of rapid polls is made until the state settles.
+    """
+
+    def __init__(self,
+                 interval: float = 4,
+                 maxInterval: float = 60,
+                 factor: float = 2,
+                 stableTime: float = 30,
+                 isStable: Optional[Callable[[Any], bool]] = None,
+                 burstInterval: float = 0.5,
+                 burstTime: float = 30):
+        """ The schedule for repeatedly polling a single state.
+
+            :param interval: The normal interval (in seconds) between polls.
+            :param maxInterval: The longest interval (in seconds) between
+                polls, once the state has been stable for a while.
+            :param factor: The amount by which the interval is multiplied
+                after each poll once the state is stable.
+            :param stableTime: The time (in seconds) the state must remain
+                stable (and unchanged) before the interval starts to grow.
+            :param isStable: A function that takes a state and returns
+                `True` if it is stable. Defaults to all states.
+            :param burstInterval: The interval (in seconds) between polls
+                during a burst.
+            :param burstTime: The maximum duration (in seconds) of a burst.
+        """
+        self.interval = AdaptiveInterval(interval, maxInterval, factor)
+        self.stableTime = stableTime
+        self.isStable = isStable or (lambda state: True)
+        self.burstInterval = burstInterval
+        self.burstTime = burstTime
+
+        self.state = None
+        self.stableSince = None  # `monotonic()` time the state became stable
+        self.burstUntil = None  # `monotonic()` time the burst ends, if any
+        self.settled = None  # Function to check if a burst is over
+        self.stats = PollStats()
+        self._lock = threading.Lock()
+
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} {self.interval.current:.2f}s "
+                f"state={self.state!r}{' (burst)' if self.bursting else ''}>")
+
+
+    @property
+    def bursting(self) -> bool:
+        """ Is a burst of rapid polls in progress? """
+        return self.burstUntil is not None
+
+
+    def burst(self,
+              settled: Optional[Callable[[Any], bool]] = None,
+              duration: Optional[float] = None) -> float:
+        """ Start a burst of rapid polls (e.g., after sending a command that
+            changes the state), which ends when the state settles.
+
+            :param settled: A function that takes a state and returns `True`
+                if it is the one expected. Defaults to `isStable`.
+            :param duration: The maximum duration (in seconds) of the
+                burst. Defaults to `burstTime`.
+            :return: The interval until the next poll.
+        """
+        with self._lock:
+            self.burstUntil = monotonic() + (self.burstTime if duration is None else duration)
+            self.settled = settled or self.isStable
+            self.stableSince = None
+            self.interval.reset()
+            self.stats.interval = self.burstInterval
+            return self.burstInterval
+
+
+    def update(self,
+               state: Any = None,
+               duration: Optional[float] = None,
+               error: Optional[Exception] = None,
+               timeout: bool = False) -> float:
+        """ Record the result of a poll and get the interval until the next.
+
+            :param state: The state found by the poll (ignored if the poll
+                failed).
+            :param duration: The time the poll took (in seconds), if known.
+            :param error: The exception raised by the poll, if any.
+            :param timeout: `True` if the poll timed out.
+            :return: The time (in seconds) until the next poll.
+        """
+        now = monotonic()
+        ok = error is None and not timeout
+
+        with self._lock:
+            changed = ok and state != self.state
+            self.stats.record(now, changed, duration, error, timeout)
+
+            if ok:
+                self.state = state
+                if not self.isStable(state):
+                    self.stableSince = None
+                elif changed or self.stableSince is None:
+                    self.stableSince = now
+
+            if self.burstUntil is not None:
+                if now < self.burstUntil and not (ok and self.settled(state)):
+                    self.stats.interval = self.burstInterval
+                    return self.burstInterval
+                self.burstUntil = self.settled = None
+
+            if error is not None:
+                # Don't add to the load on a device that reported a problem.
+                interval = self.interval.backoff()
+            elif not ok:
+                # Unknown state: keep the current interval.
+                interval = self.interval.current
+            elif (self.stableSince is not None
+                    and now - self.stableSince >= self.stableTime):
+                interval = self.interval.backoff()
+            else:
+                interval = self.interval.reset()
+
+            self.stats.interval = interval
+            return interval
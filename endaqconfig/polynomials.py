@@ -0,0 +1,204 @@
+"""
+Polynomial math for `Univariate` and `Bivariate` calibration transforms:
+reducing them to polynomials with references of zero, and evaluating them
+over arrays of samples. The transforms are only used for their
+`coefficients` and `references`, so nothing here requires wx (or idelib).
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from functools import lru_cache
+from math import factorial
+
+import numpy as np
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def n_choose_k(n, k):
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+@lru_cache(maxsize=None)
+def _pascal(size):
+    """ Get the upper-triangular Pascal matrix of binomial coefficients
+        (``P[j, k] = k choose j``) and the matrix of exponents
+        (``k - j``, or 0 below the diagonal) for a polynomial with `size`
+        coefficients. The arrays are shared; do not modify them.
+    """
+    rows = [[1]]
+    for n in range(1, size):
+        prev = rows[-1]
+        rows.append([1] + [prev[i] + prev[i + 1] for i in range(n - 1)] + [1])
+
+    # Binomials are computed as exact integers, then converted (as in
+    # `n_choose_k()`), so large orders are no less accurate.
+    binomials = np.zeros((size, size))
+    for k, row in enumerate(rows):
+        binomials[:k + 1, k] = row
+
+    idx = np.arange(size)
+    exponents = np.maximum(idx[None, :] - idx[:, None], 0)
+
+    binomials.flags.writeable = False
+    exponents.flags.writeable = False
+    return binomials, exponents
+
+
+def _taylor_shift_matrix(size, offset):
+    """ Get the matrix that shifts the coefficients of a polynomial (lowest
+        order first) from the variable `x` to `x - offset`, i.e.
+        ``T[j, k] = (k choose j) * (-offset) ** (k - j)``.
+    """
+    binomials, exponents = _pascal(size)
+    # Note: numpy gives 0 ** 0 == 1, as required; zeros below the diagonal
+    # come from the binomial matrix.
+    return binomials * np.power(-float(offset), exponents)
+
+
+def get_reduced_polynomial_coefficients(coefficients, references):
+    r"""
+    Reduces any univariate or bivariate polynomial to one where the references values are all zero.
+
+    The guiding math used to calculate the coefficients can be given as the following LaTeX code,
+    with occurrences of 0^0 being replaced by 1:
+
+    For the univariate case, the desired formulation is:
+    P = \sum\limits_{j=0}^{n} x^j \sum\limits_{i=j}^{n} a_i (-s)^{i-j} {i\choose j}
+
+    For the bivariate case, the desired formulation is as follows (with C being the coefficient matrix to be returned):
+    P = \sum\limits_{i=0}^{n} \sum\limits_{j=0}^{n} x^i y^j *C_{i,j}
+
+    This coefficient matrix C is calculated using the following equation:
+    C_{i,j} = \sum\limits_{k=i}^{n} \sum\limits_{g=j}^{n} a_{k,g} {g\choose j} {k\choose i} (-s)^{g-j} (-r)^{k-i}
+
+    In the above math, A is the coefficient matrix of the
+    unshifted polynomial, and s and r and the offsets of x and y
+    respectively
+
+    Both are computed as products with 'Taylor shift' matrices
+    (T_{j,i} = {i\choose j} (-s)^{i-j}, Pascal's triangle scaled by powers of
+    the offset): the univariate case is T(s) a, and the bivariate case is
+    T(r) A T(s)^T.
+
+    :param coefficients: The list of coefficients for the calibration polynomial
+    :param references: The list of references (offsets) for the variables
+    :return: The coefficients of the reduced polynomial.  This will represent the same polynomial as the one given,
+    but with only zero reference values.
+    """
+    coefficients = np.asarray(coefficients, dtype=np.float64)
+
+    if len(references) == 1:
+        out = _taylor_shift_matrix(len(coefficients), references[0]) @ coefficients
+    else:
+        coeff_length = int(np.sqrt(len(coefficients)))
+        coefficients = coefficients.reshape(coeff_length, coeff_length)[::-1, ::-1].T
+
+        out = (_taylor_shift_matrix(coeff_length, references[1])
+               @ coefficients
+               @ _taylor_shift_matrix(coeff_length, references[0]).T)
+
+        out = out[::-1, ::-1].T
+    return out
+
+
+def getReducedCoefficients(cal):
+    """ Get the coefficients of a `Univariate` or `Bivariate` polynomial
+        reduced to one with references of zero, in the same order as the
+        transform's own (highest order first).
+
+        :param cal: The `Univariate` or `Bivariate` transform.
+        :return: A 1D array of coefficients.
+    """
+    coeffs = np.asarray(cal.coefficients, dtype=np.float64)
+    if len(cal.references) == 1:
+        # `get_reduced_polynomial_coefficients()` takes univariate
+        # coefficients lowest order first.
+        return get_reduced_polynomial_coefficients(coeffs[::-1], cal.references)[::-1]
+    return get_reduced_polynomial_coefficients(coeffs, cal.references).flatten()
+
+
+def evaluateCalibration(cal, values, reference=None):
+    """ Apply a `Univariate` or `Bivariate` polynomial to an array of raw
+        samples, using its reduced coefficients.
+
+        :param cal: The `Univariate` or `Bivariate` transform.
+        :param values: An array (or scalar) of raw sample values.
+        :param reference: For `Bivariate` polynomials, the values of the
+            reference channel: a scalar, or an array that broadcasts
+            against `values`. Ignored by `Univariate` polynomials.
+        :return: An array of calibrated values.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    coeffs = getReducedCoefficients(cal)
+
+    if len(cal.references) == 1:
+        return np.polyval(coeffs, x)
+
+    if len(coeffs) == 1:
+        return np.full(np.broadcast(x, reference).shape, coeffs[0])
+
+    if reference is None:
+        raise ValueError("Bivariate polynomials require reference channel values")
+
+    # a*x*y + b*x + c*y + d
+    y = np.asarray(reference, dtype=np.float64)
+    a, b, c, d = coeffs
+    return (a * y + b) * x + (c * y + d)
+
+
+def makeSweep(cal, points=101, span=100.0, referencePoints=11,
+              referenceSpan=50.0):
+    """ Generate a synthetic sweep of raw sample values (and reference
+        channel values, for `Bivariate` polynomials), centered on the
+        polynomial's references. The arrays are shaped to broadcast against
+        each other, forming a grid.
+
+        :param cal: The `Univariate` or `Bivariate` transform.
+        :param points: The number of sample values.
+        :param span: The range of the sample values.
+        :param referencePoints: The number of reference channel values.
+        :param referenceSpan: The range of the reference channel values.
+        :return: A tuple of sample values and reference channel values
+            (`None` for `Univariate` polynomials).
+    """
+    refs = cal.references
+    x = refs[0] + np.linspace(-span / 2, span / 2, points)
+    if len(refs) == 1:
+        return x, None
+    y = refs[1] + np.linspace(-referenceSpan / 2, referenceSpan / 2, referencePoints)
+    return x[None, :], y[:, None]
+
+
+def maxDeviation(cal, other, values=None, reference=None):
+    """ Find the maximum difference between two calibration polynomials
+        (e.g., a user calibration and the factory calibration) applied to
+        the same samples.
+
+        :param cal: The `Univariate` or `Bivariate` transform.
+        :param other: The transform to compare against.
+        :param values: An array of raw sample values. Defaults to a sweep
+            generated by `makeSweep()` for `other`.
+        :param reference: The values of the reference channel, for
+            `Bivariate` polynomials. Defaults to those of the sweep.
+        :return: A tuple containing the maximum absolute difference and the
+            sample (and reference) value at which it occurs.
+    """
+    bivariate = len(cal.references) > 1 or len(other.references) > 1
+    if values is None:
+        # Sweep around the references of the bivariate one, if any.
+        values, sweepRef = makeSweep(cal if len(cal.references) > 1 else other)
+        if reference is None:
+            reference = sweepRef
+
+    diff = np.abs(evaluateCalibration(cal, values, reference)
+                  - evaluateCalibration(other, values, reference))
+
+    idx = np.unravel_index(np.argmax(diff), diff.shape)
+    x = float(np.broadcast_to(values, diff.shape)[idx])
+    y = None
+    if bivariate and reference is not None:
+        y = float(np.broadcast_to(reference, diff.shape)[idx])
+    return float(diff[idx]), x, y
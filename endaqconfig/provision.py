@@ -0,0 +1,165 @@
+"""
+Non-interactive provisioning: apply an exported configuration (``.xcg``) to
+many recorders at once, without the GUI. Each device is handled in its own
+worker thread, so the total time is close to that of the slowest device
+rather than the sum of all of them.
+
+The configuration values are normalized through a headless `ConfigModel`
+built from each device's own ``CONFIG.UI``, so the data written is the same
+as if the export had been imported and saved in the configuration dialog.
+No windows are created, and wxPython is not required.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from endaq.device import configio, getDevices
+
+from .fields import logger
+from .model import ConfigModel, IMPORT_EXCLUDE_IDS
+
+# ===============================================================================
+#
+# ===============================================================================
+
+# The default maximum number of devices configured simultaneously.
+DEFAULT_WORKERS = 8
+
+
+def loadExport(filename) -> Dict[int, Any]:
+    """ Read the configuration values from an exported config file. The file
+        is read only once, regardless of the number of devices provisioned.
+
+        :param filename: The name of an exported config file (``.xcg``).
+        :return: A dictionary of configuration values, keyed by config ID.
+    """
+    imported = configio.deviceFromExport(filename)
+    return {configId: item.value
+            for configId, item in imported.config.items.items()}
+
+
+def matchDevice(device, patterns: Optional[Iterable[str]] = None) -> bool:
+    """ Check if a recorder matches any of a set of filter patterns. Patterns
+        are shell-style wildcards (e.g., ``"S0001*"``), compared to the
+        device's serial number, part number, name, and path.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param patterns: A list of patterns. If empty or `None`, all devices
+            match.
+        :return: `True` if the device matches.
+    """
+    if not patterns:
+        return True
+
+    attribs = [device.serial, device.partNumber, device.name, device.path]
+    attribs = [str(a) for a in attribs if a]
+    return any(fnmatch(a, p) for p in patterns for a in attribs)
+
+
+def provisionDevice(device,
+                    values: Dict[int, Any],
+                    setClock: bool = False,
+                    exclude: Iterable[int] = IMPORT_EXCLUDE_IDS) -> Dict[str, Any]:
+    """ Apply configuration values to a single recorder and (optionally) set
+        its clock. Errors are caught and included in the result, so one bad
+        device does not stop the others.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param values: The configuration values to apply, keyed by config
+            ID (i.e., from `loadExport()`).
+        :param setClock: If `True`, also set the device's clock.
+        :param exclude: Config IDs to leave unchanged (name, notes, Wi-Fi).
+        :return: A dictionary describing the result, suitable for JSON.
+    """
+    result = {'serial': device.serial,
+              'partNumber': device.partNumber,
+              'name': device.name,
+              'path': device.path,
+              'ok': False,
+              'clockSet': False,
+              'error': None}
+
+    t0 = time.perf_counter()
+    try:
+        # Same as `configio.importConfig()`, but using values already read.
+        for configId, item in device.config.items.items():
+            if configId not in exclude:
+                item.value = values.get(configId)
+
+        model = ConfigModel.fromDevice(device, original=False)
+        model.updateDeviceConfig()
+
+        # Non-interactive: always use the latest config version (the
+        # dialog's recommended choice).
+        device.config.applyConfig(unknown=True)
+
+        if setClock:
+            device.setTime()
+            result['clockSet'] = True
+
+        result['ok'] = True
+
+    except Exception as err:
+        logger.error(f"Failed to provision {device}: {err!r}")
+        result['error'] = f"{type(err).__name__}: {err}"
+
+    result['time'] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def provision(filename,
+              patterns: Optional[Iterable[str]] = None,
+              paths: Optional[List[str]] = None,
+              setClock: bool = False,
+              workers: int = DEFAULT_WORKERS) -> Dict[str, Any]:
+    """ Apply an exported configuration to all matching recorders, in
+        parallel.
+
+        :param filename: The name of an exported config file (``.xcg``).
+        :param patterns: Shell-style patterns for filtering devices (see
+            `matchDevice()`). If empty or `None`, all devices are configured.
+        :param paths: Specific device paths to check, instead of all
+            attached recorders.
+        :param setClock: If `True`, also set each device's clock.
+        :param workers: The maximum number of devices configured at once.
+        :return: A summary dictionary, suitable for JSON: the per-device
+            results, the number of failures, and the total time.
+    """
+    t0 = time.perf_counter()
+    values = loadExport(filename)
+    devices = [d for d in getDevices(paths) if matchDevice(d, patterns)]
+    logger.info(f"Provisioning {len(devices)} device(s) from {filename}")
+
+    results = []
+    if devices:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(devices))),
+                                thread_name_prefix='provision') as pool:
+            results = list(pool.map(lambda d: provisionDevice(d, values, setClock),
+                                    devices))
+
+    return {'config': str(filename),
+            'devices': results,
+            'failed': sum(1 for r in results if not r['ok']),
+            'slowest': max((r['time'] for r in results), default=0),
+            'time': round(time.perf_counter() - t0, 3)}
+
+
+def writeSummary(summary: Dict[str, Any], output=None):
+    """ Write a provisioning summary as JSON.
+
+        :param summary: The summary dictionary (from `provision()`).
+        :param output: The name of the file to write. Writes to stdout if
+            `None` or ``"-"``.
+    """
+    text = json.dumps(summary, indent=2, default=str)
+    if output and output != '-':
+        with open(output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
@@ -12,16 +12,17 @@ from datetime import datetime
 import html
 import os.path
 import time
-from math import factorial
-
-import numpy as np
 
 import wx
 from wx.html import HtmlWindow
 import wx.lib.wxpTag  # @UnusedImport - simply importing it does the work.
 
-from .widgets.calibration_editor import PolyEditDialog
+from .widgets.calibration_editor import PolyEditDialog, TransformUsage
+from .polynomials import getReducedCoefficients
+# For backwards compatibility; these were defined here
+from .polynomials import n_choose_k, get_reduced_polynomial_coefficients  # @UnusedImport
 
+from . import fields
 from .base import Tab, logger, registerTab
 
 
@@ -29,61 +30,6 @@ from .base import Tab, logger, registerTab
 #
 #===============================================================================
 
-def n_choose_k(n, k):
-    return factorial(n) // (factorial(k) * factorial(n - k))
-
-
-def get_reduced_polynomial_coefficients(coefficients, references):
-    """
-    Reduces any univariate or bivariate polynomial to one where the references values are all zero.
-
-    The guiding math used to calculate the coefficients can be given as the following LaTeX code,
-    with occurrences of 0^0 being replaced by 1 (seen in the conditional statements within the code):
-
-    For the univariate case, the desired formulation is:
-    P = \sum\limits_{j=0}^{n} x^j \sum\limits_{i=j}^{n} a_i (-s)^{i-j} {i\choose j}
-
-    For the bivariate case, the desired formulation is as follows (with C being the coefficient matrix to be returned):
-    P = \sum\limits_{i=0}^{n} \sum\limits_{j=0}^{n} x^i y^j *C_{i,j}
-
-    This coefficient matrix C is calculated using the following equation:
-    C_{i,j} = \sum\limits_{k=i}^{n} \sum\limits_{g=j}^{n} a_{k,g} {g\choose j} {k\choose i} (-s)^{g-j} (-r)^{k-i}
-
-    In the above math, A is the coefficient matrix of the
-    unshifted polynomial, and s and r and the offsets of x and y
-    respectively
-
-
-    :param coefficients: The list of coefficients for the calibration polynomial
-    :param references: The list of references (offsets) for the variables
-    :return: The coefficients of the reduced polynomial.  This will represent the same polynomial as the one given,
-    but with only zero reference values.
-    """
-    if len(references) == 1:
-        out = np.zeros(len(coefficients))
-        for j in range(len(coefficients)):
-            for k in range(j, len(coefficients)):
-                offset_power = (-references[0]) ** (k - j) if references[0] != 0 or k != j else 1
-
-                out[j] += coefficients[k] * offset_power * n_choose_k(k, j)
-    else:
-        coeff_length = int(np.sqrt(len(coefficients)))
-        out = np.zeros((coeff_length, coeff_length))
-        coefficients = np.array(coefficients).reshape(coeff_length, coeff_length)[::-1, ::-1].T
-
-        for j in range(coeff_length):
-            for k in range(coeff_length):
-                for m in range(j, coeff_length):
-                    for n in range(k, coeff_length):
-                        offset_power1 = (-references[0]) ** (n - k) if references[0] != 0 or n != k else 1
-                        offset_power2 = (-references[1]) ** (m - j) if references[1] != 0 or m != j else 1
-
-                        out[j, k] += coefficients[m, n] * n_choose_k(n, k) * n_choose_k(m, j) * offset_power1 * offset_power2
-
-        out = out[::-1, ::-1].T
-    return out
-
-
 class InfoPanel(HtmlWindow):
     """ A generic configuration dialog page showing various read-only properties
         of a recorder. Displays HTML.
@@ -388,12 +334,21 @@ class CalibrationPanel(InfoPanel):
 
     def __init__(self, parent, id_, calSerial=None, calDate=None,
                  calExpiry=None, channels=None, editable=False,
-                 hideUnused=True, **kwargs):
+                 hideUnused=True, usage=None, **kwargs):
+        """ Constructor. Takes standard `InfoPanel` arguments, plus:
+
+            :keyword channels: A dictionary of the recorder's Channels. If
+                `None`, they are read from the root's device.
+            :keyword usage: A `TransformUsage` index of the channels'
+                transforms. If `None`, the root's is used (or one is
+                created from `channels`, if supplied).
+        """
         self.editable = editable
         self.calSerial = calSerial
         self.calDate = calDate
         self.calExpiry = calExpiry
         self.channels = channels
+        self.usage = usage
         self.hideUnused = hideUnused
         self.initialized = False
 
@@ -402,6 +357,12 @@ class CalibrationPanel(InfoPanel):
         self.calWxIds = {}
         self.revertIds = {}
         self.revertWxIds = {}
+
+        # Cached HTML for each polynomial (see `fragmentKey()`), and the
+        # page last shown.
+        self.fragments = {}
+        self.lastPage = None
+
         super(CalibrationPanel, self).__init__(parent, id_, **kwargs)
 
 
@@ -418,8 +379,14 @@ class CalibrationPanel(InfoPanel):
 #             else:
 #                 self.info = []
 
-        if self.channels is None:
-            self.channels = self.root.device.getChannels()
+        if self.usage is None:
+            if self.channels is None and hasattr(self.root, 'getTransformUsage'):
+                self.usage = self.root.getTransformUsage()
+            elif self.channels is None:
+                self.usage = TransformUsage(self.root.device.getChannels())
+            else:
+                self.usage = TransformUsage(self.channels)
+        self.channels = self.usage.channels
 
         self.info.sort(key=lambda x: x.id)
 
@@ -458,24 +425,82 @@ class CalibrationPanel(InfoPanel):
                 '</wxp>')
 
 
-    def buildUI(self):
-        """ Create the UI elements within the page. Every subclass should
-            implement this. Called after __init__() and before initUI().
+    @staticmethod
+    def channelName(ch):
+        """ Pretty-print a Channel or SubChannel name (as HTML).
         """
+        if hasattr(ch, 'subchannels'):
+            return f"Channel {ch.id}: <i>{ch.displayName}</i>"
+        return f"Channel {ch.parent.id}.{ch.id}: <i>{ch.displayName}</i>"
+
 
-        def _usesCal(cal, ch):
-            # Helper function to determine users of a transform
+    @staticmethod
+    def fragmentKey(cal):
+        """ Get the key for a polynomial's cached HTML: everything shown
+            about it.
+        """
+        return (cal.id, type(cal), tuple(cal.coefficients), tuple(cal.references),
+                getattr(cal, 'channelId', None), getattr(cal, 'subchannelId', None))
+
+
+    def buildCalHtml(self, cal):
+        """ Generate the HTML for one calibration polynomial.
+
+            :param cal: The polynomial.
+            :return: The HTML, or `None` if the polynomial is not shown.
+        """
+        users = [self.channelName(ch) for ch in self.usage.getUsers(cal.id)]
+
+        if len(users) == 0:
+            # Only show polynomials used by channels if explicitly told to.
+            if self.hideUnused:
+                return None
+            else:
+                users = ["None"]
+
+        html = []
+        t = (f"<p><b>Calibration ID {cal.id} (Used by {'; '.join(users)})</b>")
+        if self.editable:
+            t += "<br>"+self.addEditButton(cal)
+        html.append(t)
+
+        calType = cal.__class__.__name__
+        if hasattr(cal, 'channelId'):
             try:
-                return ch.transform == cal.id or ch.transform.id == cal.id
-            except AttributeError:  # as err:
-                return False
+                if hasattr(cal, 'subchannelId'):
+                    ref = self.channelName(self.channels[cal.channelId][cal.subchannelId])
+                else:
+                    ref = self.channelName(self.channels[cal.channelId])
+                calType = f"{calType}; references {ref}"
+            except (IndexError, AttributeError, KeyError) as err:
+                logger.debug(f'Ignored error formatting polynomial reference: {err!r}')
 
-        def _chName(ch):
-            # Helper function to pretty-print (Sub)Channel names
-            if hasattr(ch, 'subchannels'):
-                return f"Channel {ch.id}: <i>{ch.displayName}</i>"
-            return f"Channel {ch.parent.id}.{ch.id}: <i>{ch.displayName}</i>"
+        html.append('<ul>')
+        html.append(f'<li>{calType}</li>')
+        if hasattr(cal, 'coefficients'):
+            coeffs = ', '.join(map(self.cleanFloat, cal.coefficients))
+            refs = ', '.join(map(self.cleanFloat, cal.references))
+            html.append(f'<li>Coefficients: <tt>{coeffs}</tt></li>')
+            html.append(f'<li>Reference(s): <tt>{refs}</tt></li>')
 
+        reduced_polynomial_coeffs = getReducedCoefficients(cal)
+
+        poly = cal.__class__(reduced_polynomial_coeffs, channelId=-1, subchannelId=-1).source.split()[-1]
+        html.append(f'<li>Polynomial: <tt>{cal!s}</tt></li>')
+        if str(cal) != poly:
+            html.append(f'<li>Polynomial, Reduced: <tt>{poly}</tt></li>')
+        html.append('</ul></p>')
+
+        return ''.join(html)
+
+
+    def buildUI(self):
+        """ Create the UI elements within the page. Every subclass should
+            implement this. Called after __init__() and before initUI().
+
+            Each polynomial's HTML is cached; only those that have changed
+            since the last time are regenerated.
+        """
         # HACK: other panels assume they will only have their contents generated
         # once, but this one will redraw if its contents were edited.
         if not self.initialized:
@@ -502,59 +527,36 @@ class CalibrationPanel(InfoPanel):
                                  f'<param name="id" value="{int(self.ID_CREATE_CAL)}">'
                                  '</wxp>')
 
+        fragments = {}
         for cal in self.info:
             if cal.id is None:
                 # HACK: This shouldn't happen.
                 continue
 
-            # Collect the users of the calibration polynomial
-            users = []
-            for ch in self.channels.values():
-                if _usesCal(cal, ch):
-                    users.append(_chName(ch))
-                users.extend([_chName(subch) for subch in ch.subchannels if _usesCal(cal, subch)])
+            key = self.fragmentKey(cal)
+            if key in self.fragments:
+                fragment = self.fragments[key]
+                if fragment is not None and self.editable:
+                    # Map the (unchanged) button IDs to this polynomial object
+                    self.addEditButton(cal)
+            else:
+                fragment = self.buildCalHtml(cal)
 
-            if len(users) == 0:
-                # Only show polynomials used by channels if explicitly told to.
-                if self.hideUnused:
-                    continue
-                else:
-                    users = ["None"]
+            fragments[key] = fragment
+            if fragment is not None:
+                self.html.append(fragment)
 
-            t = (f"<p><b>Calibration ID {cal.id} (Used by {'; '.join(users)})</b>")
-            if self.editable:
-                t += "<br>"+self.addEditButton(cal)
-            self.html.append(t)
-
-            calType = cal.__class__.__name__
-            if hasattr(cal, 'channelId'):
-                try:
-                    if hasattr(cal, 'subchannelId'):
-                        ref = _chName(self.channels[cal.channelId][cal.subchannelId])
-                    else:
-                        ref = _chName(self.channels[cal.channelId])
-                    calType = f"{calType}; references {ref}"
-                except (IndexError, AttributeError, KeyError) as err:
-                    logger.debug(f'Ignored error formatting polynomial reference: {err!r}')
-
-            self.html.append('<ul>')
-            self.html.append(f'<li>{calType}</li>')
-            if hasattr(cal, 'coefficients'):
-                coeffs = ', '.join(map(self.cleanFloat, cal.coefficients))
-                refs = ', '.join(map(self.cleanFloat, cal.references))
-                self.html.append(f'<li>Coefficients: <tt>{coeffs}</tt></li>')
-                self.html.append(f'<li>Reference(s): <tt>{refs}</tt></li>')
-
-            reduced_polynomial_coeffs = get_reduced_polynomial_coefficients(cal.coefficients, cal.references).flatten()
-
-            poly = cal.__class__(reduced_polynomial_coeffs, channelId=-1, subchannelId=-1).source.split()[-1]
-            self.html.append(f'<li>Polynomial: <tt>{cal!s}</tt></li>')
-            if str(cal) != poly:
-                self.html.append(f'<li>Polynomial, Reduced: <tt>{poly}</tt></li>')
-            self.html.append('</ul></p>')
+        # Only keep the fragments currently shown
+        self.fragments = fragments
 
         self.html.append("</body></html>")
-        self.SetPage(''.join(self.html))
+        page = ''.join(self.html)
+
+        # Setting the page recreates all the embedded buttons; don't if it
+        # hasn't changed (e.g., reverting an unmodified polynomial).
+        if page != self.lastPage:
+            self.SetPage(page)
+            self.lastPage = page
 
 
 class EditableCalibrationPanel(wx.Panel):
@@ -644,7 +646,7 @@ class EditableCalibrationPanel(wx.Panel):
             dlg = PolyEditDialog(self, -1, transforms=self.info,
                                  channels=self.html.channels, cal=cal,
                                  changeSource=False, changeType=False,
-                                 savedCal=savedCal)
+                                 savedCal=savedCal, usage=self.html.usage)
             if dlg.ShowModal() == wx.ID_OK:
                 self.info[dlg.cal.id] = dlg.cal
                 self.updateCalDisplay()
@@ -668,7 +670,7 @@ class EditableCalibrationPanel(wx.Panel):
 #===============================================================================
 
 @registerTab
-class DeviceInfoTab(Tab):
+class DeviceInfoTab(fields.DeviceInfoTab, Tab):
     """ Special-case Tab for showing device info. The tab's default behavior
         shows the appropriate info for Slam Stick recorders, no child fields
         required.
@@ -677,10 +679,6 @@ class DeviceInfoTab(Tab):
             system.
     """
 
-    def __init__(self, *args, **kwargs):
-        self.setAttribDefault("label", "Recorder Info")
-        super(DeviceInfoTab, self).__init__(*args, **kwargs)
-
 
     def initUI(self):
         dev = self.root.device
@@ -708,7 +706,7 @@ class DeviceInfoTab(Tab):
 
 
 @registerTab
-class FactoryCalibrationTab(DeviceInfoTab):
+class FactoryCalibrationTab(fields.FactoryCalibrationTab, DeviceInfoTab):
     """ Special-case Tab for showing recorder's factory-set calibration
         polynomials. The tab's default behavior shows the appropriate info for
         Slam Stick recorders, no child fields required.
@@ -716,9 +714,6 @@ class FactoryCalibrationTab(DeviceInfoTab):
         TODO: Refactor and clean up FactoryCalibrationTab, removing dependency
             on old system.
     """
-    def __init__(self, *args, **kwargs):
-        self.setAttribDefault('label', 'Factory Calibration')
-        super(FactoryCalibrationTab, self).__init__(*args, **kwargs)
 
 
     def initUI(self):
@@ -740,7 +735,7 @@ class FactoryCalibrationTab(DeviceInfoTab):
 
 
 @registerTab
-class UserCalibrationTab(FactoryCalibrationTab):
+class UserCalibrationTab(fields.UserCalibrationTab, FactoryCalibrationTab):
     """ Special-case Tab for showing recorder's user-defined calibration
         polynomials. The tab's default behavior shows the appropriate info for
         Slam Stick recorders, no child fields required.
@@ -748,9 +743,6 @@ class UserCalibrationTab(FactoryCalibrationTab):
         TODO: Refactor and clean up UserCalibrationTab, removing dependency on
             old system.
     """
-    def __init__(self, *args, **kwargs):
-        self.setAttribDefault('label', 'User Calibration')
-        super(UserCalibrationTab, self).__init__(*args, **kwargs)
 
 
     def initUI(self):
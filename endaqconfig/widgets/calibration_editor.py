@@ -8,6 +8,8 @@ import wx.lib.sized_controls as SC
 
 from idelib.transforms import Transform, Univariate, Bivariate
 
+from ..polynomials import maxDeviation
+
 
 #===============================================================================
 #
@@ -17,6 +19,87 @@ def cleanSplit(s, dtype=float):
     return tuple(map(dtype, [x for x in s.strip().split() if len(x) > 0]))
 
 
+#===============================================================================
+# Transform users
+#===============================================================================
+
+class TransformUsage(object):
+    """ A reverse index of the calibration transforms used by a recorder's
+        Channels and SubChannels: the users of each transform ID, and the
+        transform ID used by each (Sub)Channel. Built once (e.g., per
+        configuration dialog) and shared by everything that needs it.
+    """
+
+    def __init__(self, channels):
+        """ A reverse index of the calibration transforms used by a
+            recorder's Channels and SubChannels.
+
+            :param channels: A dictionary of Channels, keyed by ID (e.g.,
+                from `Recorder.getChannels()`).
+        """
+        self.channels = channels or {}
+        self.subchannels = []  # All SubChannels, in order
+        self.users = {}  # (Sub)Channels using each transform, keyed by ID
+        self.transformIds = {}  # Transform IDs, keyed by `channelKey()`
+
+        for ch in self.channels.values():
+            self._add(ch)
+            for subch in ch.subchannels:
+                if subch is not None:
+                    self.subchannels.append(subch)
+                    self._add(subch)
+
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} {len(self.users)} transforms, "
+                f"{len(self.transformIds)} users>")
+
+
+    @staticmethod
+    def channelKey(ch):
+        """ Get the key for a Channel or SubChannel: a tuple of the channel
+            ID and the subchannel ID (`None` for Channels). Channels can't
+            be used as keys themselves; they aren't hashable.
+        """
+        if hasattr(ch, 'subchannels'):
+            return ch.id, None
+        return ch.parent.id, ch.id
+
+
+    @staticmethod
+    def transformId(transform):
+        """ Get a transform's ID. Channels' `transform` may be the transform
+            or its ID.
+        """
+        return getattr(transform, 'id', transform)
+
+
+    def _add(self, ch):
+        calId = self.transformId(getattr(ch, 'transform', None))
+        if calId is not None:
+            self.transformIds[self.channelKey(ch)] = calId
+            self.users.setdefault(calId, []).append(ch)
+
+
+    def getUsers(self, cal):
+        """ Get the Channels and SubChannels that use a transform.
+
+            :param cal: The transform, or its ID.
+            :return: A list of Channels and SubChannels.
+        """
+        return self.users.get(self.transformId(cal), [])
+
+
+    def uses(self, ch, cal):
+        """ Does a Channel or SubChannel use a transform?
+
+            :param ch: The Channel or SubChannel.
+            :param cal: The transform, or its ID.
+        """
+        calId = self.transformId(cal)
+        return calId is not None and self.transformIds.get(self.channelKey(ch)) == calId
+
+
 #===============================================================================
 #
 #===============================================================================
@@ -212,9 +295,7 @@ class PolyEditDialog(SC.SizedDialog):
     def _uses(self, t):
         """ Helper method to determine if a (Sub)Channel uses the current cal.
         """
-        if t.transform is None:
-            return False
-        return t.transform == self.cal.id or t.transform == self.cal
+        return self.usage.uses(t, self.cal)
 
 
     #===========================================================================
@@ -223,7 +304,7 @@ class PolyEditDialog(SC.SizedDialog):
 
     def __init__(self, parent, wxId, cal=None, channels=None, transforms=None,
                  polyType=None, changeType=True, changeSource=True,
-                 savedCal=None, **kwargs):
+                 savedCal=None, usage=None, **kwargs):
         """ Constructor. Standard SizedDialog arguments, plus:
 
             :keyword cal: The transform to edit.
@@ -237,9 +318,12 @@ class PolyEditDialog(SC.SizedDialog):
                 can be changed.
             :keyword savedCal: The original transform from the original
                 recording or factory calibration.
+            :keyword usage: A `TransformUsage` index of the channels'
+                transforms. Created from `channels` if `None`.
         """
         self.cal = cal
-        self.channels = channels or {}
+        self.usage = usage or TransformUsage(channels)
+        self.channels = channels or self.usage.channels
         self.transforms = transforms or {}
         self.polyType = polyType
         self.changeType = changeType
@@ -373,6 +457,14 @@ class PolyEditDialog(SC.SizedDialog):
         rLbl, self.reducedText = self._addfield("Reduced Form", style=wx.TE_READONLY)
         rLbl.SetSizerProps(valign="center")
 
+        dLbl, self.deviationText = self._addfield("Max. Deviation", style=wx.TE_READONLY)
+        dLbl.SetSizerProps(valign="center")
+        self.deviationText.SetToolTip("The largest difference between this "
+                                      "polynomial and the saved one, over a "
+                                      "range of values around the references")
+        if self.savedCal is None:
+            self._showField(self.deviationText, False)
+
         # Bind loss of focus to auto-validate fields on the fly.
         self.coeffField.Bind(wx.EVT_KILL_FOCUS, self.OnLoseFocus)
         self.refField.Bind(wx.EVT_KILL_FOCUS, self.OnLoseFocus)
@@ -456,6 +548,7 @@ class PolyEditDialog(SC.SizedDialog):
         if not valid or self.cal is None:
             self.polyText.SetValue("")
             self.reducedText.SetValue("")
+            self.deviationText.SetValue("")
             return
 
         try:
@@ -471,13 +564,31 @@ class PolyEditDialog(SC.SizedDialog):
                     source = self.sources[idx]
                     self.cal.channelId = source.parent.id
                     self.cal.subchannelId = source.id
+            self.updateDeviation()
             return True
         except (ValueError, TypeError, IndexError):
             self.polyText.SetValue("")
             self.reducedText.SetValue("")
+            self.deviationText.SetValue("")
             return False
 
 
+    def updateDeviation(self):
+        """ Show the maximum difference between the edited polynomial and the
+            saved one (e.g., the factory calibration), evaluated over a
+            synthetic sweep of sample values.
+        """
+        if self.savedCal is None:
+            return
+
+        dev, x, y = maxDeviation(self.cal, self.savedCal)
+        if y is None:
+            at = "x=%.6g" % x
+        else:
+            at = "x=%.6g, y=%.6g" % (x, y)
+        self.deviationText.SetValue("%.6g (at %s)" % (dev, at))
+
+
     def buildSourceList(self):
         """ Get a list of all Channels/SubChannels that can be used as the
             source for the polynomial being edited. Channels/SubChannels that
@@ -490,19 +601,15 @@ class PolyEditDialog(SC.SizedDialog):
             # Probably shouldn't happen.
             return
 
-        if self.channels:
-            for c in self.channels.values():
-                if self._uses(c):
-                    # Exclude all subchannels of parent uses the current cal.
-                    continue
-                for source in c.subchannels:
-                    if self._uses(source):
-                        continue
-
-                    self.sources.append(source)
-                    self.sourceNames.append("%d:%d %s" % (source.parent.id,
-                                                          source.id,
-                                                          source.displayName))
+        for source in self.usage.subchannels:
+            # Exclude all subchannels of parent uses the current cal.
+            if self._uses(source.parent) or self._uses(source):
+                continue
+
+            self.sources.append(source)
+            self.sourceNames.append("%d:%d %s" % (source.parent.id,
+                                                  source.id,
+                                                  source.displayName))
 
 
     def OnTypeChanged(self, evt):
@@ -48,7 +48,7 @@ class ControlButtons(wx.Panel):
         self.root = root
         self.list = parent
         self.device = device
-        self.index = index
+        self._index = index
         self.column = column
 
         self.recording = False
@@ -69,6 +69,33 @@ class ControlButtons(wx.Panel):
         self.updateButtons()
 
 
+    @property
+    def index(self):
+        """ The index of the panel's row in the list. Rows can move as others
+            are added, removed, or sorted, so it is looked up if possible.
+        """
+        try:
+            index = self.root.getRow(self.device)
+            if index != wx.NOT_FOUND:
+                self._index = index
+        except AttributeError:
+            pass
+        return self._index
+
+
+    def setDevice(self, device, index=None):
+        """ Change the recorder the panel controls (e.g., when a virtual
+            list reuses the panel for a different row).
+
+            :param device: The corresponding recorder for the panel's row.
+            :param index: The index of the row in the list, if known.
+        """
+        self.device = device
+        if index is not None:
+            self._index = index
+        self.updateButtons()
+
+
     def addButtons(self, sizer, showConfig):
         """ Add the button widgets to the panel.
             (Isolated for easy experiments with alternative subclasses.)
@@ -89,10 +116,16 @@ class ControlButtons(wx.Panel):
     def updateButtons(self, enabled=True):
         """ Update the button labels, tooltips, and enabled/disabled state.
         """
-        try:
-            status = self.device.command.status[0]
-        except (AttributeError, CommandError, UnsupportedFeature):
-            status = None
+        # The status read by the dialog's scanning thread, if available;
+        # reading it from the device would be another round-trip.
+        cache = getattr(self.root, 'recorderStatus', None)
+        if hasattr(cache, 'getCommandStatus'):
+            status = cache.getCommandStatus(self.device)[0]
+        else:
+            try:
+                status = self.device.command.status[0]
+            except (AttributeError, CommandError, UnsupportedFeature):
+                status = None
 
         self.recording = status == DeviceStatusCode.RECORDING
         self.uploading = status == DeviceStatusCode.UPLOADING
@@ -4,12 +4,14 @@ Dialog for selecting and/or controlling recording devices.
 """
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from functools import partial
+import locale
 import logging
 import os.path
 import threading
-from time import sleep, time
+from time import time
 from typing import Callable, Optional, Union
 
 import wx
@@ -18,7 +20,7 @@ import wx.lib.mixins.listctrl as listmix
 from wx.lib.agw import ultimatelistctrl as ULC
 
 from endaq.device import (Recorder, getDevices, RECORDERS,
-                          deviceChanged, UnsupportedFeature, DeviceError,
+                          UnsupportedFeature, DeviceError,
                           CommandError, DeviceTimeout)
 from endaq.device.base import os_specific
 from endaq.device.response_codes import DeviceStatusCode
@@ -27,8 +29,17 @@ from .shared import DeviceToolTip
 from . import icons
 from . import battery_icons
 from . import controls
+from .device_list import VirtualDeviceList
+from ..broker import getBroker, BACKGROUND
+from ..clocksync import syncClocks
+from ..fleetstart import startAll
+from ..hotplug import ChangeMonitor, PollingMonitor, getMonitor
+from ..polling import PollScheduler, RateBudget
 from .events import (EvtDeviceListUpdate, EVT_DEVICE_LIST_UPDATE,
-                     EvtRecordButton, EVT_RECORD_BUTTON)
+                     EvtDeviceStatusUpdate, EVT_DEVICE_STATUS_UPDATE,
+                     EvtRecordButton, EVT_RECORD_BUTTON,
+                     EvtClockSyncDone, EVT_CLOCK_SYNC_DONE,
+                     EvtFleetStartDone, EVT_FLEET_START_DONE)
 
 logger = logging.getLogger('endaqconfig')
 
@@ -46,15 +57,147 @@ SPACE_WARN_MB = SPACE_MIN_MB * 4
 CAL_WARN_DAYS = timedelta(days=120)
 DEV_WARN_DAYS = timedelta(days=182)
 
+# Maximum time (seconds) between re-collecting the information used for a
+# device's warnings (free space, expiration dates), if its status is unchanged.
+WARNING_CHECK_INTERVAL = 10
+
 
 # ===========================================================================
 #
 # ===========================================================================
 
+class StatusCache(object):
+    """
+    The status of each device (battery status, status code and message, and
+    path), as read by the device scanning thread, keyed by `Recorder`. Each
+    entry also records the scan 'generation' in which it was read. Statuses
+    are read like those in a dictionary (``cache[dev]``, ``cache.get(dev)``),
+    but set with `replaceAll()` and `setStatus()`.
+
+    Everything displaying a device's status reads it from here, rather than
+    from the device (e.g., `Recorder.command.status`), so a row's cells and
+    buttons show the same status, and only the scanning thread (or an
+    explicit `refresh()`) communicates with the hardware.
+    """
+
+    def __init__(self):
+        self.statuses = {}  # The statuses, keyed by `Recorder`
+        self.generation = 0  # The latest scan
+        self.generations = {}  # Scan in which each status was read, keyed by `Recorder`
+        self.refresher = None  # Function to request a device's status
+        self.reads = 0  # Number of statuses read from the cache
+        self.refreshes = 0  # Number of explicit refreshes
+
+
+    def __getitem__(self, dev: Recorder) -> tuple:
+        return self.statuses[dev]
+
+
+    def __contains__(self, dev: Recorder) -> bool:
+        return dev in self.statuses
+
+
+    def __len__(self):
+        return len(self.statuses)
+
+
+    def get(self, dev: Recorder, default: Optional[tuple] = None) -> Optional[tuple]:
+        """ Get a device's status, or `default` if it has not been read. """
+        return self.statuses.get(dev, default)
+
+
+    def replaceAll(self, statuses: dict, generation: Optional[int] = None):
+        """ Replace all the cached statuses with those from a scan. Devices
+            not in the scan are removed.
+
+            :param statuses: The statuses of all the devices, keyed by
+                `Recorder`.
+            :param generation: The scan in which the statuses were read.
+        """
+        if generation is not None:
+            self.generation = max(self.generation, generation)
+        self.statuses = dict(statuses)
+        self.generations = {dev: self.generation for dev in statuses}
+
+
+    def setStatus(self, dev: Recorder, status: tuple, generation: Optional[int] = None):
+        """ Store the status of one device (e.g., from a poll).
+
+            :param dev: The device.
+            :param status: The device's status.
+            :param generation: The scan in which the status was read.
+        """
+        self.statuses[dev] = status
+        self.generations[dev] = self.generation if generation is None else generation
+
+
+    def getCommandStatus(self, dev: Recorder) -> tuple:
+        """ Get a device's last status code and message, without
+            communicating with the device. Replaces reading
+            `Recorder.command.status`.
+
+            :param dev: The device.
+            :return: A tuple containing the status code and message. Both
+                are `None` if the device's status has not been read.
+        """
+        try:
+            status = self.statuses[dev][1]
+            self.reads += 1
+            return status
+        except (KeyError, IndexError, TypeError):
+            return None, None
+
+
+    def isCurrent(self, dev: Recorder) -> bool:
+        """ Was a device's status read in the latest scan (or since)? """
+        return self.generations.get(dev, -1) >= self.generation
+
+
+    def refresh(self, dev: Recorder):
+        """ Request the device's status be read from the hardware (e.g.,
+            after a command that changes it). Asynchronous; the new status
+            will be stored when it is read.
+
+            :param dev: The device.
+        """
+        self.refreshes += 1
+        if self.refresher is not None:
+            self.refresher(dev)
+
+
+    def getStats(self) -> dict:
+        """ Get the numbers of cached reads (i.e., device round-trips
+            avoided) and explicit refreshes.
+        """
+        return {'generation': self.generation,
+                'reads': self.reads,
+                'refreshes': self.refreshes}
+
+
 class DeviceScanThread(threading.Thread):
     """
     A background thread for finding devices and their states. It can be
     stopped by calling `DeviceScanThread.stop()`.
+
+    The status of each device is read concurrently, in a pool of worker
+    threads, and each result is posted to the parent as its own
+    `EvtDeviceStatusUpdate` as soon as it arrives. A slow or unresponsive
+    device therefore doesn't delay the updates of the others.
+
+    Devices are polled at individual intervals, managed by a `PollScheduler`:
+    a device is polled often after its state changes (or after a command is
+    sent to it), and less often while it stays the same. The total number of
+    status requests per second is also limited.
+
+    Between polls, the thread waits on a `hotplug.ChangeMonitor`, and only
+    scans for devices when it reports a change (or periodically, as a
+    fallback). On Linux, this uses ``inotify``; elsewhere, it polls
+    `deviceChanged()`.
+
+    The information for each device's warnings (free space on its drive,
+    calibration expiration, age) is also collected by the thread, in a
+    separate pool, so a slow or hung drive never blocks the GUI or the
+    status polling.
     """
 
     def __init__(self,
@@ -63,6 +206,13 @@ class DeviceScanThread(threading.Thread):
                  interval: Union[int, float] = 3,
                  oneshot: bool = False,
                  timeout: Optional[float] = 4,
+                 statusTimeout: float = 2,
+                 workers: int = 8,
+                 maxInterval: float = 10,
+                 maxRate: Optional[float] = 20,
+                 monitor: Optional[ChangeMonitor] = None,
+                 rescanInterval: Optional[float] = None,
+                 infoTimeout: float = 5,
                  **getDevicesArgs):
         """ A background thread for finding devices and their states. It can be
             stopped by calling `DeviceScanThread.stop()`.
@@ -79,6 +229,25 @@ class DeviceScanThread(threading.Thread):
                 and no longer appears in `getDevices()`. Prevents devices
                 that momentarily disconnect when starting/stopping recording
                 or resetting from disappearing and reappearing in the list.
+            :param statusTimeout: The maximum time (in seconds) to wait for
+                one device's status. A device that doesn't respond in time
+                keeps its previous status until the next scan.
+            :param workers: The maximum number of devices polled at once.
+            :param maxInterval: The longest time (in seconds) between status
+                requests to a device whose state hasn't changed. Devices that
+                have changed are polled every `interval`.
+            :param maxRate: The maximum number of status requests sent per
+                second, for all devices combined. `None` for no limit.
+            :param monitor: The `hotplug.ChangeMonitor` used to detect
+                devices being added or removed. Defaults to the best
+                available for the platform.
+            :param rescanInterval: The maximum time (in seconds) between
+                full scans for devices, even if no change was detected.
+                Defaults to 30 seconds if the monitor is event-driven, or
+                the old fixed cadence (1.5 * `interval`) if it polls.
+            :param infoTimeout: The time (in seconds) after which a device
+                whose warning information is still being collected (e.g.,
+                its drive is hung) is reported as not responding.
 
             Additional keyword arguments are used when calling `getDevices()`.
         """
@@ -99,10 +268,36 @@ class DeviceScanThread(threading.Thread):
         self.timeout = timeout
         self.timeouts = {}
 
+        self.statusTimeout = statusTimeout
+        self.workers = workers
+        self.status = {}  # Last status read from each device, keyed by `Recorder`
+        self.generation = 0  # Number of scans for devices
+        self.pending = {}  # Start times of status requests in progress, keyed by `Recorder`
+        self.polled = []  # Present devices with command interfaces, from the last scan
+        self.scheduler = PollScheduler(minInterval=self.interval,
+                                       maxInterval=max(self.interval, maxInterval),
+                                       budget=RateBudget(maxRate) if maxRate else None)
+
+        self.monitor = monitor or getMonitor(self.interval / 2)
+        if rescanInterval is None:
+            if isinstance(self.monitor, PollingMonitor):
+                rescanInterval = self.interval * 1.5
+            else:
+                rescanInterval = 30
+        self.rescanInterval = rescanInterval
+        self.expires = None  # Time the next disconnected device is removed
+
+        self.infoTimeout = infoTimeout
+        self.present = []  # Present devices, from the last scan
+        self.info = {}  # Last warning info collected from each device, keyed by `Recorder`
+        self.infoDue = {}  # Time each device's info is next collected, keyed by `Recorder`
+        self.pendingInfo = {}  # Start times of info collection in progress, keyed by `Recorder`
+
 
     def stop(self):
         logger.debug('Stopping scanning thread')
         self._cancel.set()
+        self.monitor.notify()
 
 
     def pause(self):
@@ -113,107 +308,348 @@ class DeviceScanThread(threading.Thread):
     def resume(self):
         logger.debug('Resuming scanning thread')
         self._pause.clear()
+        self.monitor.notify()
 
 
     def paused(self):
         return self._pause.is_set()
 
 
+    def wake(self, dev: Recorder):
+        """ Poll a device at the shortest interval, e.g., after sending it a
+            command that will change its state.
+
+            :param dev: The device to poll.
+        """
+        self.scheduler.wake(dev)
+        self.monitor.notify()
+
+
+    def getStats(self) -> dict:
+        """ Get the polling statistics for every device.
+
+            :return: A dictionary of `polling.PollStats`, keyed by device.
+        """
+        return self.scheduler.getStats()
+
+
+    def postEvent(self, evt):
+        """ Send an event to the parent dialog, if it still exists.
+        """
+        # Check parent again to avoid a race condition during shutdown
+        if bool(self.parent):
+            wx.PostEvent(self.parent, evt)
+        else:
+            logger.debug('Parent gone, did not post update event!')
+
+
+    def getStatus(self, dev: Recorder, deadline: float) -> tuple:
+        """ Read a device's battery status and recording status. Called in a
+            worker thread.
+
+            :param dev: The device to query.
+            :param deadline: The time at which to give up waiting for the
+                device to respond.
+            :return: A tuple containing the battery status, the device
+                status code and message, and the device's path.
+        """
+        cancelSet = self._cancel.is_set
+
+        def expired():
+            return cancelSet() or time() > deadline
+
+        try:
+            bat = dev.command.getBatteryStatus(timeout=max(0.1, deadline - time()),
+                                               callback=expired)
+            stat = dev.command.status
+        except (NotImplementedError, UnsupportedFeature):
+            # Very old firmware and/or no serial command interface.
+            bat = None
+            stat = DeviceStatusCode.IDLE, None
+        except CommandError:
+            # Older FW that doesn't support GetBatteryStatus returns
+            # ERR_INVALID_COMMAND. Try to ping to get status.
+            try:
+                dev.command.ping(timeout=max(0.1, deadline - time()),
+                                 callback=expired)
+                bat = None
+                stat = dev.command.status
+            except DeviceTimeout:
+                raise
+            except (DeviceError, AttributeError, IOError):
+                bat = None
+                stat = DeviceStatusCode.IDLE, None
+
+        return bat, stat, dev.path
+
+
+    def pollDevice(self, dev: Recorder, deadline: float):
+        """ Get a device's status and post it to the parent dialog (if it
+            has changed). Called in a worker thread.
+
+            :param dev: The device to query.
+            :param deadline: The time at which to give up waiting for the
+                device to respond.
+        """
+        t0 = time()
+        try:
+            # Through the device's broker: interactive commands go first,
+            # and simultaneous status requests are combined.
+            status = getBroker(dev).call(self.getStatus, dev, deadline,
+                                         priority=BACKGROUND, key='status',
+                                         timeout=max(0.1, deadline - time()))
+
+        except TimeoutError:
+            # Includes `DeviceTimeout`
+            logger.debug(f"Timed out getting status of {dev}, retrying")
+            self.scheduler.update(dev, False, timeout=True)
+            return
+
+        except DeviceError as E:
+            logger.error(f"Error getting status of {dev}: {E!r}")
+            self.scheduler.update(dev, False, error=E)
+            return
+
+        except IOError as E:
+            logger.warning(E)
+            self.scheduler.update(dev, False, error=E)
+            return
+
+        finally:
+            self.pending.pop(dev, None)
+
+        changed = self.status.get(dev) != status
+        self.scheduler.update(dev, changed, duration=time() - t0)
+
+        if self._cancel.is_set() or not changed:
+            return
+
+        # logger.debug(f'{dev} {status=}')
+        self.status[dev] = status
+        self.infoDue[dev] = 0  # e.g., free space changes when recording ends
+        self.postEvent(EvtDeviceStatusUpdate(device=dev, status=status,
+                                             info=self.info.get(dev),
+                                             generation=self.generation))
+
+
+    @staticmethod
+    def getDeviceInfo(dev: Recorder) -> dict:
+        """ Collect the information used for a device's warnings. This can
+            involve filesystem access, so it's done in a worker thread.
+
+            :param dev: The device.
+            :return: A dictionary containing whether the device's drive is
+                mounted, its free space (in MB), its calibration expiration
+                date, and its 'birthday'.
+        """
+        info = {'mounted': False,
+                'freeSpace': None,
+                'calExpiration': dev.getCalExpiration(),
+                'birthday': dev.birthday}
+
+        if dev.path and os.path.exists(dev.path):
+            info['mounted'] = True
+            info['freeSpace'] = os_specific.getFreeSpace(dev.path) / 1048576
+
+        return info
+
+
+    def collectInfo(self, dev: Recorder):
+        """ Collect a device's warning information and post it to the parent
+            dialog (if it has changed). Called in a worker thread.
+
+            :param dev: The device.
+        """
+        try:
+            info = self.getDeviceInfo(dev)
+        except (IOError, DeviceError) as err:
+            logger.warning(f"Error getting info for {dev}: {err!r}")
+            return
+        finally:
+            self.pendingInfo.pop(dev, None)
+            self.infoDue[dev] = time() + WARNING_CHECK_INTERVAL
+
+        if self._cancel.is_set() or self.info.get(dev) == info:
+            return
+
+        self.info[dev] = info
+        self.postEvent(EvtDeviceStatusUpdate(device=dev, status=self.status.get(dev),
+                                             info=info))
+
+
+    def collectDue(self, pool: ThreadPoolExecutor):
+        """ Start collecting warning information for the devices that are
+            due, and report devices whose collection has taken too long.
+
+            :param pool: The worker pool in which to collect the info.
+        """
+        now = time()
+        for dev in self.present:
+            started = self.pendingInfo.get(dev)
+            if started is not None:
+                info = self.info.get(dev) or {}
+                if now - started > self.infoTimeout and not info.get('timedOut'):
+                    logger.warning(f"Timed out getting info for {dev}")
+                    self.info[dev] = info = dict(info, timedOut=True)
+                    self.postEvent(EvtDeviceStatusUpdate(device=dev, status=self.status.get(dev),
+                                                         info=info))
+            elif self.infoDue.get(dev, 0) <= now:
+                self.pendingInfo[dev] = now
+                pool.submit(self.collectInfo, dev)
+
+
+    def pollDue(self, pool: ThreadPoolExecutor) -> list:
+        """ Start status requests for the devices that are due to be polled,
+            excluding any still busy with a previous request.
+
+            :param pool: The worker pool in which to run the requests.
+            :return: A list of `Future` objects for the requests started.
+        """
+        futures = []
+        now = time()
+        deadline = now + self.statusTimeout
+        for dev in self.polled:
+            if dev not in self.pending and self.scheduler.isDue(dev):
+                # Marked before submitting: the request may finish (and
+                # remove its entry) before `submit()` returns.
+                self.pending[dev] = now
+                futures.append(pool.submit(self.pollDevice, dev, deadline))
+        return futures
+
+
+    def nextWakeup(self, lastScan: float) -> float:
+        """ Get the time to wait for a device change before the thread needs
+            to do something anyway: poll a device, remove a disconnected
+            device, or do a periodic full scan.
+
+            :param lastScan: The time of the last full scan.
+            :return: The time to wait, in seconds.
+        """
+        now = time()
+        waits = [lastScan + self.rescanInterval - now]
+        if self.expires:
+            waits.append(self.expires - now)
+        due = self.scheduler.timeUntilDue(self.polled)
+        if due is not None:
+            waits.append(due)
+        waits.extend(self.infoDue.get(dev, 0) - now for dev in self.present
+                     if dev not in self.pendingInfo)
+        waits.extend(started + self.infoTimeout - now
+                     for started in list(self.pendingInfo.values()))
+
+        # Minimum keeps a denied (over-budget) poll from spinning.
+        return max(self.interval / 4, min(waits))
+
+
     def run(self):
         """ The main loop.
         """
         logger.debug('Started scanning thread')
 
-        updates = -1
+        rescan = True
+        lastScan = 0
+        futures = []
         cancelSet = self._cancel.is_set
         pauseSet = self._pause.is_set
         updatingSet = self.parent.updating.is_set
         timeout = self.timeout
 
-        while bool(self.parent) and not cancelSet():
-            updates += 1
-
-            if pauseSet() or updatingSet():
-                sleep(self.interval / 4)
-                continue
-
-            # Only do `getDevices()` every other time, or if the drives have
-            # changed (`deviceChanged()` is cheap, `getDevices()` less so)
-            if not self.oneshot and updates % 2 != 0 and not deviceChanged(recordersOnly=False):
-                sleep(self.interval / 2)
-                continue
+        pool = ThreadPoolExecutor(max_workers=self.workers,
+                                  thread_name_prefix='DeviceStatus')
+        infoPool = ThreadPoolExecutor(max_workers=self.workers,
+                                      thread_name_prefix='DeviceInfo')
 
-            try:
-                devices = getDevices()
-                self.timeouts.update({dev: time() + timeout for dev in devices})
-                result = [dev for dev, t in self.timeouts.items() if t > time()]
-
-                status = {}
-                if self.filter:
-                    result = list(filter(self.filter, result))
-
-                # TODO: Put status-getting for each device in its own thread
-                #  and report only current `status` in the `EvtDeviceListUpdate`.
-                #  Each thread would send a single event on completion.
-                for dev in result:
-                    # Not present, but not expired. Will show as disabled.
-                    # Prevents devices disappearing and reappearing when
-                    # starting/ending recordings.
-                    if dev not in devices:
-                        status[dev] = None, (None, None)
-                        continue
-
-                    elif not dev.hasCommandInterface:
-                        status[dev] = None, (DeviceStatusCode.IDLE, None)
-                        continue
-
-                    try:
-                        bat = dev.command.getBatteryStatus(callback=cancelSet)
-                        stat = dev.command.status
-                    except (NotImplementedError, UnsupportedFeature):
-                        # Very old firmware and/or no serial command interface.
-                        bat = None
-                        stat = DeviceStatusCode.IDLE, None
-                    except CommandError:
-                        # Older FW that doesn't support GetBatteryStatus returns
-                        # ERR_INVALID_COMMAND. Try to ping to get status.
-                        try:
-                            dev.command.ping(callback=cancelSet)
-                            bat = None
-                            stat = dev.command.status
-                        except (DeviceError, AttributeError, IOError):
-                            bat = None
-                            stat = DeviceStatusCode.IDLE, None
-
-                    # logger.debug(f'{dev} {bat=} {stat=}')
-                    status[dev] = bat, stat, dev.path
-
-                evt = EvtDeviceListUpdate(devices=result, status=status)
-
-                # Check parent again to avoid a race condition during shutdown
-                if bool(self.parent):
-                    wx.PostEvent(self.parent, evt)
-                else:
-                    logger.debug('Parent gone, did not post update event!')
-
-            except DeviceTimeout:
-                logger.warning("Timed out when scanning for devices, retrying")
-
-            except DeviceError as E:
-                if E.args and E.args[0] == DeviceStatusCode.ERR_BUSY:
-                    logger.info("Device repoted ERR_BUSY, retrying")
-                else:
-                    logger.error(E)
-                    raise
-
-            except IOError as E:
-                # TODO: Catch serial error(s), too?
-                logger.warning(E)
+        try:
+            while bool(self.parent) and not cancelSet():
+                if pauseSet() or updatingSet():
+                    # Remember changes that happen while paused
+                    rescan = self.monitor.wait(self.interval / 4) or rescan
+                    continue
+
+                now = time()
+                rescan = (rescan or self.oneshot
+                          or now - lastScan >= self.rescanInterval
+                          or (self.expires is not None and now >= self.expires))
+
+                # Only do `getDevices()` if the devices may have changed
+                # (`getDevices()` is relatively expensive); otherwise, just
+                # poll the devices that are due.
+                if not rescan:
+                    self.pollDue(pool)
+                    self.collectDue(infoPool)
+                    rescan = self.monitor.wait(self.nextWakeup(lastScan))
+                    continue
+
+                rescan = False
+                lastScan = now
+                self.generation += 1
+
+                try:
+                    devices = getDevices()
+                    self.timeouts.update({dev: time() + timeout for dev in devices})
+                    result = [dev for dev, t in self.timeouts.items() if t > time()]
+
+                    status = {}
+                    if self.filter:
+                        result = list(filter(self.filter, result))
+
+                    polled = []
+                    for dev in result:
+                        # Not present, but not expired. Will show as disabled.
+                        # Prevents devices disappearing and reappearing when
+                        # starting/ending recordings.
+                        if dev not in devices:
+                            status[dev] = None, (None, None)
+                            continue
+
+                        elif not dev.hasCommandInterface:
+                            status[dev] = None, (DeviceStatusCode.IDLE, None)
+                            continue
+
+                        # Report the last known status now; the current one
+                        # is posted separately when the device is polled.
+                        status[dev] = self.status.get(dev, (None, (DeviceStatusCode.IDLE, None), dev.path))
+                        polled.append(dev)
+
+                    # Time at which the next disconnected device expires
+                    self.expires = min((self.timeouts[dev] for dev in result
+                                        if dev not in devices), default=None)
+
+                    self.scheduler.retain(polled)
+                    self.polled = polled
+                    self.present = [dev for dev in result if dev in devices]
+                    futures = self.pollDue(pool)
+                    self.collectDue(infoPool)
+                    info = {dev: self.info[dev] for dev in result if dev in self.info}
+                    self.postEvent(EvtDeviceListUpdate(devices=result, status=status,
+                                                       info=info,
+                                                       generation=self.generation))
+
+                except DeviceTimeout:
+                    logger.warning("Timed out when scanning for devices, retrying")
+
+                except DeviceError as E:
+                    if E.args and E.args[0] == DeviceStatusCode.ERR_BUSY:
+                        logger.info("Device repoted ERR_BUSY, retrying")
+                    else:
+                        logger.error(E)
+                        raise
+
+                except IOError as E:
+                    # TODO: Catch serial error(s), too?
+                    logger.warning(E)
+
+                if self.oneshot:
+                    # Let the status requests finish (or time out).
+                    wait(futures, timeout=self.statusTimeout)
+                    break
 
-            if self.oneshot:
-                break
+                rescan = self.monitor.wait(self.nextWakeup(lastScan))
 
-            sleep(self.interval)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            infoPool.shutdown(wait=False, cancel_futures=True)
+            self.monitor.close()
 
         logger.debug('Scanning thread stopped')
 
@@ -255,7 +691,7 @@ class DeviceCommandThread(threading.Thread):
 
     def run(self):
         try:
-            self.command(*self.args, **self.kwargs)
+            getBroker(self.device).call(partial(self.command, *self.args, **self.kwargs))
             self.completed.set()
             logger.debug(f'{self.command} succeeded')
         except Exception as err:
@@ -306,6 +742,11 @@ def populateButtonColumn(dev: Recorder,
         :param root: The parent window/dialog.
         :return: A string for use in column sorting ("" in this case).
     """
+    if root.virtual:
+        # Virtual lists create panels for visible rows only, on demand.
+        # See `DeviceSelectionDialog.makeButtons()`.
+        return ""
+
     pan = controls.ControlButtons(root, root.list, dev, index, column)
     root.list.SetItemWindow(index, column, pan, expand=True)
     root.minWidths[root.buttonCol] = pan.GetSize()[0]
@@ -356,10 +797,7 @@ def populateStatusColumn(dev: Recorder,
     if column is None:
         return ''
 
-    try:
-        code, msg = dev.command.status
-    except (AttributeError, UnsupportedFeature):
-        code, msg = None, ''
+    code, msg = root.recorderStatus.getCommandStatus(dev)
 
     code = code or DeviceStatusCode.IDLE
 
@@ -393,6 +831,39 @@ def populateStatusColumn(dev: Recorder,
     return code
 
 
+# Marker for cells that can't be cached (always rendered).
+_UNCACHED = object()
+
+
+def getRenderKey(formatter: Callable,
+                 dev: Recorder,
+                 root: "DeviceSelectionDialog"):
+    """ Get a value representing everything a column formatter's output
+        depends upon. If it hasn't changed since the cell was last rendered,
+        the cell doesn't need to be updated. Cheap compared to rendering.
+
+        :param formatter: The column's formatter function.
+        :param dev: The device beind displayed.
+        :param root: The parent window/dialog.
+        :return: The render key, or `_UNCACHED` if the formatter is unknown
+            (and should always be called).
+    """
+    if isinstance(formatter, partial) and formatter.func == _attribFormatter:
+        attrib, default = formatter.args
+        return getattr(dev, attrib, default)
+
+    elif formatter == populateStatusColumn:
+        return root.recorderStatus.getCommandStatus(dev)
+
+    elif formatter == populateBatteryColumn:
+        try:
+            return root.recorderStatus[dev][0]
+        except (KeyError, IndexError, TypeError):
+            return None
+
+    return _UNCACHED
+
+
 # ===========================================================================
 #
 # ===========================================================================
@@ -514,6 +985,9 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             :keyword checks: If `True`, show checkboxes for each device.
             :keyword mustConfig: If `True`, the 'OK' button will only become
                 enabled if the device can be configured.
+            :keyword virtual: If `True`, use a 'virtual' list, which only
+                draws (and creates control buttons for) the visible rows.
+                For very large numbers of devices. Default is `False`.
         """
         # Clear cached devices
         RECORDERS.clear()
@@ -534,6 +1008,7 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         self.filter = kwargs.pop('filter', lambda x: True)
         self.checks = kwargs.pop('checks', False)
         self.mustConfigure = kwargs.pop('mustConfig', True)
+        self.virtual = kwargs.pop('virtual', False)
         okText = kwargs.pop('okText', "Configure")
         okHelp = kwargs.pop('okHelp', 'Configure the selected device')
         cancelText = kwargs.pop('cancelText', "Close")
@@ -551,6 +1026,8 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             self.SetIcon(icon)
 
         self.thread = None  # Device scanning thread
+        self.clockThread = None  # Thread setting all clocks
+        self.startThread = None  # Thread starting all recorders
         self.updating = threading.Event()  # Set while updating, so other calls skip.
 
         # TODO: Better column collection (assemble piecemeal based on parameters)
@@ -608,6 +1085,9 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         self.Bind(wx.EVT_SHOW, self.OnShow)
         self.Bind(EVT_RECORD_BUTTON, self.OnStartRecording)
         self.Bind(EVT_DEVICE_LIST_UPDATE, self.OnDeviceListUpdate)
+        self.Bind(EVT_DEVICE_STATUS_UPDATE, self.OnDeviceStatusUpdate)
+        self.Bind(EVT_CLOCK_SYNC_DONE, self.OnClockSyncDone)
+        self.Bind(EVT_FLEET_START_DONE, self.OnFleetStartDone)
 
 
     def initList(self,
@@ -631,9 +1111,13 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
                 self.statusCol = i
 
         self.recorders = []  # Results of previous `getDevices()`.
-        self.recorderStatus = {}  # Recorder status, battery state, and path, keyed by `Recorder`
-        self.recordersByIndex = {}  # `Recorder` instances keyed by list index.
-        self.indicesByRecorder = {}  # List index keyed by `Recorder`
+        self.recorderStatus = StatusCache()  # Recorder status, battery state, and path, keyed by `Recorder`
+        self.deviceInfo = {}  # Info for warnings (free space, etc.), keyed by `Recorder`
+        self.recordersByIndex = {}  # `Recorder` instances keyed by list item key (item data).
+        self.indicesByRecorder = {}  # List item key keyed by `Recorder`
+        self.nextKey = 0  # The key for the next row added
+        self.renderCache = {}  # Render keys of each row's cells, keyed by item key
+        self.renderStats = {'written': 0, 'skipped': 0}  # Cell update counts (cumulative)
         # self.recorderBusy = defaultdict(threading.Event)  # Events indicating a recorder is updating, keyed by `Recorder`
         self.selected = None
         self.selectedIdx = None
@@ -644,15 +1128,26 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
 
         self.itemDataMap = {}  # required by ColumnSorterMixin
 
-        self.list = ULC.UltimateListCtrl(parent, -1,
-                                         agwStyle=(wx.LC_REPORT
-                                                   # | wx.LC_NO_HEADER
-                                                   | wx.BORDER_NONE
-                                                   | wx.LC_HRULES
-                                                   | wx.LC_SINGLE_SEL
-                                                   | ULC.ULC_NO_ITEM_DRAG
-                                                   # | wx.LC_VRULES
-                                                   ))
+        # This is to provide tool tips for individual list rows, keyed by item key
+        self.listMsgs = {}
+        self.listToolTips = {}
+
+        agwStyle = (wx.LC_REPORT
+                    # | wx.LC_NO_HEADER
+                    | wx.BORDER_NONE
+                    | wx.LC_HRULES
+                    | wx.LC_SINGLE_SEL
+                    | ULC.ULC_NO_ITEM_DRAG
+                    # | wx.LC_VRULES
+                    )
+
+        if self.virtual:
+            self.list = VirtualDeviceList(parent, -1, agwStyle=agwStyle,
+                                          buttonCol=self.buttonCol,
+                                          buttonFactory=self.makeButtons,
+                                          sortKeys=self.getSortKeys)
+        else:
+            self.list = ULC.UltimateListCtrl(parent, -1, agwStyle=agwStyle)
 
         self.list.AssignImageList(self.loadIcons(), wx.IMAGE_LIST_SMALL)
         self.list.SetSizerProps(expand=True, proportion=1)
@@ -740,26 +1235,36 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         tips = []
         bat = ''
 
+        key = self.indicesByRecorder[dev]
         if self.batteryCol is not None:
-            bat = self.itemDataMap[index][self.batteryCol]
+            bat = self.itemDataMap[key][self.batteryCol]
             if bat:
                 bat += '\n'
 
         icon = self.ICON_NONE
         now = datetime.now()
 
-        if dev.birthday:
-            age = now - dev.birthday
+        # Info collected by the scanning thread (the filesystem access is
+        # potentially slow). Empty if not yet collected.
+        info = self.deviceInfo.get(dev) or {}
+        birthday = info.get('birthday')
+
+        if birthday:
+            age = now - birthday
             lifeleft = dev.LIFESPAN - age
         else:
             age = lifeleft = None
 
-        calExp = dev.getCalExpiration()
+        calExp = info.get('calExpiration')
+
+        if info.get('timedOut'):
+            tips.append("This device's drive is not responding.")
+            icon = self.ICON_WARN
 
         pathtext = dev.path
-        if dev.path and os.path.exists(dev.path):
-            freeSpace = os_specific.getFreeSpace(dev.path) / 1048576
-            if freeSpace < SPACE_WARN_MB:
+        freeSpace = info.get('freeSpace')
+        if info.get('mounted', bool(dev.path)):
+            if freeSpace is not None and freeSpace < SPACE_WARN_MB:
                 tip = f"This device is nearly full ({freeSpace:.2f} MB available)."
                 icon = self.ICON_INFO
                 if freeSpace < SPACE_MIN_MB:
@@ -792,15 +1297,15 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             self.list.SetItemImage(index, [icon])
 
         if len(tips) == 0:
-            self.listToolTips[index] = bat or None
-            self.listMsgs[index] = bat or None
+            self.listToolTips[key] = bat or None
+            self.listMsgs[key] = bat or None
             return
         else:
             # Popup tool tips show battery status and each message on its own
             # line. In-dialog help message under list shows battery on one,
             # all other messages on the other.
-            self.listToolTips[index] = bat + '\n'.join(tips)
-            self.listMsgs[index] = bat + ' '.join(tips)
+            self.listToolTips[key] = bat + '\n'.join(tips)
+            self.listMsgs[key] = bat + ' '.join(tips)
 
 
     def createColumns(self):
@@ -818,6 +1323,9 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
                 width = self.list.GetTextExtent('Awaiting Trigger')[0]
             elif i == self.batteryCol:
                 width = 40
+            elif i == self.buttonCol and self.virtual:
+                # No panels exist yet to measure; estimate from the label.
+                width = self.list.GetTextExtent('Start Recording')[0] + 24
             else:
                 width = self.list.GetTextExtent(c.name)[0]
 
@@ -825,7 +1333,8 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
 
 
     def populateList(self):
-        """ Find recorders and add them to the list.
+        """ Rebuild the list from scratch: clear it, create the columns, and
+            add all the recorders.
         """
         if self.updating.is_set():
             return
@@ -839,92 +1348,226 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             self.recordersByIndex.clear()
             self.indicesByRecorder.clear()
             self.itemDataMap.clear()
-            self.listWidth = 0
+            self.listMsgs.clear()
+            self.listToolTips.clear()
+            self.renderCache.clear()
 
             self.createColumns()
-
-            # This is to provide tool tips for individual list rows
-            self.listMsgs = [None] * len(self.recorders)
-            self.listToolTips = [None] * len(self.recorders)
-
-            for idx, dev in enumerate(self.recorders):
-                path = dev.path or ''
-                index = self.list.InsertImageStringItem(idx, path, [0], int(self.checks))
-                self.itemDataMap[index] = [dev.path]
-                self.recordersByIndex[index] = dev
-                self.indicesByRecorder[dev] = index
-                for i, col in enumerate(self.columns[1:], 1):
-                    try:
-                        val = col.formatter(dev, index, i, self)  # populates item and returns data map value
-                    except (IOError, DeviceError) as err:
-                        logger.error(f'Error formatting column {i}: {err!r}')
-                        val = None
-                    self.itemDataMap[index].append('' if val is None else val)
-                    self.list.SetColumnWidth(i, wx.LIST_AUTOSIZE)
-
-                    item = self.list.GetItem(index, i)
-                    item.SetMask(ULC.ULC_MASK_FONTCOLOUR | ULC.ULC_MASK_FONT)
-
-                self.list.SetItemData(index, index)
-
-                if self.showWarnings:
-                    self.setItemIcon(index, dev)
-
-            for i, w in enumerate(self.minWidths):
-                w = w + 8
-                if self.list.GetColumnWidth(i) < w:
-                    self.list.SetColumnWidth(i, w)
-                self.listWidth += self.list.GetColumnWidth(i)
-
-            # if self.batteryCol is not None:
-            #     self.list.SetColumnWidth(self.batteryCol, self.minWidths[self.batteryCol])
-
-            if not self.recordersByIndex or not self.selected:
-                self.OnItemDeselected(None)
+            self._syncRows(resize=True)
 
         finally:
             self.SetCursor(wx.Cursor(wx.CURSOR_DEFAULT))
             self.updating.clear()
 
 
+    def syncList(self):
+        """ Update the list after recorders have been added or removed:
+            rows are inserted only for new recorders and deleted only for
+            departed ones. Existing rows (and their button panels) are kept,
+            and just updated.
+
+            :see: OnDeviceListUpdate()
+        """
+        if self.updating.is_set():
+            return
+
+        try:
+            self.updating.set()
+            self._syncRows()
+
+        finally:
+            self.updating.clear()
+
+
+    def _syncRows(self, resize: bool = False):
+        """ Add and remove rows to match `self.recorders`, and update the
+            others. Used internally by `populateList()` and `syncList()`.
+
+            :param resize: If `True`, resize the columns even if no rows
+                were added or removed.
+        """
+        new = set(self.recorders)
+        removed = [dev for dev in self.indicesByRecorder if dev not in new]
+        added = [dev for dev in self.recorders if dev not in self.indicesByRecorder]
+
+        self.list.Freeze()
+        try:
+            for dev in removed:
+                self.removeRow(dev)
+
+            for dev in self.recorders:
+                if dev in added:
+                    self.insertRow(dev, self.list.GetItemCount())
+                else:
+                    self.updateRow(dev)
+
+            if resize or added or removed:
+                self.autosizeColumns()
+
+        finally:
+            self.list.Thaw()
+
+        if not self.recordersByIndex or not self.selected:
+            self.OnItemDeselected(None)
+
+
+    def insertRow(self, dev: Recorder, row: int):
+        """ Add a recorder to the list.
+
+            :param dev: The device to add.
+            :param row: The position (row index) at which to insert it.
+        """
+        # Keys identify rows regardless of position (which changes as rows
+        # are added, removed, or sorted); they are used as the item data.
+        key = self.nextKey
+        self.nextKey += 1
+
+        index = self.list.InsertImageStringItem(row, dev.path or '', [0], int(self.checks))
+        self.list.SetItemData(index, key)
+        self.itemDataMap[key] = [dev.path]
+        self.recordersByIndex[key] = dev
+        self.indicesByRecorder[dev] = key
+        self.listMsgs[key] = self.listToolTips[key] = None
+        cache = self.renderCache[key] = {}
+
+        for i, col in enumerate(self.columns[1:], 1):
+            try:
+                val = col.formatter(dev, index, i, self)  # populates item and returns data map value
+                if i != self.buttonCol:
+                    cache[i] = getRenderKey(col.formatter, dev, self)
+            except (IOError, DeviceError) as err:
+                logger.error(f'Error formatting column {i}: {err!r}')
+                val = None
+            self.itemDataMap[key].append('' if val is None else val)
+
+            item = self.list.GetItem(index, i)
+            item.SetMask(ULC.ULC_MASK_FONTCOLOUR | ULC.ULC_MASK_FONT)
+
+        if self.showWarnings:
+            self.setItemIcon(index, dev)
+
+
+    def removeRow(self, dev: Recorder):
+        """ Remove a recorder from the list.
+
+            :param dev: The device to remove.
+        """
+        key = self.indicesByRecorder.pop(dev, None)
+        if key is None:
+            return
+
+        index = self.list.FindItemData(-1, key)
+        if index != wx.NOT_FOUND:
+            self.list.DeleteItem(index)
+
+        self.recordersByIndex.pop(key, None)
+        self.itemDataMap.pop(key, None)
+        self.listMsgs.pop(key, None)
+        self.listToolTips.pop(key, None)
+        self.renderCache.pop(key, None)
+
+        if self.selected == key:
+            self.selected = None
+        self.lastToolTipItem = -1
+
+
+    def getRow(self, dev: Recorder) -> int:
+        """ Get the current position (row index) of a recorder in the list.
+
+            :param dev: The device to find.
+            :return: The row index, or `wx.NOT_FOUND`.
+        """
+        key = self.indicesByRecorder.get(dev)
+        if key is None:
+            return wx.NOT_FOUND
+        return self.list.FindItemData(-1, key)
+
+
+    def autosizeColumns(self):
+        """ Fit the columns to their contents (but not smaller than their
+            minimum widths). Done once after a batch of rows is changed.
+        """
+        self.listWidth = 0
+        for i, w in enumerate(self.minWidths):
+            if i > 0 and self.recordersByIndex:
+                self.list.SetColumnWidth(i, wx.LIST_AUTOSIZE)
+            w = w + 8
+            if self.list.GetColumnWidth(i) < w:
+                self.list.SetColumnWidth(i, w)
+            self.listWidth += self.list.GetColumnWidth(i)
+
+
     def updateRow(self, dev: Recorder, enabled: bool = True):
-        """ Update one device (row) in the list.
+        """ Update one device (row) in the list. Only cells whose underlying
+            values have changed since they were last rendered are updated.
 
             :param dev: The device being updated.
             :param enabled:
+            :return: The number of cells updated and the number skipped.
         """
-
-        if dev not in self.indicesByRecorder:
+        index = self.getRow(dev)
+        if index == wx.NOT_FOUND:
             # New device, generally shouldn't happen.
-            return
+            return 0, 0
 
-        index = self.indicesByRecorder[dev]
-        if self.showWarnings:
-            self.setItemIcon(index, dev)
+        key = self.indicesByRecorder[dev]
+        cache = self.renderCache.setdefault(key, {})
+        written = skipped = 0
 
         # Status code `None` means device is (temporarily) unavailable
         # (i.e., not present but not yet expired)
-        status = self.recorderStatus.get(dev, (None, (DeviceStatusCode.IDLE, '')))[1][0]
+        devStatus = self.recorderStatus.get(dev, (None, (DeviceStatusCode.IDLE, '')))
+        status = devStatus[1][0]
         enabled = enabled and status is not None
 
         # enable or disable the row
         # excludes button panel - do that explicitly
-        item = self.list.GetItem(index)
-        item.Enable(enabled)
-        self.list.SetItem(item)
+        if cache.get('enabled') != enabled:
+            item = self.list.GetItem(index)
+            item.Enable(enabled)
+            self.list.SetItem(item)
+            cache['enabled'] = enabled
 
         for i, col in enumerate(self.columns[1:], 1):
             # Don't rebuild button panel in update
+            if i == self.buttonCol:
+                renderKey = enabled, getRenderKey(populateStatusColumn, dev, self)
+            else:
+                renderKey = getRenderKey(col.formatter, dev, self)
+
+            if renderKey is not _UNCACHED and cache.get(i, _UNCACHED) == renderKey:
+                skipped += 1
+                continue
+
             if i == self.buttonCol:
                 val = ''
                 pan = self.list.GetItemWindow(index, i)
                 if pan:
                     pan.updateButtons(enabled)
-                else:
+                elif not self.virtual:
+                    # Virtual lists only have panels for visible rows
                     logger.error(f'Could not get button panel for index {index}')
             else:
                 val = col.formatter(dev, index, i, self)
-            self.itemDataMap[index][i] = val or ''
+
+            cache[i] = renderKey
+            self.itemDataMap[key][i] = val or ''
+            written += 1
+
+        if self.showWarnings:
+            # Warnings (free space, etc.) also get re-checked periodically.
+            renderKey = (enabled, devStatus, self.deviceInfo.get(dev),
+                         datetime.now().date())
+            if cache.get('icon') != renderKey:
+                self.setItemIcon(index, dev)
+                cache['icon'] = renderKey
+                written += 1
+            else:
+                skipped += 1
+
+        self.renderStats['written'] += written
+        self.renderStats['skipped'] += skipped
+        return written, skipped
 
 
     def updateList(self):
@@ -942,13 +1585,63 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         try:
             self.updating.set()
             # logger.debug('Updating display')
+            written = skipped = 0
             for dev in self.recorders:
-                self.updateRow(dev)
+                w, s = self.updateRow(dev)
+                written += w
+                skipped += s
+            logger.debug(f'Updated list: {written} cells written, {skipped} skipped, '
+                         f'{self.recorderStatus.reads} cached status reads')
 
         finally:
             self.updating.clear()
 
 
+    def makeButtons(self,
+                    key: int,
+                    row: int,
+                    pan: Optional[controls.ControlButtons] = None) -> controls.ControlButtons:
+        """ Create (or reuse) the control button panel for a row of a
+            virtual list, which only has panels for the visible rows.
+
+            :param key: The row's key (item data).
+            :param row: The row's index.
+            :param pan: An existing panel, no longer shown, to reuse.
+            :return: The row's button panel.
+        """
+        dev = self.recordersByIndex[key]
+        if pan is None:
+            pan = controls.ControlButtons(self, self.list._mainWin, dev, row,
+                                          self.buttonCol)
+            pan.list = self.list
+        else:
+            pan.setDevice(dev, row)
+
+        status = self.recorderStatus.get(dev, (None, (DeviceStatusCode.IDLE, '')))
+        pan.updateButtons(status[1][0] is not None)
+        return pan
+
+
+    def getSortKeys(self) -> tuple:
+        """ Compute the sort key of every row for the current sort column,
+            for sorting a virtual list. Much faster than sorting with a
+            comparison function when there are many rows.
+
+            :return: A dictionary of sort keys (keyed by item key), and
+                `True` if the sort is descending.
+        """
+        col, ascending = self.GetSortState()
+        col = max(col, 0)
+        keys = {}
+        for key, values in self.itemDataMap.items():
+            val = values[col] if col < len(values) else ''
+            if isinstance(val, str):
+                keys[key] = (1, locale.strxfrm(val), key)
+            else:
+                keys[key] = (0, val if val is not None else 0, key)
+        return keys, not ascending
+
+
     def getSelected(self) -> Optional[Recorder]:
         """ Get the device corresponding to the selected item in the list.
         """
@@ -993,7 +1686,7 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         """ Handle list item (row) selection.
         """
         self.selected = self.list.GetItemData(evt.Index)
-        if self.listMsgs[self.selected] is not None:
+        if self.listMsgs.get(self.selected) is not None:
             self.infoText.SetLabel(self.listMsgs[self.selected])
 
         recorder = self.recordersByIndex.get(self.selected, None)
@@ -1064,7 +1757,7 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         if index != wx.NOT_FOUND:
             if index != self.lastToolTipItem:
                 item = self.list.GetItemData(index)
-                text = self.listToolTips[item]
+                text = self.listToolTips.get(item)
 
                 # Everything here on is part of ULC tooltip workaround.
                 self.tooltipFrame.setText(text)
@@ -1090,6 +1783,7 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             if self.autoUpdate:
                 if not self.thread or not self.thread.is_alive():
                     self.thread = DeviceScanThread(self, self.filter, self.autoUpdate)
+                    self.recorderStatus.refresher = self.thread.wake
                     self.thread.start()
         else:
             if self.thread and self.thread.is_alive():
@@ -1101,34 +1795,68 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         
 
     def OnSetClocks(self, _evt=None):
-        """ Set all clocks. Used as an event handler.
+        """ Set all clocks. Used as an event handler. The clocks are set in
+            a background thread (see `endaqconfig.clocksync`); the results
+            are handled by `OnClockSyncDone()`.
         """
+        if self.clockThread and self.clockThread.is_alive():
+            return
+
         self.SetCursor(wx.Cursor(wx.CURSOR_WAIT))
         self.enableButtons(False)
 
+        # Commands are sent through each device's broker, so they won't
+        # collide with status polling, but an in-progress poll could still
+        # delay a time-critical command.
+        if self.thread and self.thread.is_alive():
+            self.thread.pause()
+
+        devices = list(self.recordersByIndex.values())
+        self.clockThread = threading.Thread(target=self._syncClocks,
+                                            args=(devices,),
+                                            name='clocksync',
+                                            daemon=True)
+        self.clockThread.start()
+
+
+    def _syncClocks(self, devices: list):
+        """ Set the clocks of all the devices, and post the results to the
+            dialog. Run in a thread by `OnSetClocks()`.
+        """
         try:
-            if self.thread and self.thread.is_alive():
-                self.thread.pause()
+            evt = EvtClockSyncDone(results=syncClocks(devices), error=None)
+        except Exception as err:
+            logger.error(f"Error setting clocks: {err!r}")
+            evt = EvtClockSyncDone(results=None, error=err)
 
-            deadline = time() + 5
-            threads = [DeviceCommandThread(rec, rec.setTime)
-                       for rec in self.recordersByIndex.values()]
+        try:
+            wx.PostEvent(self, evt)
+        except RuntimeError:
+            # Dialog probably closed while clocks were being set
+            pass
 
-            while any(t.is_alive() for t in threads):
-                if time() > deadline:
-                    break
-                sleep(0.05)
 
+    def OnClockSyncDone(self, evt):
+        """ Handle setting all clocks finishing: report any failures.
+        """
+        try:
             fails = []
-            for t in threads:
-                rec = t.device
-                name = f"{rec.productName} SN:{rec.serial}"
-                if t.failed.is_set():
-                    logger.error(f"Error setting clock on {rec}: {t.failure!r}")
-                    fails.append(name)
-                elif not t.completed.is_set():
-                    logger.error(f"Timed out setting clock on {rec}")
-                    fails.append(f"{name} (timed out)")
+            if evt.error is not None:
+                fails.append(f"{evt.error}")
+            else:
+                skew = evt.results['skew']
+                if skew is not None:
+                    logger.info(f"Set clocks; max. skew between devices {skew * 1000:.1f} ms")
+
+                for result in evt.results['failed']:
+                    rec = result.device
+                    name = f"{rec.productName} SN:{rec.serial}"
+                    if isinstance(result.error, (DeviceTimeout, TimeoutError)):
+                        fails.append(f"{name} (timed out)")
+                    elif result.error is None:
+                        fails.append(f"{name} (clock off by {result.offset:.1f} s)")
+                    else:
+                        fails.append(name)
 
             if fails:
                 if len(fails) > 1:
@@ -1159,40 +1887,117 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
             :param evt: The event generated by a dialog 'Record' button, or
                 an `EVT_RECORD_BUTTON` event from a row in the list.
         """
+        # If EVT_RECORD_BUTTON, get device from event, otherwise use selected
+        recorder = getattr(evt, 'device', None)
+        stop = getattr(evt, 'stop', False)
+        if not recorder:
+            recorder = self.recordersByIndex.get(self.selected, None)
+        if recorder and recorder.canRecord:
+            self.updateRow(recorder, enabled=False)
+            self.recorderStatus.refresh(recorder)
+            # Commands go through the device's broker, ahead of any status
+            # polling, so the scanning thread doesn't need to be paused.
+            if stop:
+                DeviceCommandThread(recorder, recorder.command.stopRecording,
+                                    callback=self.isDead)
+            else:
+                DeviceCommandThread(recorder, recorder.command.startRecording,
+                                    callback=self.isDead)
+
+
+    def OnStartAllRecorders(self,
+                            evt: Union[wx.CommandEvent, EvtRecordButton, None] = None):
+        """ Send the 'start recording' command to all devices, as close to
+            simultaneously as possible. The recorders are started in a
+            background thread (see `endaqconfig.fleetstart`); the results
+            are handled by `OnFleetStartDone()`.
+        """
+        if self.startThread and self.startThread.is_alive():
+            return
+
+        devices = [dev for dev in self.recordersByIndex.values() if dev.canRecord]
+        if not devices:
+            return
+
+        self.SetCursor(wx.Cursor(wx.CURSOR_WAIT))
+        self.enableButtons(False)
+        self.recordButton.Enable(False)
+
+        # As in `OnSetClocks()`, stop polling from delaying the commands.
         if self.thread and self.thread.is_alive():
             self.thread.pause()
 
+        for dev in devices:
+            self.updateRow(dev, enabled=False)
+
+        self.startThread = threading.Thread(target=self._startAll,
+                                            args=(devices,),
+                                            name='fleetstart',
+                                            daemon=True)
+        self.startThread.start()
+
+
+    def _startAll(self, devices: list):
+        """ Start all the devices, and post the results to the dialog. Run
+            in a thread by `OnStartAllRecorders()`.
+        """
         try:
-            # If EVT_RECORD_BUTTON, get device from event, otherwise use selected
-            recorder = getattr(evt, 'device', None)
-            stop = getattr(evt, 'stop', False)
-            if not recorder:
-                recorder = self.recordersByIndex.get(self.selected, None)
-            if recorder and recorder.canRecord:
-                self.updateRow(recorder, enabled=False)
-                if stop:
-                    # recorder.command.stopRecording()
-                    DeviceCommandThread(recorder, recorder.command.stopRecording,
-                                        callback=self.isDead)
-                else:
-                    # recorder.command.startRecording()
-                    DeviceCommandThread(recorder, recorder.command.startRecording,
-                                        callback=self.isDead)
-        finally:
-            if self.thread and self.thread.is_alive():
-                self.thread.resume()
+            evt = EvtFleetStartDone(results=startAll(devices, callback=self.isDead),
+                                    error=None)
+        except Exception as err:
+            logger.error(f"Error starting recorders: {err!r}")
+            evt = EvtFleetStartDone(results=None, error=err)
 
+        try:
+            wx.PostEvent(self, evt)
+        except RuntimeError:
+            # Dialog probably closed while recorders were being started
+            pass
 
-    def OnStartAllRecorders(self,
-                            evt: Union[wx.CommandEvent, EvtRecordButton, None] = None):
-        """ Send the 'start recording' command to all devices.
 
-            This is placeholder for future functionality. It may or may not
-            ever be implemented.
+    def OnFleetStartDone(self, evt):
+        """ Handle starting all recorders finishing: report any failures.
         """
-        # If/when this is implemented, it will be like `OnSetClocks()`
-        logger.warning("OnStartAllRecorders() is not implemented (yet)!")
-        evt.Skip()
+        try:
+            fails = []
+            if evt.error is not None:
+                fails.append(f"{evt.error}")
+            elif not evt.results['cancelled']:
+                spread = evt.results['spread']
+                if spread is not None:
+                    logger.info(f"Started recorders; max. spread {spread * 1000:.1f} ms")
+
+                for result in evt.results['failed']:
+                    rec = result.device
+                    name = f"{rec.productName} SN:{rec.serial}"
+                    if isinstance(result.error, (DeviceTimeout, TimeoutError)):
+                        fails.append(f"{name} (timed out)")
+                    else:
+                        fails.append(name)
+
+            if fails:
+                if len(fails) > 1:
+                    names = "\u2022 " + ('\n\u2022 '.join(fails))
+                    msg = ("Could not start recording.\n\n"
+                           "Errors prevented these recorders from starting:\n\n"
+                           f"{names}")
+                else:
+                    msg = ("Could not start recording.\n\n"
+                           "An error prevented recorder "
+                           f"{fails[0]} from starting.")
+
+                wx.MessageBox(msg, "Device Error", parent=self,
+                              style=wx.OK | wx.ICON_ERROR)
+
+        finally:
+            self.SetCursor(wx.Cursor(wx.CURSOR_DEFAULT))
+            self.enableButtons(True)
+            self.recordButton.Enable(True)
+
+            if self.thread and self.thread.is_alive():
+                for dev in (evt.results or {}).get('results', ()):
+                    self.recorderStatus.refresh(dev)
+                self.thread.resume()
 
 
     def OnDeviceListUpdate(self, evt):
@@ -1203,13 +2008,14 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         new = evt.devices
         stat = evt.status
         devicesChanged = new != self.recorders
-        statsChanged = stat != self.recorderStatus
+        statsChanged = stat != self.recorderStatus.statuses or evt.info != self.deviceInfo
 
         self.recorders = new
-        self.recorderStatus = stat
+        self.recorderStatus.replaceAll(stat, getattr(evt, 'generation', None))
+        self.deviceInfo = evt.info
 
         if devicesChanged:
-            self.populateList()
+            self.syncList()
         elif statsChanged or now - self.lastUpdate > 10:
             # Same devices, different status (or time to force an update,
             # making sure nothing in the list has gotten 'stuck')
@@ -1226,6 +2032,27 @@ class DeviceSelectionDialog(sc.SizedDialog, listmix.ColumnSorterMixin):
         self.updateTimerCalls += 1
 
 
+    def OnDeviceStatusUpdate(self, evt):
+        """ Handle an event generated by the scanning thread when the status
+            (or warning info) of a single device has been read. Only that
+            device's row is updated.
+        """
+        dev = evt.device
+        status = self.recorderStatus.get(dev) if evt.status is None else evt.status
+        info = self.deviceInfo.get(dev) if evt.info is None else evt.info
+        if self.recorderStatus.get(dev) == status and self.deviceInfo.get(dev) == info:
+            return
+
+        if status is not None:
+            self.recorderStatus.setStatus(dev, status, getattr(evt, 'generation', None))
+        if info is not None:
+            self.deviceInfo[dev] = info
+
+        # Skip if the list is being rebuilt; the row will be current.
+        if not self.updating.is_set():
+            self.updateRow(dev)
+
+
 # ===========================================================================
 #
 # ===========================================================================
@@ -1265,6 +2092,9 @@ def selectDevice(title: str = "Select Recorder",
             `False` will show no icon.
         :keyword tooltips: If `True` (default), show list tooltips containing
             all important device infomation.
+        :keyword virtual: If `True`, use a 'virtual' list, which only draws
+            (and creates control buttons for) the visible rows. For very
+            large numbers of devices. Default is `False`.
         :return: The path of the selected device.
     """
     result = None
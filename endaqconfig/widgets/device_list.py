@@ -0,0 +1,410 @@
+"""
+A 'virtual' device list control, for displaying very large numbers of
+devices (e.g., network-attached fleets). Rows are drawn on demand from a
+compact model, instead of each having its own list item; control button
+panels are only created for the visible rows, and reused as the list
+scrolls.
+
+`VirtualDeviceList` implements the subset of the `UltimateListCtrl` item API
+used by `DeviceSelectionDialog` and its column formatters, so the dialog can
+use either kind of list.
+"""
+
+__author__ = "dstokes"
+__copyright__ = "Copyright 2022 Mide Technology Corporation"
+
+from functools import cmp_to_key
+from typing import Callable, Dict, Optional, Tuple
+
+import wx
+from wx.lib.agw import ultimatelistctrl as ULC
+
+
+# ===========================================================================
+#
+# ===========================================================================
+
+class VirtualItem(object):
+    """ Stand-in for a `ULC.UltimateListItem` returned by
+        `VirtualDeviceList.GetItem()`. Changes are applied to the list's
+        model by `VirtualDeviceList.SetItem()`.
+    """
+
+    __slots__ = ('row', 'column', 'colour', 'enabled')
+
+    def __init__(self, row: int, column: int = 0):
+        self.row = row
+        self.column = column
+        self.colour = None
+        self.enabled = None
+
+
+    def SetMask(self, mask):
+        pass
+
+
+    def SetFont(self, font):
+        pass
+
+
+    def SetTextColour(self, colour):
+        self.colour = colour
+
+
+    def Enable(self, enable=True):
+        self.enabled = enable
+
+
+class VirtualDeviceList(ULC.UltimateListCtrl):
+    """ A 'virtual' list control for displaying devices. Each row's cells
+        are kept as text, images and color (keyed by the row's item data),
+        and only drawn when visible.
+    """
+
+    def __init__(self, parent, id=-1,
+                 agwStyle: int = 0,
+                 buttonCol: Optional[int] = None,
+                 buttonFactory: Optional[Callable] = None,
+                 sortKeys: Optional[Callable] = None,
+                 **kwargs):
+        """ A 'virtual' list control for displaying devices. Takes the
+            standard `UltimateListCtrl` arguments, plus:
+
+            :param buttonCol: The index of the column containing control
+                button panels, if any.
+            :param buttonFactory: A function to create (or reuse) the button
+                panel for a row. It takes the row's item data, the row index,
+                and a panel to reuse (or `None`); it returns the panel.
+            :param sortKeys: A function that returns a dictionary of sort
+                keys (keyed by item data) for the current sort column, and
+                a boolean indicating a reversed (descending) sort. If
+                `None`, sorting uses the comparison function supplied to
+                `SortItems()`.
+        """
+        super().__init__(parent, id, agwStyle=agwStyle | ULC.ULC_VIRTUAL, **kwargs)
+
+        self.buttonCol = buttonCol
+        self.buttonFactory = buttonFactory
+        self.sortKeys = sortKeys
+
+        self.keys = []  # Item data of each row, in display order
+        self.rowsByKey = {}  # Row index, keyed by item data
+        self.cells = {}  # Dicts of [text, images, color] keyed by column, keyed by item data
+        self.disabled = set()  # Item data of disabled rows
+        self.itemKind = 0
+
+        self.buttons = {}  # Button panels of visible rows, keyed by item data
+        self.spareButtons = []  # Button panels not currently shown
+        self.textWidths = {}  # Cache of text widths, for autosizing columns
+        self._view = None
+
+        self._mainWin.Bind(wx.EVT_IDLE, self.OnIdle)
+
+
+    # =======================================================================
+    # Model
+    # =======================================================================
+
+    def _reindex(self, start: int = 0):
+        """ Update the row indices of items from `start` on. """
+        for row in range(start, len(self.keys)):
+            self.rowsByKey[self.keys[row]] = row
+
+
+    def _cell(self, row: int, col: int) -> list:
+        """ Get the model data for a cell (text, images, color). """
+        return self.cells.setdefault(self.keys[row], {}).setdefault(col, ['', [], None])
+
+
+    def _resize(self):
+        """ Update the item count after adding or removing rows. """
+        self.SetItemCount(len(self.keys))
+        self._view = None
+        self.Refresh()
+
+
+    def _getSelected(self) -> list:
+        """ Get the item data of the selected rows. """
+        selected = []
+        row = self.GetFirstSelected()
+        while row != -1:
+            selected.append(self.keys[row])
+            row = self.GetNextSelected(row)
+        return selected
+
+
+    def _setSelected(self, keys):
+        """ Select the rows with the given item data. """
+        for key in keys:
+            row = self.rowsByKey.get(key)
+            if row is not None:
+                self.Select(row)
+
+
+    def isDisabled(self, key) -> bool:
+        """ Is the row with the given item data disabled? """
+        return key in self.disabled
+
+
+    # =======================================================================
+    # UltimateListCtrl item API, operating on the model
+    # =======================================================================
+
+    def InsertImageStringItem(self, index, label, imageIds, it_kind=0):
+        self.itemKind = it_kind
+        index = max(0, min(index, len(self.keys)))
+        selected = self._getSelected()
+        self.keys.insert(index, None)  # Item data is set by `SetItemData()`
+        self.cells[None] = {0: [label, list(imageIds), None]}
+        self._reindex(index)
+        self._resize()
+        self._setSelected(selected)
+        return index
+
+
+    def DeleteItem(self, item):
+        selected = self._getSelected()
+        for row in range(item, len(self.keys)):
+            if self.keys[row] in selected:
+                self.Select(row, False)
+
+        key = self.keys.pop(item)
+        self.rowsByKey.pop(key, None)
+        self.cells.pop(key, None)
+        self.disabled.discard(key)
+        pan = self.buttons.pop(key, None)
+        if pan:
+            pan.Hide()
+            self.spareButtons.append(pan)
+
+        self._reindex(item)
+        self._resize()
+        self._setSelected(k for k in selected if k != key)
+        return True
+
+
+    def DeleteAllItems(self):
+        super().DeleteAllItems()
+        self._clearModel()
+        return True
+
+
+    def ClearAll(self):
+        super().ClearAll()
+        self._clearModel()
+
+
+    def _clearModel(self):
+        self.keys = []
+        self.rowsByKey.clear()
+        self.cells.clear()
+        self.disabled.clear()
+        for pan in self.buttons.values():
+            pan.Hide()
+            self.spareButtons.append(pan)
+        self.buttons.clear()
+        self._view = None
+
+
+    def SetItemData(self, item, data):
+        old = self.keys[item]
+        self.rowsByKey.pop(old, None)
+        self.keys[item] = data
+        self.rowsByKey[data] = item
+        self.cells[data] = self.cells.pop(old, {})
+        return True
+
+
+    def GetItemData(self, item):
+        return self.keys[item]
+
+
+    def FindItemData(self, start, data):
+        row = self.rowsByKey.get(data, wx.NOT_FOUND)
+        if row < max(start, 0):
+            return wx.NOT_FOUND
+        return row
+
+
+    def SetStringItem(self, index, col, label, imageIds=[], it_kind=0):
+        cell = self._cell(index, col)
+        cell[0] = label
+        cell[1] = list(imageIds)
+        self.RefreshItem(index)
+        return index
+
+
+    def SetItemText(self, item, text):
+        self._cell(item, 0)[0] = text
+        self.RefreshItem(item)
+
+
+    def SetItemImage(self, item, image, selImage=-1):
+        if not isinstance(image, (list, tuple)):
+            image = [image]
+        self._cell(item, 0)[1] = list(image)
+        self.RefreshItem(item)
+        return True
+
+
+    def GetItem(self, itemOrId, col=0):
+        return VirtualItem(itemOrId, col)
+
+
+    def SetItem(self, info):
+        key = self.keys[info.row]
+        if info.colour is not None:
+            self._cell(info.row, info.column)[2] = info.colour
+        if info.enabled is not None:
+            if info.enabled:
+                self.disabled.discard(key)
+            else:
+                self.disabled.add(key)
+        self.RefreshItem(info.row)
+        return True
+
+
+    def GetItemWindow(self, itemOrId, col=0):
+        if col != self.buttonCol:
+            return None
+        return self.buttons.get(self.keys[itemOrId])
+
+
+    def SetItemWindow(self, itemOrId, col=0, wnd=None, expand=False):
+        raise NotImplementedError("Item windows are created on demand in a "
+                                  "virtual device list; use `buttonFactory`")
+
+
+    def SetColumnWidth(self, col, width):
+        if width == wx.LIST_AUTOSIZE:
+            # Base class can't autosize virtual lists; measure the model.
+            width = 0
+            for cells in self.cells.values():
+                text, images, _color = cells.get(col, ('', (), None))
+                if text not in self.textWidths:
+                    self.textWidths[text] = self.GetTextExtent(text)[0]
+                width = max(width, self.textWidths[text] + 18 * len(images))
+            width += 12
+        return super().SetColumnWidth(col, width)
+
+
+    def SortItems(self, func=None):
+        selected = self._getSelected()
+        for row in range(len(self.keys)):
+            if self.keys[row] in selected:
+                self.Select(row, False)
+
+        if self.sortKeys is not None:
+            keys, reverse = self.sortKeys()
+            self.keys.sort(key=keys.__getitem__, reverse=reverse)
+        elif func is not None:
+            self.keys.sort(key=cmp_to_key(func))
+
+        self._reindex()
+        self._view = None
+        self.Refresh()
+        self._setSelected(selected)
+        return True
+
+
+    # =======================================================================
+    # Virtual list callbacks
+    # =======================================================================
+
+    def _getCell(self, item: int, col: int) -> Tuple[str, list, Optional[wx.Colour]]:
+        try:
+            return self.cells[self.keys[item]].get(col, ('', [], None))
+        except (IndexError, KeyError):
+            return '', [], None
+
+
+    def OnGetItemText(self, item, col):
+        return self._getCell(item, col)[0]
+
+
+    def OnGetItemTextColour(self, item, col):
+        if item < len(self.keys) and self.keys[item] in self.disabled:
+            return self.GetDisabledTextColour()
+        return self._getCell(item, col)[2]
+
+
+    def OnGetItemToolTip(self, item, col):
+        return None
+
+
+    def OnGetItemImage(self, item):
+        return self._getCell(item, 0)[1]
+
+
+    def OnGetItemColumnImage(self, item, column=0):
+        return self._getCell(item, column)[1]
+
+
+    def OnGetItemAttr(self, item):
+        return None
+
+
+    def OnGetItemKind(self, item):
+        return self.itemKind
+
+
+    def OnGetItemColumnCheck(self, item, column=0):
+        return False
+
+
+    # =======================================================================
+    # Button panels (visible rows only)
+    # =======================================================================
+
+    def positionButtons(self):
+        """ Show button panels in the visible rows (creating or reusing
+            panels as required), and hide the rest.
+        """
+        if self.buttonCol is None or self.buttonFactory is None:
+            return
+
+        if self.keys:
+            first, last = self._mainWin.GetVisibleLinesRange()
+        else:
+            first, last = 0, -1
+
+        visible = self.keys[first:last + 1]
+        for key in set(self.buttons).difference(visible):
+            pan = self.buttons.pop(key)
+            pan.Hide()
+            self.spareButtons.append(pan)
+
+        for row, key in enumerate(visible, first):
+            pan = self.buttons.get(key)
+            if pan is None:
+                spare = self.spareButtons.pop() if self.spareButtons else None
+                pan = self.buttonFactory(key, row, spare)
+                self.buttons[key] = pan
+
+            rect = self._mainWin.GetSubItemRect(row, self.buttonCol)
+            rect = wx.Rect(rect.x + 2, rect.y + 1, rect.width - 4, rect.height - 2)
+            if pan.GetRect() != rect:
+                pan.SetRect(rect)
+            if not pan.IsShown():
+                pan.Show()
+
+
+    def OnIdle(self, evt):
+        """ Reposition the button panels if the view has changed (scrolled,
+            resized, rows or columns changed).
+        """
+        evt.Skip()
+        try:
+            view = (self._mainWin.GetViewStart(), self._mainWin.GetClientSize(),
+                    len(self.keys), self.GetColumnWidth(self.buttonCol or 0))
+            if view != self._view:
+                self._view = view
+                self.positionButtons()
+        except RuntimeError:
+            # Window deleted
+            pass
+
+
+    def getButtonPanels(self) -> Dict:
+        """ Get the button panels currently shown, keyed by item data. """
+        return dict(self.buttons)
@@ -15,9 +15,32 @@ EvtConfigButton, EVT_CONFIG_BUTTON = NewEvent()
 # Start (or stop) a recording. Carries `device` as attribute.
 EvtRecordButton, EVT_RECORD_BUTTON = NewEvent()
 
-# Called when the `getDevices()` thread completes
+# Called when the `getDevices()` thread completes. Event attributes:
+# * devices: The list of `Recorder` instances found.
+# * status: The last known status of each device (see below), keyed by device.
+# * info: The last collected warning info of each device, keyed by device.
+# * generation: The number of the scan (increases with each scan).
 EvtDeviceListUpdate, EVT_DEVICE_LIST_UPDATE = NewEvent()
 
+# Called when the status of one device has been read by the scanning thread.
+# Event attributes:
+# * device: The `Recorder` that was polled.
+# * status: The device's battery status, status code/message, and path.
+# * info: Information for the device's warnings (free space, calibration
+#   expiration, etc.), or `None` if not yet collected.
+# * generation: The number of the latest scan when the status was read.
+EvtDeviceStatusUpdate, EVT_DEVICE_STATUS_UPDATE = NewEvent()
+
+# Called when setting all the recorders' clocks has finished. Event attributes:
+# * results: The summary returned by `endaqconfig.clocksync.syncClocks()`.
+# * error: None if no error occurred, or the instance of the Exception if one did
+EvtClockSyncDone, EVT_CLOCK_SYNC_DONE = NewEvent()
+
+# Called when starting all the recorders has finished. Event attributes:
+# * results: The summary returned by `endaqconfig.fleetstart.startAll()`.
+# * error: None if no error occurred, or the instance of the Exception if one did
+EvtFleetStartDone, EVT_FLEET_START_DONE = NewEvent()
+
 # ===========================================================================
 # Wi-Fi events
 # ===========================================================================
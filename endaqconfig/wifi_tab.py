@@ -5,15 +5,22 @@ Created on Nov 13, 2019
 
 :author: dstokes
 """
+from concurrent.futures import CancelledError
+from functools import partial
 import threading
-from time import time, sleep
+from time import monotonic, time
+from typing import List, Optional
+import weakref
 
 import wx
 import wx.lib.sized_controls as SC
 import wx.lib.mixins.listctrl as listmix
 
+from . import fields
 from .base import Tab
 from .base import logger, registerTab
+from .broker import getBroker, BACKGROUND, NORMAL
+from .polling import StatePollSchedule
 from .widgets import icons
 from .widgets.events import *
 
@@ -25,6 +32,20 @@ from endaq.device.response_codes import DeviceStatusCode
 #
 # ===============================================================================
 
+# Maximum time (in seconds) to wait for the Wi-Fi threads to stop when the tab
+# shuts down. They are daemon threads, and stop on their own if they take
+# longer (e.g., waiting for a command to time out).
+SHUTDOWN_TIMEOUT = 1.0
+
+# Longest time (in seconds) between checks of the network status, once the
+# device has been connected for `STABLE_STATUS_TIME` seconds.
+MAX_STATUS_INTERVAL = 60
+STABLE_STATUS_TIME = 30
+
+# Maximum age (in seconds) of cached Wi-Fi scan results shown while a new scan
+# is done in the background. Older results are discarded.
+SCAN_CACHE_MAX_AGE = 300
+
 AUTH_TYPES = ("None", "WPA", "WPA2", "Unknown")
 DEFAULT_AUTH = 1
 
@@ -38,6 +59,42 @@ CONNECTION_STATUS_TO_STR = {
 #
 # ===============================================================================
 
+# The last Wi-Fi scan of each device, as (time, data). Entries are removed when
+# their devices are no longer referenced elsewhere.
+_scanCache = weakref.WeakKeyDictionary()
+_scanCacheLock = threading.Lock()
+
+
+def cacheScan(device, data: List[dict]):
+    """ Keep the results of a device's Wi-Fi scan, so they can be shown
+        immediately the next time the Wi-Fi tab is opened.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param data: The list of AP dictionaries returned by `scanWifi()`.
+    """
+    with _scanCacheLock:
+        _scanCache[device] = (time(), [dict(ap) for ap in data])
+
+
+def getCachedScan(device, maxAge: float = SCAN_CACHE_MAX_AGE) -> Optional[List[dict]]:
+    """ Get the results of a device's last Wi-Fi scan, if it was recent.
+
+        :param device: The recorder (an `endaq.device.Recorder`).
+        :param maxAge: The maximum age (in seconds) of the cached results.
+        :return: A copy of the list of AP dictionaries, or `None` if the
+            device hasn't been scanned in the last `maxAge` seconds.
+    """
+    with _scanCacheLock:
+        timestamp, data = _scanCache.get(device, (None, None))
+        if data is None or time() - timestamp > maxAge:
+            return None
+        return [dict(ap) for ap in data]
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
 
 class WiFiScanThread(threading.Thread):
     """ Thread for asynchronously retrieving a list of Wi-Fi APs from the
@@ -67,21 +124,40 @@ class WiFiScanThread(threading.Thread):
         self.cancel.clear()
 
 
+    def stop(self):
+        """ Stop the thread. A scan in progress is cancelled via its
+            callback.
+        """
+        self.cancel.set()
+
+
     def run(self):
         """ The scanning thread's main loop.
         """
         data = None
         E = None
 
-        sleep(self.pause)
+        if self.cancel.wait(self.pause):
+            return
 
         try:
-            data = self.parent.device.command.scanWifi(timeout=self.timeout,
-                                                       interval=self.interval,
-                                                       callback=self.cancel.is_set)
+            command = self.parent.device.command
+            data = getBroker(self.parent.device).call(
+                    partial(command.scanWifi, timeout=self.timeout,
+                            interval=self.interval, callback=self.cancel.is_set),
+                    priority=NORMAL, cancel=self.cancel.is_set)
+        except CancelledError:
+            return
         except Exception as err:
             E = err
 
+        if E is None and data is not None:
+            # Cached even if cancelled; the scan itself completed.
+            cacheScan(self.parent.device, data)
+
+        if self.cancel.is_set():
+            return
+
         evt = EvtConfigWiFiScan(data=data, error=E)
 
         try:
@@ -93,15 +169,20 @@ class WiFiScanThread(threading.Thread):
 
 class ContinousNetworkStatusChecker(threading.Thread):
     """ Thread for continually checking the current status of the network
-        connection, done asynchronously.
+        connection, done asynchronously. Polls are scheduled by a
+        `StatePollSchedule`: they stop while the Wi-Fi tab is hidden, slow
+        down once the device has been connected for a while, and speed up
+        after the Wi-Fi configuration is changed (see `burst()`).
     """
 
-    def __init__(self, parent, interval=4, timeout=10):
+    def __init__(self, parent, interval=4, timeout=10, schedule=None):
         """ Constructor.
 
             :param parent: The parent `WifiSelectionTab`
             :param interval: Time (in seconds) between each check of the network status
             :param timeout: Time (in seconds) to wait for the device to finish checking the network status
+            :param schedule: A `StatePollSchedule` for the checks. If `None`,
+                one is created with `interval` as its normal interval.
         """
         super(ContinousNetworkStatusChecker, self).__init__(name=type(self).__name__)
         self.daemon = True
@@ -112,25 +193,112 @@ class ContinousNetworkStatusChecker(threading.Thread):
         self.cancel = threading.Event()
         self.cancel.clear()
 
+        if schedule is None:
+            schedule = StatePollSchedule(interval=interval,
+                                         maxInterval=MAX_STATUS_INTERVAL,
+                                         stableTime=STABLE_STATUS_TIME,
+                                         isStable=self.isConnected)
+        self.schedule = schedule
+
+        # Set when the tab is visible; polling stops while it is cleared.
+        self.visible = threading.Event()
+        self.visible.set()
+
+        # Set to end a wait early (visibility change, burst, or stopping).
+        self.wakeup = threading.Event()
+
+
+    @staticmethod
+    def isConnected(state, ssid=None):
+        """ Is the network status (a tuple of the connection status and
+            SSID) connected (to the given SSID, if any)?
+        """
+        return (state is not None and state[0] == 2
+                and (ssid is None or state[1] == ssid))
+
+
+    def _sleep(self, timeout=None):
+        """ Wait for the given time, or until woken.
+        """
+        self.wakeup.wait(timeout)
+        self.wakeup.clear()
+
+
+    def setVisible(self, visible=True):
+        """ Start or stop polling (e.g., when the Wi-Fi tab is shown or
+            hidden). When made visible, the status is checked immediately.
+        """
+        if visible:
+            self.visible.set()
+        else:
+            self.visible.clear()
+        self.wakeup.set()
+
+
+    def burst(self, ssid=None):
+        """ Check the status rapidly until the device connects (e.g., after
+            its Wi-Fi configuration has been changed).
+
+            :param ssid: The SSID of the network the device should connect
+                to, if known.
+        """
+        self.schedule.burst(settled=partial(self.isConnected, ssid=ssid))
+        self.wakeup.set()
+
+
+    def stop(self):
+        """ Stop the thread. Commands in progress are cancelled via their
+            callbacks.
+        """
+        self.cancel.set()
+        self.wakeup.set()
+
 
     def run(self):
         """ The main loop.
         """
-        sleep(self.interval)
-        while bool(self.parent) and not self.cancel.is_set():
-            start_time = time()
+        cancelled = self.cancel.is_set
+        self._sleep(self.interval)
+        while bool(self.parent) and not cancelled():
+            if not self.visible.is_set():
+                self._sleep()
+                continue
+
+            start_time = monotonic()
+            state = error = None
+            timedOut = False
             try:
-                result = self.parent.device.command.queryWifi(timeout=5)
-                evt = EvtConfigWiFiConnectionCheck(result=result)
-                if bool(self.parent):
-                    wx.PostEvent(self.parent, evt)
+                device = self.parent.device
+                priority = NORMAL if self.schedule.bursting else BACKGROUND
+                result = getBroker(device).call(partial(device.command.queryWifi, timeout=5,
+                                                        callback=cancelled),
+                                                priority=priority, key='queryWifi',
+                                                cancel=cancelled)
+                if cancelled():
+                    return
+                if result is None:
+                    # No response: treat it like a timeout.
+                    logger.warning("No response when checking the network connection, retrying")
+                    timedOut = True
+                else:
+                    state = (result.get('WiFiConnectionStatus'), result.get('SSID'))
+                    evt = EvtConfigWiFiConnectionCheck(result=result)
+                    if bool(self.parent):
+                        wx.PostEvent(self.parent, evt)
+
+            except CancelledError:
+                return
 
-            except DeviceTimeout:
+            except DeviceTimeout as E:
                 logger.warning("Timed out when checking the network connection, retrying")
+                error = E
+                timedOut = True
 
             except DeviceError as E:
+                # The broker has already retried; poll again after backing off.
                 if E.args and E.args[0] == DeviceStatusCode.ERR_BUSY:
-                    logger.info("Device repoted ERR_BUSY, retrying")
+                    logger.info("Device reported ERR_BUSY, retrying")
+                    error = E
                 else:
                     logger.error(E)
                     raise
@@ -144,8 +312,9 @@ class ContinousNetworkStatusChecker(threading.Thread):
 
                 return
 
-            to_sleep = max(0, self.interval - (time() - start_time))
-            sleep(to_sleep)
+            interval = self.schedule.update(state, monotonic() - start_time,
+                                            error=error, timeout=timedOut)
+            self._sleep(max(0, interval - (monotonic() - start_time)))
 
 
 # ===============================================================================
@@ -247,16 +416,13 @@ class AddWifiDialog(SC.SizedDialog):
 # ===============================================================================
 
 @registerTab
-class WiFiSelectionTab(Tab):
+class WiFiSelectionTab(fields.WiFiSelectionTab, Tab):
     """ Tab for selecting the wireless access point for a W-series recorder.
         This communicates directly with the device to get the visible
         networks and to save passwords.
     """
     COLUMNS = ("Wi-Fi Network", "Security", "Connected")
 
-    # 'Constant' value for the label, read from CONFIG_UI for 'normal' tabs
-    label = "Wi-Fi"
-
     # FUTURE: Once multiple saved passwords is a thing, this will be provided
     # in the CONFIG_UI data.
     storeMultiplePasswords = False
@@ -281,10 +447,33 @@ class WiFiSelectionTab(Tab):
         self.parent = kwargs['root']
         self.device = kwargs['root'].device
 
+        self.scanThread = None
+        self.networkStatusThread = None
+        self.showingCached = False
+
         super(WiFiSelectionTab, self).__init__(*args, **kwargs)
 
+
+    def build(self):
+        """ Build the contents of the tab, and start monitoring the device's
+            network status.
+
+            :see: `Tab.build()`
+        """
+        if not super(WiFiSelectionTab, self).build():
+            return False
+
         self.networkStatusThread = ContinousNetworkStatusChecker(self)
         self.networkStatusThread.start()
+        return True
+
+
+    def setVisible(self, visible=True):
+        """ Start or stop checking the network status, e.g., when the tab is
+            shown or hidden.
+        """
+        if self.networkStatusThread:
+            self.networkStatusThread.setVisible(visible)
 
 
     def loadImages(self):
@@ -375,6 +564,9 @@ class WiFiSelectionTab(Tab):
         self.listToolTips = []
         self.lastToolTipItem = -1
 
+        # The SSID of each AP in `info` when the list was last populated
+        self.listSsids = []
+
         self.selected = -1
         self.firstSelected = -1
         self.lastSelected = -1
@@ -469,92 +661,131 @@ class WiFiSelectionTab(Tab):
             return AUTH_TYPES[ap['AuthType']]
 
 
-    def getInfo(self):
+    def getIcon(self, ap):
+        """ Get the index of the icon for an AP, and the 'strength' used to
+            order new items in the list.
+        """
+        strength = ap['RSSI']
+        security = ap['AuthType']
+
+        if strength is None:
+            icon = 11 if security else 5
+
+            # arbitrarily high since I can't use infinity and numpy isn't imported for using finfo
+            strength = 1e6
+        else:
+            # TODO: Use some sort of curve to round up low values.
+            if strength >= 0:
+                icon = 5
+            elif strength >= .1:
+                icon = 0
+            else:
+                # The min is done for the case where strength is
+                # exactly -100 max (and didn't think too hard about it)
+                icon_index = 4 + min(0, int(strength / 25))
+                icon = max(1, self.icons[icon_index])
+
+            if security:
+                icon += 6
+
+        return icon, strength
+
+
+    def getInfo(self, useCache=True):
         """ Get Wi-Fi information from the device. Starts the asynchronous
-            device-reading thread.
+            device-reading thread. If the device was scanned recently, the
+            cached results are shown while the new scan runs.
+
+            :param useCache: If `False`, don't show cached results; the list
+                is disabled until the new scan finishes.
         """
         if self.scanThread and self.scanThread.is_alive():
             return
 
-        self.list.Enable(False)
+        cached = getCachedScan(self.device) if useCache and not self.info else None
+        self.showingCached = bool(cached) or (not useCache and bool(self.info))
+
         self.addButton.Enable(False)
-        self.pwCheck.Enable(False)
-        self.pwField.Enable(False)
         self.forgetCheck.Enable(False)
         self.rescan.SetLabelText("Scanning...")
-        self.SetCursor(wx.Cursor(wx.CURSOR_WAIT))
+
+        if self.showingCached:
+            if cached:
+                self.info = cached
+                self.populate()
+            self.SetCursor(wx.Cursor(wx.CURSOR_ARROWWAIT))
+        else:
+            self.list.Enable(False)
+            self.pwCheck.Enable(False)
+            self.pwField.Enable(False)
+            self.SetCursor(wx.Cursor(wx.CURSOR_WAIT))
+
         self.scanThread = WiFiScanThread(self)
         self.scanThread.start()
 
 
     def populate(self):
-        """ Fill out the AP list. Called when the Wi-Fi scan thread finishes.
+        """ Fill out the AP list, updating the existing items in place
+            (keeping the list's selection and scroll position) rather than
+            rebuilding it. Called when the Wi-Fi scan thread finishes, and
+            when the list of APs changes.
         """
+        # Existing rows, keyed by the SSID they show. SSIDs can appear more
+        # than once (e.g., multiple access points for the same network).
+        oldSsids = self.listSsids
+        rows = {}
+        for row in range(self.list.GetItemCount()):
+            n = self.list.GetItemData(row)
+            if 0 <= n < len(oldSsids):
+                rows.setdefault(oldSsids[n], []).append(row)
+
+        selectedRow = self.list.GetFirstSelected()
+        keepLast = self.lastSelected == self.selected
+
         self.firstSelected = -1
         self.lastSelected = -2
+        self.selected = -1
         self.listToolTips = []
 
         self.forgetCheck.Enable(False)
 
-        self.list.DeleteAllItems()
-
+        # Match APs to existing rows before changing anything, since adding
+        # and removing items changes the indices of the others.
+        matched = []
         for n, ap in enumerate(self.info):
-            ssid = ap['SSID']
-            strength = ap['RSSI']
-            security = ap['AuthType']
-            selected = ap['Selected']
-
-            if strength is None:
-                icon = 11 if security else 5
-
-                # arbitrarily high since I can't use infinity and numpy isn't imported for using finfo
-                strength = 1e6
-            else:
-                # TODO: Use some sort of curve to round up low values.
-                if strength >= 0:
-                    icon = 5
-                elif strength >= .1:
-                    icon = 0
-                else:
-                    # The min is done for the case where strength is
-                    # exactly -100 max (and didn't think too hard about it)
-                    icon_index = 4 + min(0, int(strength / 25))
-                    icon = max(1, self.icons[icon_index])
+            existing = rows.get(ap['SSID'])
+            matched.append(existing.pop(0) if existing else None)
 
-                if security:
-                    icon += 6
+        # Update matched rows, then remove the unmatched ones (last first).
+        for n, row in enumerate(matched):
+            if row is not None:
+                self.setItem(row, n, self.info[n], row == selectedRow)
 
-            idx = self.list.InsertItem(- strength, ssid, icon)
-            self.list.SetItem(idx, 1, self.makeAuthTypeString(ap))
-            self.list.SetItemData(idx, n)
-            item = self.list.GetItem(idx)
+        for row in sorted((r for rs in rows.values() for r in rs), reverse=True):
+            self.list.DeleteItem(row)
 
-            ap['idx'] = idx
+        for n, ap in enumerate(self.info):
+            if matched[n] is None:
+                icon, strength = self.getIcon(ap)
+                idx = self.list.InsertItem(- strength, ap['SSID'], icon)
+                self.setItem(idx, n, ap)
 
-            if selected:
+            if ap['Selected']:
                 # Indicate that this is the previously selected AP
-                if self.selected == -1:
-                    self.selected = n
-
                 self.firstSelected = n
 
-                item.SetText(item.GetText() + " *")
-
-            elif ssid in self.deleted:
-                item.SetFont(self.struckFont)
-
-            #             if strength < 0:
-            #                 item.SetTextColour(self.notFoundColor)
-
-            self.list.SetItem(item)
             self.listToolTips.append(self.makeToolTip(ap))
 
-        # If the selected index is greater than the number of options, reset it to -1.
-        # (This is used to avoid several bugs)
-        # if self.selected > len(self.info) - 1:
+        self.listSsids = [ap['SSID'] for ap in self.info]
 
-        # This is always done now to avoid default selections being set as the Wi-Fi.
-        self.selected = -1
+        # The selection is only kept if the selected row was updated in
+        # place. Nothing is selected by default, to avoid default selections
+        # being set as the Wi-Fi.
+        row = self.list.GetFirstSelected()
+        if row != -1:
+            self.selected = self.list.GetItemData(row)
+            if keepLast:
+                self.lastSelected = self.selected
 
         # if len(self.info) != 0:
         #     self.list.Select(self.info[self.selected]['idx'])
@@ -564,6 +795,43 @@ class WiFiSelectionTab(Tab):
         self.updateApplyButton()
 
 
+    def setItem(self, idx, n, ap, selected=False):
+        """ Set the contents of one row of the AP list.
+
+            :param idx: The index of the row in the list.
+            :param n: The index of the AP in `info`.
+            :param ap: The AP's dictionary.
+            :param selected: `True` if the row is selected in the list.
+        """
+        ssid = ap['SSID']
+        icon, _strength = self.getIcon(ap)
+
+        self.list.SetItem(idx, 1, self.makeAuthTypeString(ap))
+        self.list.SetItemData(idx, n)
+        item = self.list.GetItem(idx)
+        item.SetImage(icon)
+
+        ap['idx'] = idx
+
+        if ap['Selected']:
+            # Indicate that this is the previously selected AP
+            item.SetText(ssid + " *")
+        else:
+            item.SetText(ssid)
+
+        if selected:
+            item.SetFont(self.boldFont)
+        elif ssid in self.deleted and not ap['Selected']:
+            item.SetFont(self.struckFont)
+        else:
+            item.SetFont(self.listFont)
+
+        #             if strength < 0:
+        #                 item.SetTextColour(self.notFoundColor)
+
+        self.list.SetItem(item)
+
+
     def updateApplyButton(self):
         """ Enable or disable the "Apply" button if any changes have been
             made.
@@ -587,19 +855,32 @@ class WiFiSelectionTab(Tab):
         return enable
 
 
-    def shutdown(self):
-        """ Kill the Wi-Fi scanning and status threads.
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+        """ Stop the Wi-Fi scanning and status threads. Commands in progress
+            are cancelled via their callbacks; this waits (without using CPU)
+            for at most `timeout` seconds for the threads to finish.
+
+            :param timeout: The maximum time (in seconds) to wait.
+            :return: `True` if the threads have stopped.
         """
-        try:
-            logger.debug('Shutting down Wi-Fi scan and status threads')
-            self.scanThread.cancel.set()
-            self.networkStatusThread.cancel.set()
-            while ((self.scanThread and self.scanThread.is_alive()) or
-                   (self.networkStatusThread and self.networkStatusThread.is_alive())):
-                pass
-        except AttributeError:
-            # Can sometimes occur in race conditions during shutdown.
-            pass
+        logger.debug('Shutting down Wi-Fi scan and status threads')
+        threads = [t for t in (self.scanThread, self.networkStatusThread) if t]
+        for t in threads:
+            t.stop()
+
+        deadline = time() + timeout
+        for t in threads:
+            t.join(max(0, deadline - time()))
+
+        if self.networkStatusThread:
+            logger.debug('Network status polling: %r' %
+                         self.networkStatusThread.schedule.stats.asDict())
+
+        stopped = not any(t.is_alive() for t in threads)
+        if not stopped:
+            logger.debug('Wi-Fi threads still running after shutdown; '
+                         'they will exit when their commands finish')
+        return stopped
 
 
     # ===========================================================================
@@ -610,26 +891,33 @@ class WiFiSelectionTab(Tab):
     def OnRescan(self, evt):
         """ Handle "Rescan" button press.
         """
-        self.getInfo()
+        self.getInfo(useCache=False)
 
 
     def OnWiFiScan(self, evt):
         """ Handle the asynchronous Wi-Fi scan finishing.
         """
         self.SetCursor(wx.Cursor(wx.CURSOR_DEFAULT))
+        showingCached, self.showingCached = self.showingCached, False
 
         if evt.error is not None:  # Scan encountered error; show warning.
 
             if isinstance(evt.error, IOError):
                 return
+            elif isinstance(evt.error, DeviceTimeout) and showingCached:
+                # Older results are still shown; not worth interrupting.
+                logger.warning("Timed out when attempting to scan Wi-Fi; "
+                               "showing previous results")
+                err_message = None
             elif isinstance(evt.error, DeviceTimeout):
                 err_message = "Timed out when attempting to scan Wi-Fi."
             else:
                 err_message = ("An unexpected %s occurred when attempting "
                                "to scan for Wi-Fi networks." % type(evt.error).__name__)
 
-            wx.MessageBox(message=err_message, caption="Wi-Fi Scan Error",
-                          style=wx.OK, parent=self)
+            if err_message:
+                wx.MessageBox(message=err_message, caption="Wi-Fi Scan Error",
+                              style=wx.OK, parent=self)
 
         self.list.Enable()
         self.addButton.Enable()
@@ -852,7 +1140,10 @@ class WiFiSelectionTab(Tab):
         try:
             self.SetCursor(wx.Cursor(wx.CURSOR_WAIT))
             self.applyButton.Enable(False)
-            self.device.command.setWifi(data)
+            getBroker(self.device).call(self.device.command.setWifi, data)
+            if self.networkStatusThread:
+                ssid = next((d['SSID'] for d in data if d['Selected']), None)
+                self.networkStatusThread.burst(ssid)
         except IOError:
             logger.warning("An IOError occured while setting the Wi-Fi. "
                            "This is usually because the device was unplugged part of the way through")
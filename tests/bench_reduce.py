@@ -0,0 +1,49 @@
+"""
+Benchmark of the calibration polynomial reduction, comparing the current
+(Taylor shift matrix) implementation against the original loops. Not a
+test; run it directly::
+
+    python tests/bench_reduce.py
+"""
+
+import os.path
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from endaqconfig.polynomials import get_reduced_polynomial_coefficients
+from test_polynomials import reduceByLoops
+
+# Label, coefficients, references
+CASES = (
+    ("Univariate, order 4", [0.1, 1.0, 2.0, 3.0], [1.2]),
+    ("Univariate, order 25", [float(n) for n in range(25)], [1.2]),
+    ("Bivariate, 2x2", [1.0, 2.0, 3.0, 4.0], [0.5, 1.5]),
+    ("Bivariate, 4x4", [float(n) for n in range(16)], [0.5, 1.5]),
+    ("Bivariate, 8x8", [float(n) for n in range(64)], [0.5, 1.5]),
+)
+
+
+def bench(func, coefficients, references, seconds=0.2):
+    """ Time a function, running it for about `seconds`.
+
+        :return: The mean time per call, in microseconds.
+    """
+    func(coefficients, references)
+    timer = timeit.Timer(lambda: func(coefficients, references))
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * seconds / max(elapsed, 1e-9)))
+    return min(timer.repeat(3, number)) / number * 1e6
+
+
+def main():
+    print(f"{'':24} {'loops (us)':>12} {'matrix (us)':>12} {'speedup':>8}")
+    for label, coefficients, references in CASES:
+        old = bench(reduceByLoops, coefficients, references)
+        new = bench(get_reduced_polynomial_coefficients, coefficients, references)
+        print(f"{label:24} {old:12.1f} {new:12.1f} {old / new:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
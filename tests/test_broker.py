@@ -0,0 +1,164 @@
+"""
+Tests for the per-device command brokers.
+"""
+
+from concurrent.futures import CancelledError
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+pytest.importorskip('endaq.device')
+
+from endaq.device import DeviceError
+from endaq.device.response_codes import DeviceStatusCode
+
+from endaqconfig import broker
+from endaqconfig.broker import BACKGROUND, INTERACTIVE, NORMAL, CommandBroker
+
+
+class FakeDevice(object):
+    def __str__(self):
+        return "FakeDevice"
+
+
+@pytest.fixture
+def cb():
+    b = CommandBroker(FakeDevice(), busyDelay=0.01)
+    yield b
+    b.close()
+
+
+def blockWorker(b):
+    """ Occupy a broker's worker until the returned event is set, so other
+        commands queue up behind it.
+    """
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    b.submit(block)
+    assert started.wait(5)
+    return release
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_call(cb):
+    assert cb.call(lambda x, y=0: x + y, 1, y=2) == 3
+
+    with pytest.raises(ZeroDivisionError):
+        cb.call(lambda: 1 / 0)
+
+
+def test_priority(cb):
+    order = []
+    release = blockWorker(cb)
+    futures = [cb.submit(order.append, p, priority=p)
+               for p in (BACKGROUND, NORMAL, INTERACTIVE, NORMAL)]
+    release.set()
+    for f in futures:
+        f.result(5)
+    assert order == [INTERACTIVE, NORMAL, NORMAL, BACKGROUND]
+
+
+def test_coalescing(cb):
+    calls = []
+    release = blockWorker(cb)
+    f1 = cb.submit(calls.append, 1, key='status', priority=BACKGROUND)
+    f2 = cb.submit(calls.append, 2, key='status', priority=INTERACTIVE)
+    assert f1 is f2
+    release.set()
+    f1.result(5)
+    assert calls == [1]
+
+    # Once finished, the key is free again.
+    cb.call(calls.append, 3, key='status')
+    assert calls == [1, 3]
+
+
+def test_busyRetry(cb):
+    attempts = []
+
+    def busy():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise DeviceError(DeviceStatusCode.ERR_BUSY, "Busy")
+        return 'ok'
+
+    assert cb.call(busy) == 'ok'
+    assert len(attempts) == 3
+
+    attempts.clear()
+    cb.retries = 1
+    with pytest.raises(DeviceError):
+        cb.call(busy)
+    assert len(attempts) == 2
+
+
+def test_timeout(cb):
+    release = blockWorker(cb)
+    try:
+        with pytest.raises(TimeoutError):
+            cb.call(lambda: None, timeout=0.1)
+    finally:
+        release.set()
+
+
+def test_cancel(cb):
+    release = blockWorker(cb)
+    cancelled = threading.Event()
+    threading.Timer(0.1, cancelled.set).start()
+    ran = []
+
+    t0 = monotonic()
+    try:
+        with pytest.raises(CancelledError):
+            cb.call(ran.append, 1, cancel=cancelled.is_set)
+    finally:
+        release.set()
+    assert monotonic() - t0 < 1
+
+    # The cancelled command was removed from the queue.
+    cb.call(lambda: None)
+    assert ran == []
+
+
+def test_close(cb):
+    release = blockWorker(cb)
+    queued = cb.submit(lambda: None)
+    cb.close()
+    release.set()
+
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        cb.submit(lambda: None)
+
+
+def test_idleWorkerStops():
+    b = CommandBroker(FakeDevice(), idleTimeout=0.05)
+    b.call(lambda: None)
+    t0 = monotonic()
+    while b.thread is not None and monotonic() - t0 < 2:
+        sleep(0.01)
+    assert b.thread is None
+
+    # Restarted by the next command
+    assert b.call(lambda: 'again') == 'again'
+    b.close()
+
+
+def test_getBroker():
+    dev = FakeDevice()
+    b = broker.getBroker(dev)
+    assert broker.getBroker(dev) is b
+
+    broker.closeBroker(dev)
+    assert b.closed
+    assert broker.getBroker(dev) is not b
+    broker.closeBroker(dev)
@@ -0,0 +1,99 @@
+"""
+Tests for setting the clocks of many recorders at once, using simulated
+recorders with a fixed command latency.
+"""
+
+from time import sleep, time
+
+import pytest
+
+pytest.importorskip('endaq.device')
+
+from endaqconfig import clocksync
+
+
+class FakeRecorder(object):
+    """ A recorder with a clock and a fixed one-way command latency.
+    """
+
+    def __init__(self, name, latency=0.025, offset=0.0):
+        self.name = name
+        self.latency = latency
+        self.offset = offset  # Device clock minus host clock
+        self.sets = 0
+
+
+    def __repr__(self):
+        return f"<FakeRecorder {self.name}>"
+
+
+    def getTime(self, timeout=None):
+        sleep(self.latency)
+        now = time()
+        sleep(self.latency)
+        return now, int(now + self.offset)
+
+
+    def setTime(self, t, timeout=None):
+        sleep(self.latency)
+        self.offset = t - time()
+        self.sets += 1
+        sleep(self.latency)
+
+
+def test_batchesSetOnTime():
+    """ Devices beyond the first batch of workers must not be set late.
+    """
+    devices = [FakeRecorder(n) for n in range(6)]
+    result = clocksync.syncClocks(devices, workers=2)
+
+    assert not result['failed']
+    for dev in devices:
+        assert dev.sets == 1
+        assert abs(dev.offset) < 0.02, f"{dev} off by {dev.offset:.3f} s"
+    assert result['skew'] < 0.1
+
+
+def test_threshold():
+    """ Only clocks off by more than the threshold are set.
+    """
+    good = FakeRecorder('good')
+    bad = FakeRecorder('bad', offset=5.0)
+    result = clocksync.syncClocks([good, bad], threshold=1.0)
+
+    assert good.sets == 0
+    assert bad.sets == 1
+    assert abs(bad.offset) < 0.02
+    assert result['results'][bad].set
+    assert not result['results'][good].set
+
+
+def test_failure():
+    """ Devices that can't be set are reported as failed, after retrying.
+    """
+    class BrokenRecorder(FakeRecorder):
+        def setTime(self, t, timeout=None):
+            self.sets += 1
+            raise IOError("Disconnected")
+
+    good = FakeRecorder('good')
+    broken = BrokenRecorder('broken', offset=5.0)
+    result = clocksync.syncClocks([good, broken], retries=1)
+
+    assert [r.device for r in result['failed']] == [broken]
+    assert broken.sets == 2
+    assert result['results'][good].set
+
+
+def test_skewBound():
+    a = clocksync.ClockResult('a')
+    b = clocksync.ClockResult('b')
+    c = clocksync.ClockResult('c')
+    a.set = b.set = True
+    a.sent, a.duration = -0.01, 0.02
+    b.sent, b.duration = 0.005, 0.01
+
+    assert clocksync.skewBound([c]) is None
+    assert clocksync.skewBound([a, b, c]) == pytest.approx(0.025)
+    assert a.bound == pytest.approx(0.01)
+    assert c.bound is None
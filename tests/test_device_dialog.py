@@ -0,0 +1,100 @@
+"""
+Tests for the non-GUI parts of the device selection dialog: the device
+scanning thread's scheduling and the status cache.
+"""
+
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip('wx')
+pytest.importorskip('endaq.device')
+
+from endaqconfig.hotplug import PollingMonitor
+from endaqconfig.widgets import device_dialog
+
+
+class ImmediatePool(object):
+    """ An 'executor' that runs each function as soon as it is submitted,
+        before `submit()` returns.
+    """
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        future.set_result(func(*args, **kwargs))
+        return future
+
+
+class QuickScanThread(device_dialog.DeviceScanThread):
+    """ A scanning thread whose status requests return immediately.
+    """
+
+    def __init__(self):
+        super().__init__(None, monitor=PollingMonitor(), maxRate=None)
+        self.calls = []
+
+
+    def pollDevice(self, dev, deadline):
+        self.calls.append(dev)
+        self.pending.pop(dev, None)
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_pollDueFastRequest():
+    """ A request that finishes before `submit()` returns doesn't leave the
+        device marked as pending.
+    """
+    thread = QuickScanThread()
+    thread.polled = ['dev']
+    pool = ImmediatePool()
+
+    thread.pollDue(pool)
+    assert thread.pending == {}
+
+    thread.pollDue(pool)
+    assert thread.calls == ['dev', 'dev']
+
+
+def test_pollDueSkipsPending():
+    thread = QuickScanThread()
+    thread.polled = ['dev']
+    thread.pending['dev'] = 0
+
+    assert thread.pollDue(ImmediatePool()) == []
+    assert thread.calls == []
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_statusCacheReplaceAll():
+    cache = device_dialog.StatusCache()
+    cache.replaceAll({'a': (None, (1, 'a')), 'b': (None, (2, 'b'))}, generation=1)
+    cache.setStatus('c', (None, (3, 'c')))
+    assert len(cache) == 3
+
+    # Devices not in the scan are removed.
+    cache.replaceAll({'a': (None, (4, 'a'))}, generation=2)
+    assert 'b' not in cache and 'c' not in cache
+    assert cache['a'] == (None, (4, 'a'))
+    assert cache.get('b') is None
+    assert cache.isCurrent('a')
+
+    # An older scan doesn't turn back the generation.
+    cache.replaceAll({'a': (None, (5, 'a'))}, generation=1)
+    assert cache.generation == 2
+
+
+def test_statusCacheSetStatus():
+    cache = device_dialog.StatusCache()
+    cache.replaceAll({'a': (None, (1, 'a'))}, generation=3)
+    cache.setStatus('b', (None, (2, 'b')), generation=2)
+    assert not cache.isCurrent('b')
+
+    assert cache.getCommandStatus('b') == (2, 'b')
+    assert cache.getCommandStatus('c') == (None, None)
+    assert cache.reads == 1
@@ -0,0 +1,230 @@
+"""
+Tests for field expressions and value conversion. Gain/offset conversions
+are checked against the expressions previously generated for them,
+``(x+offset)*gain`` and ``(x/gain)-offset``.
+"""
+
+import pytest
+
+from endaqconfig import expressions
+from endaqconfig.expressions import (ConfigContainer, DisplayContainer,
+                                     LinearTransform, convertConfigValues,
+                                     getLinearTransform)
+
+
+# ===============================================================================
+# The original expressions, used as the reference
+# ===============================================================================
+
+def oldToDisplay(x, gain, offset):
+    return eval("(x+%.8f)*%.8f" % (offset, gain), {'x': x})
+
+
+def oldToConfig(x, gain, offset):
+    return eval("(x/%.8f)-%.8f" % (gain, offset), {'x': x})
+
+
+# Gains and offsets with no more than 8 decimal places, so the old
+# expressions didn't round them.
+GAIN_OFFSETS = [(1.0, 0.0), (0.5, -10.0), (-2.0, 3.0), (100.0, 0.25),
+                (-0.001, -273.15), (0.00390625, 0.0), (-1.0, 0.0)]
+
+VALUES = [0, 1, -1, 7, -32768, 65535, 0.0, 2.5, -0.125, 1234.5678, 1e-6]
+
+
+# ===============================================================================
+# Fields, with only what the containers and conversion need
+# ===============================================================================
+
+class FakeRoot(object):
+    def __init__(self):
+        self.configItems = {}
+        self.displayValues = DisplayContainer(self)
+        self.configValues = ConfigContainer(self)
+
+
+class FakeField(object):
+    """ A float field, converting its value with its transform (if any).
+    """
+    cast = float
+
+    def __init__(self, root, configId, value, gain=None, offset=None):
+        self.root = root
+        self.configId = configId
+        self.value = value
+        self.gain = gain
+        self.offset = offset
+        if gain is None and offset is None:
+            self.transform = None
+        else:
+            self.transform = getLinearTransform(1.0 if gain is None else gain,
+                                                0.0 if offset is None else offset)
+        root.configItems[configId] = self
+
+
+    def getDisplayValue(self):
+        return self.value
+
+
+    def castConfigValue(self, val):
+        return self.cast(val)
+
+
+    def getConfigValue(self):
+        if self.value is None:
+            return None
+        if self.transform is None:
+            return self.castConfigValue(self.value)
+        try:
+            return self.castConfigValue(self.transform.toConfig(self.value))
+        except (KeyError, ValueError, TypeError):
+            return None
+
+
+    def oldConfigValue(self):
+        """ The config value, as previously computed. """
+        gain = 1.0 if self.gain is None else self.gain
+        offset = 0.0 if self.offset is None else self.offset
+        return self.cast(oldToConfig(self.value, gain, offset))
+
+
+class FakeIntField(FakeField):
+    cast = int
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+@pytest.mark.parametrize('gain, offset', GAIN_OFFSETS)
+@pytest.mark.parametrize('x', VALUES)
+def test_matchesOldExpressions(gain, offset, x):
+    t = LinearTransform(gain, offset)
+    assert t.toDisplay(x) == oldToDisplay(x, gain, offset)
+    assert t.toConfig(x) == oldToConfig(x, gain, offset)
+
+
+@pytest.mark.parametrize('gain, offset', GAIN_OFFSETS)
+def test_batchMatchesOldExpressions(gain, offset):
+    transforms = [LinearTransform(gain, offset)] * len(VALUES)
+    assert (LinearTransform.batchToDisplay(transforms, VALUES)
+            == [oldToDisplay(x, gain, offset) for x in VALUES])
+    assert (LinearTransform.batchToConfig(transforms, VALUES)
+            == [oldToConfig(x, gain, offset) for x in VALUES])
+
+
+def test_batchMixed():
+    """ Each value is converted with its own transform.
+    """
+    transforms = [LinearTransform(g, o) for g, o in GAIN_OFFSETS]
+    values = VALUES[:len(transforms)]
+
+    assert (LinearTransform.batchToDisplay(transforms, values)
+            == [oldToDisplay(x, g, o) for x, (g, o) in zip(values, GAIN_OFFSETS)])
+    assert (LinearTransform.batchToConfig(transforms, values)
+            == [oldToConfig(x, g, o) for x, (g, o) in zip(values, GAIN_OFFSETS)])
+
+    with pytest.raises((TypeError, ValueError)):
+        LinearTransform.batchToConfig(transforms[:2], [1.0, "bad"])
+
+
+def test_unroundedGain():
+    """ Gains with more than 8 decimal places were rounded by the old
+        expressions; the transform uses them exactly.
+    """
+    t = LinearTransform(1 / 3, 0.1)
+    assert t.toConfig(5.0) == pytest.approx(oldToConfig(5.0, 1 / 3, 0.1), rel=1e-7)
+    assert t.toDisplay(t.toConfig(5.0)) == pytest.approx(5.0, rel=1e-15)
+
+
+def test_zeroGain():
+    """ Zero gain fails the same way as the old expressions, individually or
+        in a batch.
+    """
+    t = LinearTransform(0, 1.0)
+    assert t.toDisplay(5) == oldToDisplay(5, 0, 1.0)
+
+    with pytest.raises(ZeroDivisionError):
+        oldToConfig(5, 0, 1.0)
+    with pytest.raises(ZeroDivisionError):
+        t.toConfig(5)
+    with pytest.raises(ZeroDivisionError):
+        LinearTransform.batchToConfig([LinearTransform(2.0, 0), t], [1.0, 5])
+
+
+def test_sharedAndImmutable():
+    assert getLinearTransform(2.0, 1.0) is getLinearTransform(2.0, 1.0)
+    assert LinearTransform(2, 1) == LinearTransform(2.0, 1.0)
+    assert 'gainOffset' in expressions.getExpressionCacheInfo()
+
+    with pytest.raises(AttributeError):
+        getLinearTransform(2.0, 1.0).gain = 3
+
+
+def test_compileExpression():
+    """ Compiled expressions are shared, and named for their text only.
+    """
+    code = expressions.compileExpression("x * 2")
+    assert expressions.compileExpression("x * 2") is code
+    assert code.co_filename == "<expression 'x * 2'>"
+    assert eval(code, {'x': 3}) == 6
+
+    with pytest.raises(SyntaxError):
+        expressions.compileExpression("x *")
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_convertConfigValues():
+    """ The batch conversion of int and float fields matches the old
+        expressions, and skips fields without values.
+    """
+    root = FakeRoot()
+    items = []
+    for n, (gain, offset) in enumerate(GAIN_OFFSETS):
+        items.append(FakeField(root, 0x100 + n, VALUES[n + 3], gain, offset))
+        items.append(FakeIntField(root, 0x200 + n, VALUES[n], gain, offset))
+    empty = FakeField(root, 0x300, None, 2.0, 0)
+
+    result = convertConfigValues(items + [empty])
+
+    assert result.pop(empty.configId) is None
+    assert result == {item.configId: item.oldConfigValue() for item in items}
+    for item in items:
+        assert type(result[item.configId]) is item.cast
+
+
+def test_convertConfigValuesZeroGain():
+    root = FakeRoot()
+    items = [FakeField(root, 0x100, 5.0, 2.0, 0), FakeField(root, 0x101, 5.0, 0, 0)]
+    with pytest.raises(ZeroDivisionError):
+        convertConfigValues(items)
+
+
+def test_configContainer():
+    """ Fields with and without transforms are all included, in order.
+    """
+    root = FakeRoot()
+    plain = FakeIntField(root, 0x10, 42)
+    scaled = FakeField(root, 0x20, 10.0, -2.0, 3.0)
+    empty = FakeField(root, 0x30, None)
+
+    with root.displayValues.snapshot():
+        data = root.configValues.toDict()
+
+    assert data == {0x10: 42, 0x20: scaled.oldConfigValue()}
+    assert list(data) == [plain.configId, scaled.configId]
+    assert empty.configId not in data
+
+
+def test_displayContainerSnapshot():
+    root = FakeRoot()
+    FakeField(root, 0x10, 1.0)
+    values = root.displayValues
+
+    with values.snapshot():
+        assert values[0x10] == values[0x10] == 1.0
+    assert values.saved == 1
+    assert values.get(0x99, 'missing') == 'missing'
@@ -0,0 +1,105 @@
+"""
+Tests for starting many recorders at once, using simulated recorders with a
+fixed command latency.
+"""
+
+from time import sleep, time
+
+import pytest
+
+pytest.importorskip('endaq.device')
+
+from endaq.device import UnsupportedFeature
+
+from endaqconfig import fleetstart
+
+
+class FakeCommand(object):
+    def __init__(self, device):
+        self.device = device
+
+
+    def ping(self, timeout=None, callback=None):
+        if not self.device.canPing:
+            raise UnsupportedFeature("No ping")
+        sleep(self.device.latency * 2)
+
+
+    def startRecording(self, wait=False, callback=None):
+        sleep(self.device.latency)
+        self.device.startedAt = time()
+        sleep(self.device.latency)
+        return True
+
+
+    def awaitReboot(self, timeout=None, callback=None):
+        return True
+
+
+class FakeRecorder(object):
+    def __init__(self, name, latency=0.02, canRecord=True, canPing=True):
+        self.name = name
+        self.latency = latency
+        self.canRecord = canRecord
+        self.canPing = canPing
+        self.isRemote = False
+        self.startedAt = None
+        self.command = FakeCommand(self)
+
+
+    def __repr__(self):
+        return f"<FakeRecorder {self.name}>"
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_startAll():
+    devices = [FakeRecorder(n, latency=0.01 * (n % 4)) for n in range(12)]
+    noRecord = FakeRecorder('no', canRecord=False)
+    result = fleetstart.startAll(devices + [noRecord])
+
+    assert not result['failed']
+    assert not result['cancelled']
+    assert noRecord not in result['results']
+
+    # Commands arrive together, regardless of latency.
+    arrivals = [d.startedAt for d in devices]
+    assert max(arrivals) - min(arrivals) < 0.02
+    assert result['spread'] < 0.1
+    assert all(r.confirmed for r in result['results'].values())
+
+
+def test_noPing():
+    """ Devices without a connection to ping are started without latency
+        compensation.
+    """
+    dev = FakeRecorder('file', canPing=False)
+    result = fleetstart.startAll([dev])
+    assert result['results'][dev].rtt is None
+    assert result['results'][dev].started
+
+
+def test_failure():
+    class BrokenCommand(FakeCommand):
+        def startRecording(self, wait=False, callback=None):
+            raise IOError("Disconnected")
+
+    good = FakeRecorder('good')
+    broken = FakeRecorder('broken')
+    broken.command = BrokenCommand(broken)
+    result = fleetstart.startAll([good, broken])
+
+    assert [r.device for r in result['failed']] == [broken]
+    assert good.startedAt is not None
+
+
+def test_cancel():
+    devices = [FakeRecorder(n) for n in range(3)]
+    result = fleetstart.startAll(devices, callback=lambda: True)
+
+    assert result['cancelled']
+    assert all(d.startedAt is None for d in devices)
+    assert len(result['failed']) == 3
+    assert result['spread'] is None
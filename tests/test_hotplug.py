@@ -0,0 +1,127 @@
+"""
+Tests for the device change monitors. The `InotifyMonitor` tests watch a
+temporary directory instead of ``/dev``.
+"""
+
+import os
+import sys
+import threading
+from time import monotonic
+
+import pytest
+
+pytest.importorskip('endaq.device')
+
+from endaqconfig import hotplug
+
+linuxOnly = pytest.mark.skipif(not sys.platform.startswith('linux'),
+                               reason="inotify is Linux-only")
+
+
+def openFds():
+    """ Get the process' open file descriptors (Linux only). """
+    return set(os.listdir('/proc/self/fd'))
+
+
+@pytest.fixture
+def monitor(tmp_path):
+    mon = hotplug.InotifyMonitor(paths=[str(tmp_path)], patterns=['ttyACM*'],
+                                 mountPaths=[], mounts=False)
+    yield mon
+    mon.close()
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+@linuxOnly
+def test_inotifyCreateRemove(monitor, tmp_path):
+    dev = tmp_path / 'ttyACM0'
+    dev.touch()
+    assert monitor.wait(1) is True
+
+    dev.unlink()
+    assert monitor.wait(1) is True
+
+    # All events were consumed.
+    assert monitor.wait(0.05) is False
+
+
+@linuxOnly
+def test_inotifyIgnoresOtherNames(monitor, tmp_path):
+    (tmp_path / 'foo').touch()
+
+    t0 = monotonic()
+    assert monitor.wait(0.2) is False
+    assert monotonic() - t0 >= 0.15
+
+
+@linuxOnly
+def test_inotifyUnfilteredMountPath(tmp_path):
+    """ Any change in a mount path is reported.
+    """
+    mon = hotplug.InotifyMonitor(paths=[], mountPaths=[str(tmp_path)], mounts=False)
+    try:
+        (tmp_path / 'foo').mkdir()
+        assert mon.wait(1) is True
+    finally:
+        mon.close()
+
+
+@linuxOnly
+def test_inotifyNotify(monitor):
+    """ `notify()` from another thread ends a `wait()` promptly.
+    """
+    timer = threading.Timer(0.1, monitor.notify)
+    timer.start()
+    t0 = monotonic()
+    try:
+        assert monitor.wait(5) is False
+    finally:
+        timer.cancel()
+    assert monotonic() - t0 < 1
+
+
+@linuxOnly
+def test_inotifyClose(tmp_path):
+    before = openFds()
+    mon = hotplug.InotifyMonitor(paths=[str(tmp_path)], mountPaths=[], mounts=True)
+    assert len(openFds() - before) >= 3  # inotify, pipe (x2), mounts
+
+    mon.close()
+    assert openFds() == before
+    assert mon.wait(0.01) is False
+
+    # Safe after closing, even if the descriptors have been reused.
+    pipes = []
+    try:
+        while not any(mon._pipe[1] in p for p in pipes):
+            pipes.append(os.pipe())
+        mon.notify()
+        mon.close()
+        for r, _w in pipes:
+            os.set_blocking(r, False)
+            with pytest.raises(BlockingIOError):
+                os.read(r, 1)
+    finally:
+        for p in pipes:
+            os.close(p[0])
+            os.close(p[1])
+
+
+def test_pollingNotify():
+    """ `notify()` from another thread ends a `wait()` promptly.
+    """
+    mon = hotplug.PollingMonitor(interval=0.05)
+    timer = threading.Timer(0.1, mon.notify)
+    timer.start()
+    t0 = monotonic()
+    try:
+        # The first check may report a change (nothing to compare with).
+        while mon.wait(5):
+            pass
+    finally:
+        timer.cancel()
+        mon.close()
+    assert monotonic() - t0 < 1
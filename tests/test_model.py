@@ -0,0 +1,222 @@
+"""
+Tests for the headless configuration model, built from a small ``CONFIG.UI``
+made of simulated EBML elements.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('endaq.device')
+
+from endaqconfig import fields
+from endaqconfig.model import ConfigModel
+
+# Config IDs of the fixture's items
+INT_ID = 0x10ff7f
+FLOAT_ID = 0x11ff7f
+UINT_ID = 0x12ff7f
+CHECK_ID = 0x13ff7f
+ENUM_ID = 0x14ff7f
+BITS_ID = 0x15ff7f
+TEXT_ID = 0x16ff7f
+GROUP_ID = 0x17ff7f
+CHILD_ID = 0x18ff7f
+
+
+# ===============================================================================
+# Simulated EBML
+# ===============================================================================
+
+class Element(object):
+    """ A minimal EBML element. Like `ebmlite`'s, each element name has its
+        own class, with the name as a class attribute.
+    """
+    name = None
+    id = 0
+    _classes = {}
+
+
+    def __init__(self, value):
+        self.value = value
+
+
+    def __iter__(self):
+        return iter(self.value)
+
+
+    def __getitem__(self, idx):
+        return self.value[idx]
+
+
+def el(name, *children, **kwargs):
+    """ Create an element. Master elements are given their children as
+        positional arguments, other elements their value as a keyword.
+    """
+    if name not in Element._classes:
+        Element._classes[name] = type(name, (Element,), {'name': name})
+    return Element._classes[name](kwargs.get('value', list(children)))
+
+
+def makeHints():
+    """ Create a ``CONFIG.UI`` document with one tab of assorted fields.
+    """
+    return el('Document', el('ConfigUI',
+        el('Tab',
+            el('Label', value="General"),
+            el('IntField',
+                el('Label', value="Int"),
+                el('ConfigID', value=INT_ID),
+                el('IntMin', value=-5),
+                el('IntMax', value=5)),
+            el('FloatField',
+                el('Label', value="Float"),
+                el('ConfigID', value=FLOAT_ID),
+                el('FloatMin', value=0.0),
+                el('FloatMax', value=10.0),
+                el('FloatGain', value=0.5),
+                el('FloatValue', value=2.0)),
+            el('UIntField',
+                el('Label', value="UInt"),
+                el('ConfigID', value=UINT_ID)),
+            el('CheckUIntField',
+                el('Label', value="Check UInt"),
+                el('ConfigID', value=CHECK_ID),
+                el('UIntValue', value=3)),
+            el('EnumField',
+                el('Label', value="Enum"),
+                el('ConfigID', value=ENUM_ID),
+                el('EnumOption', el('Label', value="A")),
+                el('EnumOption', el('Label', value="B"))),
+            el('BitField',
+                el('Label', value="Bits"),
+                el('ConfigID', value=BITS_ID),
+                el('UIntValue', value=0b101),
+                el('EnumOption', el('Label', value="Bit 0")),
+                el('EnumOption',
+                    el('Label', value="Bit 1"),
+                    el('DisableIf', value="Config[0x%x] == 1" % ENUM_ID)),
+                el('EnumOption', el('Label', value="Bit 2"))),
+            el('TextField',
+                el('Label', value="Text"),
+                el('ConfigID', value=TEXT_ID),
+                el('DisableIf', value="Config[0x%x] < 0" % INT_ID)),
+            el('CheckGroup',
+                el('Label', value="Group"),
+                el('ConfigID', value=GROUP_ID),
+                el('UIntField',
+                    el('Label', value="Child"),
+                    el('ConfigID', value=CHILD_ID),
+                    el('UIntValue', value=7)))),
+        el('PostConfigMessage', value="Restart")))
+
+
+@pytest.fixture
+def model():
+    return ConfigModel(makeHints())
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_noWx():
+    """ The model (and provisioning, which uses it) doesn't need wxPython.
+    """
+    code = ("import sys; sys.modules['wx'] = None; "
+            "import endaqconfig.model, endaqconfig.provision")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+
+
+def test_build(model):
+    assert model.postConfigMessage == "Restart"
+    assert len(model.tabs) == 1
+    assert set(model.configItems) == {INT_ID, FLOAT_ID, UINT_ID, CHECK_ID,
+                                      ENUM_ID, BITS_ID, TEXT_ID, GROUP_ID,
+                                      CHILD_ID}
+
+    # Model items are derived from the field definitions.
+    item = model.configItems[CHECK_ID]
+    assert isinstance(item, fields.CheckUIntField)
+    assert item.hasCheckbox
+    assert item.valueType == "UIntValue"
+    assert model.configItems[CHILD_ID].group is model.configItems[GROUP_ID]
+
+
+def test_defaults(model):
+    data = model.getConfigData()
+    assert data[INT_ID] == 0
+    assert data[FLOAT_ID] == 2.0
+    assert data[BITS_ID] == 0b101
+    assert data[ENUM_ID] == 0
+
+    # Unchecked items (and the children of unchecked groups) have no value.
+    assert CHECK_ID not in data
+    assert GROUP_ID not in data
+    assert CHILD_ID not in data
+
+
+def test_roundTrip(model):
+    data = {INT_ID: 3,
+            FLOAT_ID: 8,
+            UINT_ID: 1234,
+            CHECK_ID: 12,
+            ENUM_ID: 1,
+            BITS_ID: 0b001,
+            TEXT_ID: "Hello",
+            GROUP_ID: 1,
+            CHILD_ID: 9}
+    model.applyConfigData(data)
+    assert model.getConfigData() == data
+
+    # Gain applied to the displayed value
+    assert model.configItems[FLOAT_ID].value == 4.0
+
+
+def test_clamping(model):
+    model.applyConfigData({INT_ID: 99, FLOAT_ID: 100, UINT_ID: 2 ** 40})
+    data = model.getConfigData()
+    assert data[INT_ID] == 5
+    assert data[FLOAT_ID] == 20  # 10.0, the maximum displayed value
+    assert data[UINT_ID] == fields.IntField.MAX_SIGNED_INT
+
+    model.applyConfigData({INT_ID: -99, FLOAT_ID: -8, UINT_ID: -1})
+    data = model.getConfigData()
+    assert data[INT_ID] == -5
+    assert data[FLOAT_ID] == 0
+    assert data[UINT_ID] == 0
+
+
+def test_bitFieldDisabledBit(model):
+    """ Bits of disabled options revert to their defaults.
+    """
+    model.applyConfigData({ENUM_ID: 0, BITS_ID: 0b111})
+    assert model.getConfigData()[BITS_ID] == 0b111
+
+    model.applyConfigData({ENUM_ID: 1, BITS_ID: 0b111})
+    assert model.getConfigData()[BITS_ID] == 0b101
+
+
+def test_updateDisabledItems(model):
+    enum = model.configItems[ENUM_ID]
+    bits = model.configItems[BITS_ID]
+    text = model.configItems[TEXT_ID]
+
+    model.applyConfigData({BITS_ID: 0b010, TEXT_ID: "Hello"})
+    assert model.getConfigData()[BITS_ID] == 0b010
+
+    # Only the item that changed and its dependents are updated.
+    enum.setDisplayValue(1)
+    model.updateDisabledItems(enum)
+    assert bits.getDisplayValue() == 0b000
+
+    model.configItems[INT_ID].setDisplayValue(-1)
+    model.updateDisabledItems(model.configItems[INT_ID])
+    assert text.isDisabled()
+    assert TEXT_ID not in model.getConfigData()
+
+    model.updateDisabledItems()
+    assert model.getConfigData()[BITS_ID] == 0b000
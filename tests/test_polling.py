@@ -0,0 +1,143 @@
+"""
+Tests for the polling schedules and rate limit.
+"""
+
+from time import monotonic, sleep
+
+import pytest
+
+from endaqconfig.polling import (AdaptiveInterval, PollScheduler, PollStats,
+                                 RateBudget, StatePollSchedule)
+
+
+def test_adaptiveInterval():
+    interval = AdaptiveInterval(0.5, 3, 2)
+    assert [interval.update(False) for _ in range(4)] == [1, 2, 3, 3]
+    assert interval.update(True) == 0.5
+
+    # Maximum is never less than the minimum
+    assert AdaptiveInterval(5, 1).backoff() == 5
+
+
+def test_rateBudget():
+    budget = RateBudget(rate=10, burst=3)
+    assert [budget.acquire() for _ in range(4)] == [True, True, True, False]
+    assert budget.denied == 1
+
+    sleep(0.15)
+    assert budget.acquire()
+
+    unlimited = RateBudget(rate=0)
+    assert all(unlimited.acquire() for _ in range(100))
+
+
+def test_pollStats():
+    stats = PollStats()
+    assert stats.meanTime is None
+
+    stats.record(1.0, True, 0.2)
+    stats.record(2.0, False, 0.4)
+    stats.record(3.0, False, 5.0, timeout=True)
+    stats.record(4.0, False, error=IOError())
+
+    assert (stats.polls, stats.changes, stats.timeouts, stats.errors) == (2, 1, 1, 1)
+    assert stats.meanTime == pytest.approx(0.3)
+    assert stats.maxTime == 0.4
+    assert stats.lastChange == 1.0
+    assert stats.lastPoll == 4.0
+    assert stats.asDict()['meanTime'] == stats.meanTime
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_schedulerIntervals():
+    sched = PollScheduler(minInterval=1, maxInterval=4)
+    assert sched.isDue('a')
+    assert sched.update('a', changed=False) == 2
+    assert not sched.isDue('a')
+    assert sched.timeUntilDue() == pytest.approx(2, abs=0.1)
+
+    assert sched.update('a', changed=False) == 4
+    assert sched.update('a', changed=True) == 1
+
+    sched.wake('a')
+    assert sched.isDue('a')
+    assert sched.timeUntilDue(['a']) == 0
+
+
+def test_schedulerBudget():
+    sched = PollScheduler(budget=RateBudget(rate=1, burst=2))
+    assert [sched.isDue(k) for k in 'abc'] == [True, True, False]
+
+
+def test_schedulerRetain():
+    sched = PollScheduler()
+    for k in 'abc':
+        sched.update(k, changed=True, duration=0.1)
+
+    sched.retain(['a', 'c'])
+    assert set(sched.getStats()) == {'a', 'c'}
+    sched.forget('a')
+    assert set(sched.getStats()) == {'c'}
+    assert sched.getStats()['c'].polls == 1
+    assert sched.timeUntilDue([]) is None
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_stateScheduleBacksOff():
+    sched = StatePollSchedule(interval=1, maxInterval=4, stableTime=0)
+    assert sched.update('connected') == 2
+    assert sched.update('connected') == 4
+    assert sched.update('connected') == 4
+    assert sched.update('disconnected') == 4  # New state is stable, too
+
+
+def test_stateScheduleUnstable():
+    sched = StatePollSchedule(interval=1, maxInterval=4, stableTime=0,
+                              isStable=lambda s: s == 'connected')
+    assert sched.update('connecting') == 1
+    assert sched.update('connecting') == 1
+    assert sched.update('connected') == 2
+
+
+def test_stateScheduleFailures():
+    """ Timeouts keep the current interval, errors back off. Neither changes
+        the state.
+    """
+    sched = StatePollSchedule(interval=1, maxInterval=8, stableTime=0)
+    sched.update('connected')
+    assert sched.update(None, timeout=True) == 2
+    assert sched.update(None, error=IOError()) == 4
+    assert sched.state == 'connected'
+    assert (sched.stats.timeouts, sched.stats.errors) == (1, 1)
+
+
+def test_stateScheduleBurst():
+    sched = StatePollSchedule(interval=4, stableTime=30, burstInterval=0.5)
+    sched.update('old')
+
+    assert sched.burst(settled=lambda s: s == 'new') == 0.5
+    assert sched.bursting
+    assert sched.update('old') == 0.5
+    assert sched.update(None, timeout=True) == 0.5
+
+    # Settled: back to the normal interval.
+    assert sched.update('new') == 4
+    assert not sched.bursting
+
+
+def test_stateScheduleBurstExpires():
+    sched = StatePollSchedule(interval=4, burstInterval=0.5)
+    sched.burst(settled=lambda s: False, duration=0.05)
+    assert sched.update('x') == 0.5
+
+    t0 = monotonic()
+    while monotonic() - t0 < 0.06:
+        sleep(0.01)
+    assert sched.update('x') == 4
+    assert not sched.bursting
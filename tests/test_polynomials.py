@@ -0,0 +1,136 @@
+"""
+Tests for the calibration polynomial math. The reduction is checked against
+the original (loop-based) implementation, kept here as the reference.
+"""
+
+from math import factorial
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from endaqconfig import polynomials
+
+
+# ===============================================================================
+# The original implementation, used as the reference
+# ===============================================================================
+
+def n_choose_k(n, k):
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+def reduceByLoops(coefficients, references):
+    if len(references) == 1:
+        out = np.zeros(len(coefficients))
+        for j in range(len(coefficients)):
+            for k in range(j, len(coefficients)):
+                offset_power = (-references[0]) ** (k - j) if references[0] != 0 or k != j else 1
+
+                out[j] += coefficients[k] * offset_power * n_choose_k(k, j)
+    else:
+        coeff_length = int(np.sqrt(len(coefficients)))
+        out = np.zeros((coeff_length, coeff_length))
+        coefficients = np.array(coefficients).reshape(coeff_length, coeff_length)[::-1, ::-1].T
+
+        for j in range(coeff_length):
+            for k in range(coeff_length):
+                for m in range(j, coeff_length):
+                    for n in range(k, coeff_length):
+                        offset_power1 = (-references[0]) ** (n - k) if references[0] != 0 or n != k else 1
+                        offset_power2 = (-references[1]) ** (m - j) if references[1] != 0 or m != j else 1
+
+                        out[j, k] += coefficients[m, n] * n_choose_k(n, k) * n_choose_k(m, j) * offset_power1 * offset_power2
+
+        out = out[::-1, ::-1].T
+    return out
+
+
+def assertClose(result, expected):
+    """ Compare with a tolerance relative to the largest expected value;
+        individual terms of the sums can cancel out.
+    """
+    expected = np.asarray(expected)
+    scale = max(1.0, float(np.max(np.abs(expected))))
+    np.testing.assert_allclose(result, expected, rtol=1e-12, atol=1e-12 * scale)
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+REFERENCES = (0.0, 1.0, -2.5, 0.3, 7.0)
+
+
+@pytest.mark.parametrize('order', list(range(1, 26)))
+@pytest.mark.parametrize('ref', REFERENCES)
+def test_univariateMatchesLoops(order, ref):
+    rng = np.random.default_rng(order)
+    coeffs = rng.uniform(-10, 10, order)
+    result = polynomials.get_reduced_polynomial_coefficients(coeffs, [ref])
+
+    assert result.shape == (order,)
+    assertClose(result, reduceByLoops(coeffs, [ref]))
+
+
+@pytest.mark.parametrize('size', list(range(1, 26)))
+@pytest.mark.parametrize('refs', [(0.0, 0.0), (1.5, -0.75), (-3.0, 2.0)])
+def test_bivariateMatchesLoops(size, refs):
+    rng = np.random.default_rng(size)
+    coeffs = rng.uniform(-10, 10, size * size)
+    result = polynomials.get_reduced_polynomial_coefficients(coeffs, refs)
+
+    assert result.shape == (size, size)
+    assertClose(result, reduceByLoops(coeffs, refs))
+
+
+def test_integerInputs():
+    """ Lists of integers (as from the calibration editor) work.
+    """
+    assertClose(polynomials.get_reduced_polynomial_coefficients([1, 2, 3], [2]),
+                reduceByLoops([1, 2, 3], [2]))
+    assertClose(polynomials.get_reduced_polynomial_coefficients([1, 2, 3, 4], [2, -1]),
+                reduceByLoops([1, 2, 3, 4], [2, -1]))
+
+
+def test_pascal():
+    binomials, exponents = polynomials._pascal(6)
+    for j in range(6):
+        for k in range(6):
+            assert binomials[j, k] == (n_choose_k(k, j) if k >= j else 0)
+            assert exponents[j, k] == max(k - j, 0)
+
+    assert polynomials._pascal(6) is polynomials._pascal(6)
+    with pytest.raises(ValueError):
+        binomials[0, 0] = 2
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_evaluateUnivariate():
+    cal = SimpleNamespace(coefficients=(2.0, 3.0), references=(10.0,))
+    x = np.array([0.0, 10.0, 12.5])
+    np.testing.assert_allclose(polynomials.evaluateCalibration(cal, x),
+                               2.0 * (x - 10.0) + 3.0)
+
+
+def test_evaluateBivariate():
+    cal = SimpleNamespace(coefficients=(0.5, 2.0, -1.0, 4.0), references=(1.0, 20.0))
+    x, y = polynomials.makeSweep(cal)
+    expected = 0.5 * (x - 1) * (y - 20) + 2.0 * (x - 1) - 1.0 * (y - 20) + 4.0
+    np.testing.assert_allclose(polynomials.evaluateCalibration(cal, x, y), expected)
+
+    with pytest.raises(ValueError):
+        polynomials.evaluateCalibration(cal, x)
+
+
+def test_maxDeviation():
+    cal = SimpleNamespace(coefficients=(2.0, 3.0), references=(0.0,))
+    other = SimpleNamespace(coefficients=(2.1, 3.0), references=(0.0,))
+    dev, x, y = polynomials.maxDeviation(cal, other)
+
+    assert dev == pytest.approx(5.0)
+    assert abs(x) == pytest.approx(50.0)
+    assert y is None
@@ -0,0 +1,89 @@
+"""
+Tests for the Wi-Fi tab's network status thread, using a simulated device.
+"""
+
+import pytest
+
+pytest.importorskip('wx')
+pytest.importorskip('endaq.device')
+
+from endaq.device import DeviceError
+from endaq.device.response_codes import DeviceStatusCode
+
+from endaqconfig import broker
+from endaqconfig.polling import StatePollSchedule
+from endaqconfig.wifi_tab import ContinousNetworkStatusChecker
+
+
+class FakeCommand(object):
+    """ Simulated device commands. Each `queryWifi()` uses the next scripted
+        response: an exception is raised, a function is called.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+
+    def queryWifi(self, timeout=None, callback=None):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response()
+
+
+class FakeDevice(object):
+    def __init__(self, *responses):
+        self.command = FakeCommand(responses)
+
+
+class FakeTab(object):
+    def __init__(self, device):
+        self.device = device
+
+
+# ===============================================================================
+#
+# ===============================================================================
+
+def test_statusBusy():
+    """ An ERR_BUSY that outlasts the broker's retries is reported to the
+        schedule (which backs off), and the thread keeps polling.
+    """
+    busy = DeviceError(DeviceStatusCode.ERR_BUSY, "Busy")
+    dev = FakeDevice()
+    b = broker.getBroker(dev)
+    b.retries = 1
+    b.busyDelay = 0
+
+    schedule = StatePollSchedule(interval=0.01, maxInterval=0.05)
+    thread = ContinousNetworkStatusChecker(FakeTab(dev), interval=0.01,
+                                           schedule=schedule)
+
+    # Busy for the first poll (including its retry), stopped by the second.
+    dev.command.responses = [busy, busy, thread.stop]
+    try:
+        thread.start()
+        thread.join(5)
+        assert not thread.is_alive()
+    finally:
+        thread.stop()
+        broker.closeBroker(dev)
+
+    assert dev.command.calls == 3
+    assert schedule.stats.errors == 1
+    assert schedule.interval.current == 0.02
+
+
+def test_statusError():
+    """ Other device errors end the thread.
+    """
+    dev = FakeDevice(DeviceError(DeviceStatusCode.ERR_INVALID_COMMAND, "Bad"))
+    thread = ContinousNetworkStatusChecker(FakeTab(dev), interval=0.01)
+    try:
+        with pytest.raises(DeviceError):
+            thread.run()
+    finally:
+        broker.closeBroker(dev)
+    assert thread.schedule.stats.errors == 0